@@ -1,18 +1,32 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, current_app
-from flask_socketio import SocketIO, emit
+from config import Config
+
+# Green-thread servers have to patch the standard library before anything else imports it
+if Config.SOCKETIO_ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif Config.SOCKETIO_ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, current_app, g, abort
+from flask_socketio import SocketIO, emit, join_room
 import sys
 import os
+import signal
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 import logging
 from datetime import datetime, time, timedelta
 import threading
 import time as time_module
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+from types import SimpleNamespace
+import hashlib
+from functools import wraps, partial
 import json
 import pandas as pd
 import requests
-from sqlalchemy import text
+from sqlalchemy import text, func, select
 from werkzeug.security import generate_password_hash, check_password_hash
 import random
 import numpy as np
@@ -20,23 +34,82 @@ import numpy as np
 # Add current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from modules.write_behind import PaperAccountCache
+from modules.log_sink import LogSink
+from modules.storage import StorageLayer
+from modules import migrations
+from modules.retention import ArchiveStore, RetentionManager
+from modules.timeseries import EquityStore
+from modules import session_stats
+from modules.cache import TTLCache
+from modules.push import AccountPushChannel
+from modules.subscriptions import SubscriptionRegistry, MarketStreamer
+from modules.market_emitter import ConflatingEmitter, MARKET_FIELDS
+from modules.watch_universe import WatchUniverse
+from modules.metrics import REGISTRY as metrics, InstrumentedKite, instrument_emit, instrument_sessions, instrument_requests
+from modules.profiler import ProfilerService
+from modules.tracing import Tracer, Trace, ORDER_STAGE
+from modules.indicators import GRAPH as indicator_graph
+from utils.helpers import setup_logging, parse_log_levels
+from strategies.registry import REGISTRY as strategy_registry, Strategy, EXECUTION_PARAMETERS, number
+
 # Initialize Flask app first
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///trading_bot.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SOCKETIO_ASYNC_MODE'] = 'threading'
+app.config.from_object(Config)
+app.config['LOG_LEVELS'] = parse_log_levels(Config.LOG_LEVELS)
+
+# Bot loops, strategies and request threads only enqueue log records; a listener thread writes them
+setup_logging(
+    level=app.config['LOG_LEVEL'],
+    module_levels=app.config['LOG_LEVELS'],
+    json_output=app.config['LOG_FORMAT'] == 'json',
+    log_file=app.config['LOG_FILE'],
+    repeat_window=app.config['LOG_REPEAT_WINDOW_SECONDS'],
+    repeat_burst=app.config['LOG_REPEAT_BURST']
+)
+logger = logging.getLogger('app')
+live_logger = logging.getLogger('app.live')
+paper_logger = logging.getLogger('app.paper')
+strategy_logger = logging.getLogger('app.strategy')
+bot_logger = logging.getLogger('app.bot')
 
 # Initialize extensions
 db = SQLAlchemy(app)
+# WAL tuning, single group-commit writer and per-thread read connections
+storage = StorageLayer(
+    app, db,
+    busy_timeout_ms=app.config['SQLITE_BUSY_TIMEOUT_MS'],
+    synchronous=app.config['SQLITE_SYNCHRONOUS'],
+    journal_mode=app.config['SQLITE_JOURNAL_MODE'],
+    commit_window_ms=app.config['GROUP_COMMIT_WINDOW_MS'],
+    max_batch=app.config['GROUP_COMMIT_MAX_BATCH']
+)
 socketio = SocketIO(
     app,
     async_mode=app.config['SOCKETIO_ASYNC_MODE'],
     cors_allowed_origins="*",
-    logger=True,
-    engineio_logger=True
+    # Per-packet logging is synchronous; keep it to development
+    logger=app.config['SOCKETIO_LOGGING'],
+    engineio_logger=app.config['SOCKETIO_LOGGING']
 )
 
+# Hot-path latency histograms, scraped at /metrics
+metrics.enabled = app.config['METRICS_ENABLED']
+instrument_emit(socketio)
+instrument_sessions(db.session)
+instrument_requests(app, skip=lambda endpoint: endpoint == 'prometheus_metrics')
+
+# On-demand profiling of one bot or of matching requests (see /api/admin/profiles)
+profiler = ProfilerService(max_seconds=app.config['PROFILER_MAX_SECONDS'])
+
+@app.before_request
+def begin_request_profile():
+    g.profiling = profiler.begin('request', request.endpoint, request.path)
+
+@app.teardown_request
+def end_request_profile(exc=None):
+    profiler.end(g.pop('profiling', None))
+
 # Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -61,6 +134,9 @@ class User(UserMixin, db.Model):
 
 class BotSession(db.Model):
     __tablename__ = 'bot_sessions'
+    __table_args__ = (
+        db.Index('ix_bot_sessions_user_status', 'user_id', 'status'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -88,6 +164,12 @@ class BotSession(db.Model):
 
 class Trade(db.Model):
     __tablename__ = 'trades'
+    __table_args__ = (
+        db.Index('ix_trades_user_mode_action', 'user_id', 'trading_mode', 'action'),
+        db.Index('ix_trades_user_mode_timestamp', 'user_id', 'trading_mode', 'timestamp'),
+        db.Index('ix_trades_user_mode_id', 'user_id', 'trading_mode', 'id'),
+        db.Index('ix_trades_bot_session', 'bot_session_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -109,6 +191,10 @@ class Trade(db.Model):
 
 class Log(db.Model):
     __tablename__ = 'logs'
+    __table_args__ = (
+        db.Index('ix_logs_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_logs_user_id', 'user_id', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -139,6 +225,9 @@ class UserSettings(db.Model):
 
 class PaperPosition(db.Model):
     __tablename__ = 'paper_positions'
+    __table_args__ = (
+        db.Index('uq_paper_positions_user_symbol', 'user_id', 'symbol', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -152,6 +241,52 @@ class PaperPosition(db.Model):
 
     user = db.relationship('User', backref=db.backref('paper_positions', lazy=True))
 
+class BotSessionStats(db.Model):
+    """Per-session performance, folded in fill by fill (see modules/session_stats.py)"""
+    __tablename__ = 'bot_session_stats'
+
+    session_id = db.Column(db.Integer, db.ForeignKey('bot_sessions.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    initial_capital = db.Column(db.Float, default=0.0)
+    trades_count = db.Column(db.Integer, default=0)
+    buy_count = db.Column(db.Integer, default=0)
+    sell_count = db.Column(db.Integer, default=0)
+    turnover = db.Column(db.Float, default=0.0)
+    charges = db.Column(db.Float, default=0.0)
+    realized_pnl = db.Column(db.Float, default=0.0)
+    winning_trades = db.Column(db.Integer, default=0)
+    losing_trades = db.Column(db.Integer, default=0)
+    peak_equity = db.Column(db.Float, default=0.0)
+    max_drawdown = db.Column(db.Float, default=0.0)
+    positions = db.Column(db.Text, default='{}')  # symbol -> [signed quantity, average price]
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ArchivedBrokerage(db.Model):
+    """SELL brokerage of trades retention moved out of the trades table, per user and mode"""
+    __tablename__ = 'archived_brokerage'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    trading_mode = db.Column(db.String(20), primary_key=True)
+    brokerage = db.Column(db.Float, nullable=False, default=0.0)
+
+class EquitySample(db.Model):
+    __tablename__ = 'equity_samples'
+    __table_args__ = (
+        db.Index('uq_equity_samples_series_bucket', 'scope', 'scope_id', 'resolution', 'bucket', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)  # 'account' (user id) or 'bot' (session id)
+    scope_id = db.Column(db.Integer, nullable=False)
+    resolution = db.Column(db.Integer, nullable=False)  # bucket width in seconds: 1, 60 or 3600
+    bucket = db.Column(db.DateTime, nullable=False)
+    equity = db.Column(db.Float, nullable=False)
+    equity_min = db.Column(db.Float, nullable=False)
+    equity_max = db.Column(db.Float, nullable=False)
+    cash = db.Column(db.Float, nullable=False)
+    exposure = db.Column(db.Float, nullable=False)
+    drawdown = db.Column(db.Float, nullable=False, default=0.0)
+
 # Enhanced trading session state with thread control
 class TradingSession:
     def __init__(self, thread, config, session, started_at):
@@ -169,69 +304,104 @@ def load_user(user_id):
 
 # Enhanced Live Trading System with Position Tracking
 class LiveTrading:
-    def __init__(self):
+    def __init__(self, max_clients: int = 64):
         self.kite = None
         self._last_api_key = None
         self._last_access_token = None
+        # api_key -> (access_token, verified client): one Kite session per user, reused across calls
+        self._clients: Dict[str, Tuple[str, Any]] = {}
+        self._clients_lock = threading.Lock()
+        self.max_clients = max_clients
         self.live_positions = {}  # Track live positions by user_id
         self.mis_blocked_stocks = set()  # Track stocks that have MIS blocks
         self.trade_to_trade_stocks = set()  # Track trade-to-trade stocks
+        self.last_prices: Dict[str, float] = {}  # symbol -> last traded price from the latest quote
         self._initialization_lock = threading.Lock()  # Thread safety for initialization
 
     def initialize(self, api_key: str, access_token: str) -> bool:
-        """Initialize Kite connection (cached) with thread safety"""
+        """Make the user's client the default one (`self.kite`) for order placement and position reads"""
         with self._initialization_lock:
-            try:
-                try:
-                    from kiteconnect import KiteConnect  # noqa
-                except ImportError:
-                    print("⚠️  kiteconnect not installed. Live trading disabled.")
-                    return False
-
-                # Clear cache if credentials changed
-                if self.kite and (self._last_api_key != api_key or self._last_access_token != access_token):
-                    print("🔄 Credentials changed, reinitializing Kite connection...")
-                    self.kite = None
-                    self._last_api_key = None
-                    self._last_access_token = None
-
-                if self.kite and self._last_api_key == api_key and self._last_access_token == access_token:
-                    # Already initialized with same creds
-                    return True
-
-                from kiteconnect import KiteConnect
-                self.kite = KiteConnect(api_key=api_key)
-                self.kite.set_access_token(access_token)
-                
-                # Test the connection with a simple API call
-                try:
-                    profile = self.kite.profile()
-                    if profile:
-                        self._last_api_key = api_key
-                        self._last_access_token = access_token
-                        print(f"✅ Kite Connect initialized for user: {profile.get('user_name', 'Unknown')}")
-                        
-                        # Load trade-to-trade stocks list
-                        self._load_trade_to_trade_stocks()
-                        
-                        return True
-                    return False
-                except Exception as api_error:
-                    error_msg = str(api_error)
-                    if "Invalid api_key" in error_msg or "Invalid access_token" in error_msg:
-                        print(f"❌ INVALID CREDENTIALS: Please check your API Key and Access Token")
-                        # Clear invalid credentials
-                        self.kite = None
-                        self._last_api_key = None
-                        self._last_access_token = None
-                    else:
-                        print(f"❌ Kite API error: {error_msg}")
-                    return False
-
-            except Exception as e:
-                print(f"❌ Kite initialization error: {e}")
+            kite = self.client(api_key, access_token)
+            if kite is None:
                 self.kite = None
+                self._last_api_key = None
+                self._last_access_token = None
                 return False
+            self.kite = kite
+            self._last_api_key = api_key
+            self._last_access_token = access_token
+            return True
+
+    def has_client(self, api_key: str, access_token: str) -> bool:
+        """Whether a verified client for these credentials is already cached"""
+        with self._clients_lock:
+            cached = self._clients.get(api_key)
+        return cached is not None and cached[0] == access_token
+
+    def client(self, api_key: str, access_token: str):
+        """
+        A verified Kite client for one set of credentials, cached per
+        api_key, so each user's reads run on their own session and only a
+        new or changed access token costs a profile() check. The check
+        runs outside the cache lock, so a slow broker call for one user
+        never holds up another user's lookup.
+        """
+        with self._clients_lock:
+            cached = self._clients.get(api_key)
+        if cached is not None and cached[0] == access_token:
+            return cached[1]
+        if cached is not None:
+            live_logger.info("🔄 Credentials changed, reinitializing Kite connection...")
+
+        kite = self._connect(api_key, access_token)
+        if kite is None:
+            return None
+
+        with self._clients_lock:
+            cached = self._clients.get(api_key)
+            if cached is not None and cached[0] == access_token:
+                return cached[1]  # another thread verified the same credentials first
+            self._clients.pop(api_key, None)
+            if len(self._clients) >= self.max_clients:
+                self._clients.pop(next(iter(self._clients)))  # oldest session
+            self._clients[api_key] = (access_token, kite)
+        return kite
+
+    def _connect(self, api_key: str, access_token: str):
+        """A new Kite client for these credentials, or None if profile() does not accept them"""
+        try:
+            from kiteconnect import KiteConnect
+        except ImportError:
+            live_logger.warning("⚠️  kiteconnect not installed. Live trading disabled.")
+            return None
+
+        try:
+            # KITE_ROOT_URL points at a local stand-in (benchmarks/fake_kite.py); None is the real API
+            kite = InstrumentedKite(KiteConnect(api_key=api_key, root=app.config['KITE_ROOT_URL']))
+            kite.set_access_token(access_token)
+
+            # Test the connection with a simple API call
+            try:
+                profile = kite.profile()
+            except Exception as api_error:
+                error_msg = str(api_error)
+                if "Invalid api_key" in error_msg or "Invalid access_token" in error_msg:
+                    live_logger.error(f"❌ INVALID CREDENTIALS: Please check your API Key and Access Token")
+                else:
+                    live_logger.error(f"❌ Kite API error: {error_msg}")
+                return None
+            if not profile:
+                return None
+
+            live_logger.info(f"✅ Kite Connect initialized for user: {profile.get('user_name', 'Unknown')}")
+            if not self.trade_to_trade_stocks:
+                # Load trade-to-trade stocks list
+                self._load_trade_to_trade_stocks()
+            return kite
+
+        except Exception as e:
+            live_logger.error(f"❌ Kite initialization error: {e}")
+            return None
 
     def _load_trade_to_trade_stocks(self):
         """Load known trade-to-trade stocks that cannot be traded intraday"""
@@ -243,26 +413,27 @@ class LiveTrading:
             'NIRAJ-BE', 'OSWALAGRO-BE', 'PIONEEREMB-BE', 'SABTN-BE', 'SILVERTUC-BE',
             'SUPERSPIN-BE', 'SURANASOL-BE', 'SURANAT-BE', 'SURYALAXMI-BE', 'SUTLEJTEX-BE'
         }
-        print(f"📋 Loaded {len(self.trade_to_trade_stocks)} trade-to-trade stocks")
+        live_logger.info(f"📋 Loaded {len(self.trade_to_trade_stocks)} trade-to-trade stocks")
 
     def _is_trade_to_trade_stock(self, symbol: str) -> bool:
         """Check if a stock is trade-to-trade (cannot be traded intraday)"""
         return symbol.upper() in self.trade_to_trade_stocks
 
-    def get_margins(self):
+    def get_margins(self, kite=None):
         """Return equity margins only (more deterministic)"""
+        kite = kite or self.kite
         try:
-            if not self.kite:
+            if not kite:
                 return None
             # Prefer segment-specific call if supported by kiteconnect version
             try:
-                return self.kite.margins('equity')
+                return kite.margins('equity')
             except TypeError:
                 # Older versions may only support margins() -> dict with 'equity' key
-                full = self.kite.margins()
+                full = kite.margins()
                 return full.get('equity', full)
         except Exception as e:
-            print(f"Error getting margins: {e}")
+            live_logger.error(f"Error getting margins: {e}")
             return None
 
     def _compute_usable_cash_from_margins(self, margins_obj: dict) -> float:
@@ -310,24 +481,26 @@ class LiveTrading:
 
         return round(usable_cash, 2)
 
-    def get_holdings(self) -> Dict[str, Any] | list | None:
+    def get_holdings(self, kite=None) -> Dict[str, Any] | list | None:
         """Get current holdings"""
+        kite = kite or self.kite
         try:
-            if self.kite:
-                return self.kite.holdings()
+            if kite:
+                return kite.holdings()
             return None
         except Exception as e:
-            print(f"Error getting holdings: {e}")
+            live_logger.error(f"Error getting holdings: {e}")
             return None
 
-    def get_positions(self) -> Dict[str, Any] | None:
+    def get_positions(self, kite=None) -> Dict[str, Any] | None:
         """Get current positions"""
+        kite = kite or self.kite
         try:
-            if self.kite:
-                return self.kite.positions()
+            if kite:
+                return kite.positions()
             return None
         except Exception as e:
-            print(f"Error getting positions: {e}")
+            live_logger.error(f"Error getting positions: {e}")
             return None
 
     def get_wallet_balance(self) -> Dict[str, Any]:
@@ -353,20 +526,21 @@ class LiveTrading:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def get_live_balance(self) -> Dict[str, Any]:
-        """Get actual live balances and portfolio value"""
+    def get_live_balance(self, kite=None) -> Dict[str, Any]:
+        """Get actual live balances and portfolio value (on `kite`, or the default client)"""
+        kite = kite or self.kite
         try:
-            if not self.kite:
+            if not kite:
                 return {'success': False, 'error': 'Kite not initialized'}
 
-            margins = self.get_margins()
+            margins = self.get_margins(kite)
             if not margins:
                 return {'success': False, 'error': 'Could not fetch margins'}
 
             available_cash = self._compute_usable_cash_from_margins(margins)
 
-            holdings = self.get_holdings() or []
-            positions = self.get_positions() or {}
+            holdings = self.get_holdings(kite) or []
+            positions = self.get_positions(kite) or {}
 
             portfolio_value = available_cash
 
@@ -397,13 +571,14 @@ class LiveTrading:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def get_market_quotes(self, symbols: List[str]) -> List[Dict[str, Any]]:
+    def get_market_quotes(self, symbols: List[str], kite=None) -> List[Dict[str, Any]]:
         """
         Fetch live market quotes from Zerodha and normalize them to the
         structure required by the frontend table.
         """
+        kite = kite or self.kite
         try:
-            if not self.kite:
+            if not kite:
                 return []
 
             # Filter out trade-to-trade stocks
@@ -413,7 +588,7 @@ class LiveTrading:
 
             # Zerodha expects tradingsymbols with exchange. We'll assume NSE:<SYMBOL>
             instruments = [f"NSE:{s}" for s in filtered_symbols]
-            quotes = self.kite.quote(instruments)  # dict keyed by instrument
+            quotes = kite.quote(instruments)  # dict keyed by instrument
 
             results = []
             now_iso = datetime.now().isoformat()
@@ -453,20 +628,22 @@ class LiveTrading:
                     'timestamp': now_iso,
                     'is_trade_to_trade': self._is_trade_to_trade_stock(sym)
                 })
+                self.last_prices[sym] = round(last_price, 2)
 
             return results
 
         except Exception as e:
-            print(f"Error fetching live quotes: {e}")
+            live_logger.error(f"Error fetching live quotes: {e}")
             return []
 
-    def get_all_nse_stocks(self) -> List[str]:
+    def get_all_nse_stocks(self, kite=None) -> List[str]:
         """Get all NSE stocks dynamically from Zerodha"""
+        kite = kite or self.kite
         try:
-            if not self.kite:
+            if not kite:
                 return []
 
-            instruments = self.kite.instruments("NSE")
+            instruments = kite.instruments("NSE")
             if not instruments:
                 return []
 
@@ -476,23 +653,24 @@ class LiveTrading:
                 if instrument['instrument_type'] == 'EQ' and instrument['exchange'] == 'NSE':
                     stocks.append(instrument['tradingsymbol'])
             
-            print(f"📊 Found {len(stocks)} NSE stocks from Zerodha API")
+            live_logger.info(f"📊 Found {len(stocks)} NSE stocks from Zerodha API")
             return stocks
 
         except Exception as e:
-            print(f"Error getting NSE stocks: {e}")
+            live_logger.error(f"Error getting NSE stocks: {e}")
             return []
 
-    def get_top_gainers(self, available_cash: float, count: int = 15) -> List[Dict[str, Any]]:
+    def get_top_gainers(self, available_cash: float, count: int = 15, kite=None) -> List[Dict[str, Any]]:
         """
         Get top gainers from Zerodha that are affordable based on available cash
         """
+        kite = kite or self.kite
         try:
-            if not self.kite:
+            if not kite:
                 return []
 
             # Get all NSE stocks
-            all_stocks = self.get_all_nse_stocks()
+            all_stocks = self.get_all_nse_stocks(kite)
             if not all_stocks:
                 return []
 
@@ -504,7 +682,7 @@ class LiveTrading:
             
             # Get quotes for sampled stocks
             instruments_to_fetch = [f"NSE:{stock}" for stock in filtered_stocks]
-            quotes = self.kite.quote(instruments_to_fetch)
+            quotes = kite.quote(instruments_to_fetch)
 
             gainers = []
             for inst_key, q in quotes.items():
@@ -535,37 +713,38 @@ class LiveTrading:
             return gainers[:count]
 
         except Exception as e:
-            print(f"Error getting top gainers: {e}")
+            live_logger.error(f"Error getting top gainers: {e}")
             return []
 
-    def get_affordable_stocks(self, available_cash: float, max_capital_usage: float = 0.8) -> List[str]:
+    def get_affordable_stocks(self, available_cash: float, max_capital_usage: float = 0.8, kite=None) -> List[str]:
         """
         Dynamically get affordable stocks based on available wallet balance
         Uses top gainers that the user can actually afford to trade
         """
+        kite = kite or self.kite
         try:
-            if not self.kite:
+            if not kite:
                 return []
 
             usable_cash = available_cash * max_capital_usage
-            print(f"💰 Getting affordable stocks for usable cash: ₹{usable_cash:.2f}")
+            live_logger.info(f"💰 Getting affordable stocks for usable cash: ₹{usable_cash:.2f}")
 
             # Get top gainers that are affordable
-            gainers = self.get_top_gainers(usable_cash, count=15)
+            gainers = self.get_top_gainers(usable_cash, count=15, kite=kite)
             
             affordable_stocks = []
             for stock in gainers:
                 if stock['affordable_quantity'] >= 1 and not stock['is_trade_to_trade']:
                     affordable_stocks.append(stock['symbol'])
-                    print(f"  ✅ {stock['symbol']}: ₹{stock['last_price']} (Qty: {stock['affordable_quantity']}, Change: {stock['change_percent']:.2f}%)")
+                    live_logger.debug(f"  ✅ {stock['symbol']}: ₹{stock['last_price']} (Qty: {stock['affordable_quantity']}, Change: {stock['change_percent']:.2f}%)")
                 elif stock['is_trade_to_trade']:
-                    print(f"  ⚠️  Skipping trade-to-trade stock: {stock['symbol']}")
+                    live_logger.debug(f"  ⚠️  Skipping trade-to-trade stock: {stock['symbol']}")
 
-            print(f"🎯 Selected {len(affordable_stocks)} affordable stocks (excluding trade-to-trade)")
+            live_logger.info(f"🎯 Selected {len(affordable_stocks)} affordable stocks (excluding trade-to-trade)")
             return affordable_stocks
 
         except Exception as e:
-            print(f"Error getting affordable stocks: {e}")
+            live_logger.error(f"Error getting affordable stocks: {e}")
             # Fallback to popular stocks if API fails
             return ['RELIANCE', 'TCS', 'INFY', 'HDFC', 'HDFCBANK', 'ICICIBANK', 'SBIN', 'BHARTIARTL', 'KOTAKBANK', 'ITC']
 
@@ -598,10 +777,12 @@ class LiveTrading:
 
         return 0.0
 
-    def place_order(self, symbol: str, action: str, quantity: int, price: float, user_id: int, product_type: str = 'CNC') -> Dict[str, Any]:
-        """Place REAL live order with Zerodha API with automatic MIS/CNC handling"""
+    def place_order(self, symbol: str, action: str, quantity: int, price: float, user_id: int, product_type: str = 'CNC',
+                    kite=None) -> Dict[str, Any]:
+        """Place REAL live order with Zerodha API with automatic MIS/CNC handling (on `kite`, or the default client)"""
+        kite = kite or self.kite
         try:
-            if not self.kite:
+            if not kite:
                 return {'success': False, 'error': 'Kite not initialized. Please check your API credentials.'}
 
             # Check if stock is trade-to-trade and user is trying MIS
@@ -612,7 +793,7 @@ class LiveTrading:
                 }
 
             # Check available balance first
-            balance_data = self.get_live_balance()
+            balance_data = self.get_live_balance(kite)
             if not balance_data['success']:
                 return {'success': False, 'error': f'Failed to check balance: {balance_data.get("error")}'}
 
@@ -632,10 +813,10 @@ class LiveTrading:
             try:
                 order_type = 'LIMIT'
                 
-                print(f"📊 Placing LIVE ORDER: {action} {quantity} {symbol} @ ₹{price:.2f} ({product_type})")
+                live_logger.info(f"📊 Placing LIVE ORDER: {action} {quantity} {symbol} @ ₹{price:.2f} ({product_type})")
                 
                 # Actual order placement - FIXED: Ensure product parameter is properly passed
-                order_response = self.kite.place_order(
+                order_response = kite.place_order(
                     tradingsymbol=symbol,
                     exchange='NSE',
                     transaction_type=action.upper(),
@@ -647,7 +828,7 @@ class LiveTrading:
                 )
 
                 order_id = order_response
-                print(f"✅ ORDER PLACED SUCCESSFULLY: {order_id} ({product_type})")
+                live_logger.info(f"✅ ORDER PLACED SUCCESSFULLY: {order_id} ({product_type})")
 
                 # Track position internally
                 self._update_live_position(user_id, symbol, action, quantity, price, order_id, product_type)
@@ -667,30 +848,30 @@ class LiveTrading:
                 
                 # Check if it's an MIS block error
                 if "MIS orders are currently blocked" in error_msg:
-                    print(f"⚠️ MIS blocked for {symbol}, retrying with CNC...")
+                    live_logger.warning(f"⚠️ MIS blocked for {symbol}, retrying with CNC...")
                     # Retry with CNC
-                    return self.place_order(symbol, action, quantity, price, user_id, 'CNC')
+                    return self.place_order(symbol, action, quantity, price, user_id, 'CNC', kite=kite)
                 elif "Missing or empty field `product`" in error_msg:
-                    print(f"⚠️ Product field missing error, using default CNC...")
+                    live_logger.warning(f"⚠️ Product field missing error, using default CNC...")
                     # Retry with explicit CNC
-                    return self.place_order(symbol, action, quantity, price, user_id, 'CNC')
+                    return self.place_order(symbol, action, quantity, price, user_id, 'CNC', kite=kite)
                 elif "Intraday trading is not allowed" in error_msg or "trade to trade" in error_msg.lower():
-                    print(f"⚠️ Trade-to-trade stock detected: {symbol}, using CNC...")
+                    live_logger.warning(f"⚠️ Trade-to-trade stock detected: {symbol}, using CNC...")
                     # Add to our known trade-to-trade list
                     self.trade_to_trade_stocks.add(symbol.upper())
                     # Retry with CNC
-                    return self.place_order(symbol, action, quantity, price, user_id, 'CNC')
+                    return self.place_order(symbol, action, quantity, price, user_id, 'CNC', kite=kite)
                 elif "Invalid api_key" in error_msg or "Invalid access_token" in error_msg:
-                    print(f"❌ INVALID CREDENTIALS: Please check your API Key and Access Token")
+                    live_logger.error(f"❌ INVALID CREDENTIALS: Please check your API Key and Access Token")
                     return {'success': False, 'error': '❌ INVALID CREDENTIALS: Please check your Zerodha API Key and Access Token in Settings'}
                 else:
                     error_msg = f"Order placement failed: {error_msg}"
-                    print(f"❌ ORDER FAILED: {error_msg}")
+                    live_logger.error(f"❌ ORDER FAILED: {error_msg}")
                     return {'success': False, 'error': error_msg}
 
         except Exception as e:
             error_msg = f"Order placement error: {str(e)}"
-            print(f"❌ ORDER ERROR: {error_msg}")
+            live_logger.error(f"❌ ORDER ERROR: {error_msg}")
             return {'success': False, 'error': error_msg}
 
     def _update_live_position(self, user_id: int, symbol: str, action: str, quantity: int, price: float, order_id: str, product_type: str):
@@ -743,7 +924,7 @@ class LiveTrading:
                             }
 
         except Exception as e:
-            print(f"Error updating live position: {e}")
+            live_logger.error(f"Error updating live position: {e}")
 
     def get_live_positions(self, user_id: int) -> List[Dict[str, Any]]:
         """Get current live positions for user"""
@@ -783,13 +964,14 @@ class LiveTrading:
             return positions
 
         except Exception as e:
-            print(f"Error getting live positions: {e}")
+            live_logger.error(f"Error getting live positions: {e}")
             return []
 
-    def get_live_pnl(self, user_id: int) -> Dict[str, float]:
+    def get_live_pnl(self, user_id: int, positions: List[Dict[str, Any]] = None) -> Dict[str, float]:
         """Calculate P&L for live trading"""
         try:
-            positions = self.get_live_positions(user_id)
+            if positions is None:
+                positions = self.get_live_positions(user_id)
             
             total_invested = 0.0
             current_value = 0.0
@@ -801,13 +983,7 @@ class LiveTrading:
                 unrealized_pnl += position['unrealized_pnl']
 
             # Get realized P&L from database trades
-            realized_trades = Trade.query.filter_by(
-                user_id=user_id, 
-                trading_mode='live',
-                action='SELL'
-            ).all()
-            
-            realized_pnl = sum(trade.brokerage for trade in realized_trades)
+            realized_pnl = realized_brokerage(user_id, 'live')
 
             total_pnl = unrealized_pnl - realized_pnl
 
@@ -821,7 +997,7 @@ class LiveTrading:
             }
 
         except Exception as e:
-            print(f"Error calculating live P&L: {e}")
+            live_logger.error(f"Error calculating live P&L: {e}")
             return {
                 'realized_pnl': 0.0,
                 'unrealized_pnl': 0.0,
@@ -831,8 +1007,8 @@ class LiveTrading:
                 'total_invested': 0.0
             }
 
-    def exit_all_positions(self, user_id: int) -> Dict[str, Any]:
-        """Exit all live positions when bot stops"""
+    def exit_all_positions(self, user_id: int, session_id: int = None) -> Dict[str, Any]:
+        """Exit all live positions when bot stops; the closing trades are recorded against `session_id`"""
         try:
             if user_id not in self.live_positions:
                 return {'success': True, 'message': 'No positions to exit', 'exited_positions': 0}
@@ -841,15 +1017,20 @@ class LiveTrading:
             if not portfolio:
                 return {'success': True, 'message': 'No positions to exit', 'exited_positions': 0}
 
-            print(f"🛑 Exiting all positions for user {user_id}: {len(portfolio)} positions")
+            kite = user_kite(user_id)
+            if kite is None:
+                return {'success': False, 'error': 'Kite not initialized. Please check your API credentials.'}
+
+            live_logger.info(f"🛑 Exiting all positions for user {user_id}: {len(portfolio)} positions")
             
             exited_count = 0
             errors = []
+            exit_trades = []
 
             for symbol, position in list(portfolio.items()):
                 try:
                     # Get current market price
-                    quotes = self.get_market_quotes([symbol])
+                    quotes = self.get_market_quotes([symbol], kite=kite)
                     if not quotes:
                         errors.append(f"Could not get price for {symbol}")
                         continue
@@ -864,11 +1045,25 @@ class LiveTrading:
                         quantity=position['quantity'],
                         price=sell_price,
                         user_id=user_id,
-                        product_type=position.get('product_type', 'CNC')
+                        product_type=position.get('product_type', 'CNC'),
+                        kite=kite
                     )
 
                     if result['success']:
-                        print(f"✅ Exited position: {symbol} {position['quantity']} shares @ {sell_price}")
+                        exit_trades.append(dict(
+                            user_id=user_id,
+                            bot_session_id=session_id,
+                            symbol=symbol,
+                            action='SELL',
+                            quantity=position['quantity'],
+                            price=sell_price,
+                            trading_mode='live',
+                            status='COMPLETED',
+                            order_id=result.get('order_id'),
+                            brokerage=result.get('brokerage', 0.0),
+                            product_type=result.get('product_type', position.get('product_type', 'CNC'))
+                        ))
+                        live_logger.info(f"✅ Exited position: {symbol} {position['quantity']} shares @ {sell_price}")
                         exited_count += 1
                     else:
                         errors.append(f"Failed to exit {symbol}: {result.get('error')}")
@@ -876,6 +1071,9 @@ class LiveTrading:
                 except Exception as e:
                     errors.append(f"Error exiting {symbol}: {str(e)}")
 
+            if exit_trades:
+                record_fills(exit_trades, session_id=session_id)
+
             return {
                 'success': True,
                 'exited_positions': exited_count,
@@ -892,39 +1090,30 @@ live_trading = LiveTrading()
 
 # Paper Trading System
 class PaperTrading:
-    def __init__(self):
-        self.paper_balances = {}  # user_id -> balance
-        self.paper_positions = {}  # user_id -> {symbol: position_data}
+    def __init__(self, cache: PaperAccountCache):
+        self.cache = cache  # write-behind cache of paper balances and PaperPosition rows
         
     def get_paper_balance(self, user_id: int) -> Dict[str, Any]:
         """Get paper trading balance"""
         try:
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            if not settings:
-                # Create default settings
-                settings = UserSettings(user_id=user_id, paper_trading_balance=100000.0)
-                db.session.add(settings)
-                db.session.commit()
-            
-            # Get current paper positions from database
-            paper_positions = PaperPosition.query.filter_by(user_id=user_id).all()
+            account = self.cache.account(user_id)
+            with account.lock:
+                balance = account.balance
+                positions = list(account.positions.items())
             
             # Calculate current portfolio value
-            portfolio_value = settings.paper_trading_balance
-            for position in paper_positions:
-                # Get current price for the symbol
-                quotes = live_trading.get_market_quotes([position.symbol])
-                if quotes:
-                    current_price = quotes[0]['last_price']
-                    position_value = position.quantity * current_price
-                    portfolio_value += position_value
+            portfolio_value = balance
+            current_prices = get_current_prices([symbol for symbol, _ in positions])
+            for symbol, position in positions:
+                if symbol in current_prices:
+                    portfolio_value += position['quantity'] * current_prices[symbol]
             
             return {
                 'success': True,
-                'paper_balance': settings.paper_trading_balance,
+                'paper_balance': balance,
                 'portfolio_value': portfolio_value,
-                'available_cash': settings.paper_trading_balance,
-                'positions_count': len(paper_positions)
+                'available_cash': balance,
+                'positions_count': len(positions)
             }
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -932,35 +1121,33 @@ class PaperTrading:
     def get_paper_positions(self, user_id: int) -> List[Dict[str, Any]]:
         """Get paper trading positions"""
         try:
-            positions = PaperPosition.query.filter_by(user_id=user_id).all()
+            positions = self.cache.get_positions(user_id)
+            current_prices = get_current_prices(list(positions))
             result = []
             
-            for position in positions:
-                # Get current price
-                quotes = live_trading.get_market_quotes([position.symbol])
-                current_price = position.average_price  # Default to average price if no quote
-                if quotes:
-                    current_price = quotes[0]['last_price']
+            for symbol, position in positions.items():
+                # Default to average price if no quote
+                current_price = current_prices.get(symbol, position['average_price'])
                 
-                unrealized_pnl = (current_price - position.average_price) * position.quantity
-                pnl_percent = ((current_price - position.average_price) / position.average_price) * 100
+                unrealized_pnl = (current_price - position['average_price']) * position['quantity']
+                pnl_percent = ((current_price - position['average_price']) / position['average_price']) * 100
                 
                 result.append({
-                    'symbol': position.symbol,
-                    'quantity': position.quantity,
-                    'average_price': position.average_price,
+                    'symbol': symbol,
+                    'quantity': position['quantity'],
+                    'average_price': position['average_price'],
                     'current_price': current_price,
                     'unrealized_pnl': unrealized_pnl,
-                    'invested_amount': position.invested_amount,
-                    'current_value': position.quantity * current_price,
+                    'invested_amount': position['invested_amount'],
+                    'current_value': position['quantity'] * current_price,
                     'pnl_percent': pnl_percent,
-                    'product_type': position.product_type,
+                    'product_type': position['product_type'],
                     'action': 'sell'  # FIX: Add action field to prevent undefined
                 })
             
             return result
         except Exception as e:
-            print(f"Error getting paper positions: {e}")
+            paper_logger.error(f"Error getting paper positions: {e}")
             return []
     
     def calculate_paper_brokerage(self, trade_value: float, action: str, product_type: str = 'CNC') -> float:
@@ -968,83 +1155,70 @@ class PaperTrading:
         return live_trading.calculate_zerodha_brokerage(trade_value, action, product_type)
     
     def place_paper_order(self, symbol: str, action: str, quantity: int, price: float, user_id: int, product_type: str = 'CNC') -> Dict[str, Any]:
-        """Place paper trade order"""
+        """Place paper trade order against the in-memory account (flushed to the DB in the background)"""
         try:
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            if not settings:
-                return {'success': False, 'error': 'User settings not found'}
-            
+            account = self.cache.account(user_id)
             trade_value = quantity * price
             brokerage = self.calculate_paper_brokerage(trade_value, action, product_type)
             total_cost = trade_value + brokerage if action.upper() == 'BUY' else 0
             
-            # Check balance for BUY orders
-            if action.upper() == 'BUY' and total_cost > settings.paper_trading_balance:
-                return {
-                    'success': False,
-                    'error': f'❌ PAPER: Insufficient balance. Required: ₹{total_cost:.2f}, Available: ₹{settings.paper_trading_balance:.2f}'
-                }
-            
-            # Check position for SELL orders
-            if action.upper() == 'SELL':
-                position = PaperPosition.query.filter_by(user_id=user_id, symbol=symbol).first()
-                if not position or position.quantity < quantity:
+            with account.lock:
+                position = account.positions.get(symbol)
+                
+                # Check balance for BUY orders
+                if action.upper() == 'BUY' and total_cost > account.balance:
                     return {
                         'success': False,
-                        'error': f'❌ PAPER: Insufficient shares to sell. Requested: {quantity}, Available: {position.quantity if position else 0}'
+                        'error': f'❌ PAPER: Insufficient balance. Required: ₹{total_cost:.2f}, Available: ₹{account.balance:.2f}'
                     }
-            
-            # Execute the paper trade
-            if action.upper() == 'BUY':
-                # Update balance
-                settings.paper_trading_balance -= total_cost
                 
-                # Update or create position
-                position = PaperPosition.query.filter_by(user_id=user_id, symbol=symbol).first()
-                if position:
-                    # Update existing position
-                    total_quantity = position.quantity + quantity
-                    total_invested = position.invested_amount + trade_value
-                    new_avg_price = total_invested / total_quantity
-                    
-                    position.quantity = total_quantity
-                    position.average_price = new_avg_price
-                    position.invested_amount = total_invested
-                    position.updated_at = datetime.now()
-                else:
-                    # Create new position
-                    position = PaperPosition(
-                        user_id=user_id,
-                        symbol=symbol,
-                        quantity=quantity,
-                        average_price=price,
-                        invested_amount=trade_value,
-                        product_type=product_type
-                    )
-                    db.session.add(position)
-                
-            else:  # SELL
-                # Update balance (add sale proceeds minus brokerage)
-                sale_proceeds = trade_value - brokerage
-                settings.paper_trading_balance += sale_proceeds
+                # Check position for SELL orders
+                if action.upper() == 'SELL':
+                    if not position or position['quantity'] < quantity:
+                        return {
+                            'success': False,
+                            'error': f'❌ PAPER: Insufficient shares to sell. Requested: {quantity}, Available: {position["quantity"] if position else 0}'
+                        }
                 
-                # Update position
-                position = PaperPosition.query.filter_by(user_id=user_id, symbol=symbol).first()
-                if position:
-                    if position.quantity == quantity:
+                # Execute the paper trade
+                if action.upper() == 'BUY':
+                    # Update balance
+                    account.balance -= total_cost
+                    
+                    # Update or create position
+                    if position:
+                        total_quantity = position['quantity'] + quantity
+                        total_invested = position['invested_amount'] + trade_value
+                        position['quantity'] = total_quantity
+                        position['average_price'] = total_invested / total_quantity
+                        position['invested_amount'] = total_invested
+                    else:
+                        account.positions[symbol] = {
+                            'quantity': quantity,
+                            'average_price': price,
+                            'invested_amount': trade_value,
+                            'product_type': product_type
+                        }
+                    
+                else:  # SELL
+                    # Update balance (add sale proceeds minus brokerage)
+                    account.balance += trade_value - brokerage
+                    
+                    if position['quantity'] == quantity:
                         # Close position
-                        db.session.delete(position)
+                        del account.positions[symbol]
                     else:
                         # Reduce position
-                        position.quantity -= quantity
-                        position.invested_amount = position.quantity * position.average_price
-                        position.updated_at = datetime.now()
+                        position['quantity'] -= quantity
+                        position['invested_amount'] = position['quantity'] * position['average_price']
+                
+                balance_after = account.balance
+            
+            self.cache.mark_dirty(user_id, symbol)
             
             # Generate paper order ID
             order_id = f"PAPER_{datetime.now().strftime('%Y%m%d%H%M%S')}_{random.randint(1000, 9999)}"
             
-            db.session.commit()
-            
             return {
                 'success': True,
                 'order_id': order_id,
@@ -1052,33 +1226,22 @@ class PaperTrading:
                 'brokerage': brokerage,
                 'trade_value': trade_value,
                 'product_type': product_type,
-                'available_balance_after': settings.paper_trading_balance
+                'available_balance_after': balance_after
             }
             
         except Exception as e:
-            db.session.rollback()
             return {'success': False, 'error': f'Paper trade error: {str(e)}'}
     
-    def get_paper_pnl(self, user_id: int) -> Dict[str, float]:
+    def get_paper_pnl(self, user_id: int, positions: List[Dict[str, Any]] = None) -> Dict[str, float]:
         """Calculate paper trading P&L"""
         try:
-            positions = self.get_paper_positions(user_id)
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            
-            if not settings:
-                return {
-                    'realized_pnl': 0.0,
-                    'unrealized_pnl': 0.0,
-                    'total_pnl': 0.0,
-                    'net_pnl': 0.0,
-                    'portfolio_value': 0.0,
-                    'total_invested': 0.0
-                }
+            if positions is None:
+                positions = self.get_paper_positions(user_id)
             
             # Calculate unrealized P&L from current positions
             unrealized_pnl = 0.0
             total_invested = 0.0
-            current_value = settings.paper_trading_balance
+            current_value = self.cache.get_balance(user_id)
             
             for position in positions:
                 unrealized_pnl += position['unrealized_pnl']
@@ -1086,13 +1249,7 @@ class PaperTrading:
                 current_value += position['current_value']
             
             # Calculate realized P&L from trade history
-            realized_trades = Trade.query.filter_by(
-                user_id=user_id,
-                trading_mode='paper',
-                action='SELL'
-            ).all()
-            
-            realized_pnl = sum(trade.brokerage for trade in realized_trades)
+            realized_pnl = realized_brokerage(user_id, 'paper')
             
             total_pnl = unrealized_pnl - realized_pnl
             
@@ -1106,7 +1263,7 @@ class PaperTrading:
             }
             
         except Exception as e:
-            print(f"Error calculating paper P&L: {e}")
+            paper_logger.error(f"Error calculating paper P&L: {e}")
             return {
                 'realized_pnl': 0.0,
                 'unrealized_pnl': 0.0,
@@ -1116,63 +1273,64 @@ class PaperTrading:
                 'total_invested': 0.0
             }
 
-    def exit_all_positions(self, user_id: int) -> Dict[str, Any]:
-        """Exit all paper positions when bot stops"""
+    def exit_all_positions(self, user_id: int, session_id: int = None) -> Dict[str, Any]:
+        """Exit all paper positions when bot stops; the closing trades are recorded against `session_id`"""
         try:
-            positions = PaperPosition.query.filter_by(user_id=user_id).all()
+            positions = self.cache.get_positions(user_id)
             if not positions:
                 return {'success': True, 'message': 'No paper positions to exit', 'exited_positions': 0}
 
-            print(f"🛑 Exiting all paper positions for user {user_id}: {len(positions)} positions")
+            paper_logger.info(f"🛑 Exiting all paper positions for user {user_id}: {len(positions)} positions")
             
             exited_count = 0
             errors = []
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
+            exit_trades = []
+            current_prices = get_current_prices(list(positions))
 
-            for position in positions:
+            for symbol, position in positions.items():
                 try:
                     # Get current market price
-                    quotes = live_trading.get_market_quotes([position.symbol])
-                    if not quotes:
-                        errors.append(f"Could not get price for {position.symbol}")
+                    if symbol not in current_prices:
+                        errors.append(f"Could not get price for {symbol}")
                         continue
 
-                    current_price = quotes[0]['last_price']
-                    sell_price = round(current_price * 0.995, 2)  # Slightly below market to ensure execution
-
-                    # Calculate brokerage
-                    trade_value = position.quantity * sell_price
-                    brokerage = self.calculate_paper_brokerage(trade_value, 'SELL', position.product_type)
-                    sale_proceeds = trade_value - brokerage
+                    sell_price = round(current_prices[symbol] * 0.995, 2)  # Slightly below market to ensure execution
 
-                    # Update balance
-                    settings.paper_trading_balance += sale_proceeds
+                    result = self.place_paper_order(
+                        symbol=symbol,
+                        action='SELL',
+                        quantity=position['quantity'],
+                        price=sell_price,
+                        user_id=user_id,
+                        product_type=position['product_type']
+                    )
+                    if not result['success']:
+                        errors.append(f"Error exiting {symbol}: {result.get('error')}")
+                        continue
 
                     # Create trade record
-                    trade = Trade(
+                    exit_trades.append(dict(
                         user_id=user_id,
-                        symbol=position.symbol,
+                        bot_session_id=session_id,
+                        symbol=symbol,
                         action='SELL',
-                        quantity=position.quantity,
+                        quantity=position['quantity'],
                         price=sell_price,
                         trading_mode='paper',
                         status='COMPLETED',
                         order_id=f"EXIT_{datetime.now().strftime('%Y%m%d%H%M%S')}_{random.randint(1000, 9999)}",
-                        brokerage=brokerage,
-                        product_type=position.product_type
-                    )
-                    db.session.add(trade)
-
-                    # Delete the position
-                    db.session.delete(position)
+                        brokerage=result['brokerage'],
+                        product_type=position['product_type']
+                    ))
                     exited_count += 1
 
-                    print(f"✅ Exited paper position: {position.symbol} {position.quantity} shares @ {sell_price}")
+                    paper_logger.info(f"✅ Exited paper position: {symbol} {position['quantity']} shares @ {sell_price}")
 
                 except Exception as e:
-                    errors.append(f"Error exiting {position.symbol}: {str(e)}")
+                    errors.append(f"Error exiting {symbol}: {str(e)}")
 
-            db.session.commit()
+            if exit_trades:
+                record_fills(exit_trades, session_id=session_id)
 
             return {
                 'success': True,
@@ -1183,7 +1341,6 @@ class PaperTrading:
             }
 
         except Exception as e:
-            db.session.rollback()
             return {'success': False, 'error': f'Error exiting paper positions: {str(e)}'}
 
     def reset_paper_portfolio(self, user_id: int) -> Dict[str, Any]:
@@ -1193,10 +1350,7 @@ class PaperTrading:
             exit_result = self.exit_all_positions(user_id)
             
             # Reset paper balance to default
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            if settings:
-                settings.paper_trading_balance = 100000.0
-                db.session.commit()
+            self.cache.set_balance(user_id, 100000.0)
 
             return {
                 'success': True,
@@ -1206,54 +1360,152 @@ class PaperTrading:
             }
 
         except Exception as e:
-            db.session.rollback()
             return {'success': False, 'error': f'Error resetting paper portfolio: {str(e)}'}
 
 # Initialize paper trading
-paper_trading = PaperTrading()
+paper_cache = PaperAccountCache(app, db, UserSettings, PaperPosition, writer=storage.writer)
+paper_trading = PaperTrading(paper_cache)
+
+def user_room(user_id: int) -> str:
+    """Socket.IO room that every connection of a user joins"""
+    return f"user_{user_id}"
+
+# Batched Log writer; bot and request threads only enqueue
+log_sink = LogSink(app, db, Log, socketio=socketio, room_for_user=user_room, writer=storage.writer)
+
+def log_event(user_id: int, message: str, level: str = 'INFO'):
+    """Record a Log row asynchronously and push it to the user's log_update stream"""
+    log_sink.emit(user_id, message, level)
+
+def archive_trade_brokerage(conn, trade_ids: List[int]):
+    """Fold the SELL brokerage of trades about to be archived into archived_brokerage (same transaction as the delete)"""
+    trades = Trade.__table__
+    archived = ArchivedBrokerage.__table__
+    totals = conn.execute(
+        select(trades.c.user_id, trades.c.trading_mode, func.sum(trades.c.brokerage))
+        .where(trades.c.id.in_(trade_ids), trades.c.action == 'SELL')
+        .group_by(trades.c.user_id, trades.c.trading_mode)
+    ).fetchall()
+    for user_id, trading_mode, brokerage in totals:
+        updated = conn.execute(
+            archived.update()
+            .where(archived.c.user_id == user_id, archived.c.trading_mode == trading_mode)
+            .values(brokerage=archived.c.brokerage + (brokerage or 0.0))
+        ).rowcount
+        if not updated:
+            conn.execute(archived.insert().values(user_id=user_id, trading_mode=trading_mode,
+                                                  brokerage=brokerage or 0.0))
+
+# Old Log/Trade rows roll into gzip'd, date-partitioned JSONL on a schedule
+retention = RetentionManager(
+    app, db, ArchiveStore(app.config['ARCHIVE_DIR']),
+    policies={Log: app.config['RETENTION_LOG_DAYS'], Trade: app.config['RETENTION_TRADE_DAYS']},
+    interval_seconds=app.config['RETENTION_INTERVAL_SECONDS'],
+    writer=storage.writer,
+    on_delete={Trade: archive_trade_brokerage}
+)
+
+# Per-account and per-bot equity curves, downsampled 1s -> 1m -> 1h
+equity_store = EquityStore(
+    app, db, EquitySample, storage,
+    sample_interval=app.config['EQUITY_SAMPLE_SECONDS'],
+    raw_retention=timedelta(hours=app.config['EQUITY_RAW_RETENTION_HOURS']),
+    minute_retention=timedelta(days=app.config['EQUITY_MINUTE_RETENTION_DAYS'])
+)
+
+def latency_budget_exceeded(trace: Trace, latency: str, seconds: float, budget: float):
+    message = (f"⏱️ Bot {trace.bot_id} ({trace.strategy}) {latency.replace('_', '-')} latency "
+               f"{seconds * 1000:.0f} ms exceeded its {budget * 1000:.0f} ms budget")
+    bot_logger.warning(message, extra={'bot_id': trace.bot_id})
+    log_event(trace.user_id, message, "WARNING")
+
+# Tick -> signal -> order spans and the latency budgets they are held to
+tracer = Tracer(
+    capacity=app.config['TRACE_BUFFER_SPANS'],
+    budgets={
+        'tick_to_order': app.config['LATENCY_BUDGET_TICK_TO_ORDER_MS'] / 1000,
+        'order_to_ack': app.config['LATENCY_BUDGET_ORDER_TO_ACK_MS'] / 1000
+    },
+    on_budget_exceeded=latency_budget_exceeded
+)
+
+def collect_equity_samples():
+    """Mark cached paper accounts and running bots to the last quoted prices"""
+    prices = live_trading.last_prices
+    samples = []
+    for user_id in paper_cache.cached_user_ids():
+        cash = paper_cache.get_balance(user_id)
+        exposure = sum(position['quantity'] * (prices.get(symbol) or position['average_price'])
+                       for symbol, position in paper_cache.get_positions(user_id).items())
+        samples.append(('account', user_id, cash + exposure, cash, exposure))
+    for session_key, trading_session in list(trading_sessions.items()):
+        ledger = equity_store.ledger(int(session_key), trading_session.config.get('capital', 0.0))
+        equity, cash, exposure = ledger.mark(prices)
+        samples.append(('bot', int(session_key), equity, cash, exposure))
+    return samples
+
+def realized_brokerage(user_id: int, trading_mode: str) -> float:
+    """Sum of brokerage on SELL trades, archived ones included, read on the calling thread's own connection"""
+    archived = (
+        select(ArchivedBrokerage.brokerage)
+        .where(ArchivedBrokerage.user_id == user_id, ArchivedBrokerage.trading_mode == trading_mode)
+        .scalar_subquery()
+    )
+    total = storage.readers.scalar(
+        select(func.coalesce(func.sum(Trade.brokerage), 0.0) + func.coalesce(archived, 0.0)).where(
+            Trade.user_id == user_id,
+            Trade.trading_mode == trading_mode,
+            Trade.action == 'SELL'
+        )
+    )
+    return float(total or 0.0)
+
+def record_fill(trade_row: Dict[str, Any], session_id: int = None):
+    """Insert a Trade row and update the session's brokerage and stats in the next group commit"""
+    return record_fills([trade_row], session_id=session_id)[0]
+
+def record_fills(trade_rows: List[Dict[str, Any]], session_id: int = None) -> List[int]:
+    """record_fill() for several fills of one session, in a single group commit"""
+    trades = Trade.__table__
+    sessions = BotSession.__table__
+    stats = BotSessionStats.__table__
+
+    def write(conn):
+        trade_ids = []
+        for trade_row in trade_rows:
+            trade_ids.append(conn.execute(trades.insert().values(**trade_row)).inserted_primary_key[0])
+            if session_id is not None:
+                conn.execute(
+                    sessions.update()
+                    .where(sessions.c.id == session_id)
+                    .values(total_brokerage=func.coalesce(sessions.c.total_brokerage, 0.0) + trade_row.get('brokerage', 0.0))
+                )
+                session_stats.record_fill(
+                    conn, stats, sessions, session_id,
+                    trade_row['symbol'], trade_row['action'], trade_row['quantity'],
+                    trade_row['price'], trade_row.get('brokerage', 0.0)
+                )
+        return trade_ids
+
+    return storage.writer.submit(write).result()
 
 # Enhanced Strategy Engine with Capital Management
 class EnhancedStrategyEngine:
-    def __init__(self):
-        self.available_strategies = [
-            {
-                'name': 'moving_average_crossover',
-                'display_name': 'Moving Average Crossover',
-                'description': 'Generates signals when short-term MA crosses long-term MA',
-                'parameters': [
-                    {'name': 'short_window', 'type': 'number', 'default': 5, 'min': 1, 'max': 50, 'description': 'Short moving average window'},
-                    {'name': 'long_window', 'type': 'number', 'default': 20, 'min': 5, 'max': 100, 'description': 'Long moving average window'},
-                    {'name': 'quantity', 'type': 'number', 'default': 1, 'min': 1, 'max': 10, 'description': 'Quantity to trade per signal'},
-                    {'name': 'max_positions', 'type': 'number', 'default': 3, 'min': 1, 'max': 10, 'description': 'Maximum number of simultaneous positions'},
-                    {'name': 'order_type', 'type': 'select', 'default': 'CNC', 'options': ['MIS', 'CNC'], 'description': 'Order type (MIS for intraday, CNC for delivery)'},
-                    {'name': 'risk_level', 'type': 'select', 'default': '50', 'options': ['10', '20', '30', '40', '50', '60', '70', '80', '90', '100'], 'description': 'Trading aggression level (10-100%)'}
-                ]
-            },
-            {
-                'name': 'mean_reversion',
-                'display_name': 'Mean Reversion',
-                'description': 'Trades based on price deviations from historical mean',
-                'parameters': [
-                    {'name': 'lookback_period', 'type': 'number', 'default': 10, 'min': 5, 'max': 50, 'description': 'Lookback period for mean calculation'},
-                    {'name': 'deviation_threshold', 'type': 'number', 'default': 2.0, 'min': 1.0, 'max': 5.0, 'description': 'Standard deviation threshold'},
-                    {'name': 'quantity', 'type': 'number', 'default': 1, 'min': 1, 'max': 5, 'description': 'Quantity to trade per signal'},
-                    {'name': 'max_positions', 'type': 'number', 'default': 3, 'min': 1, 'max': 10, 'description': 'Maximum number of simultaneous positions'},
-                    {'name': 'order_type', 'type': 'select', 'default': 'CNC', 'options': ['MIS', 'CNC'], 'description': 'Order type (MIS for intraday, CNC for delivery)'},
-                    {'name': 'risk_level', 'type': 'select', 'default': '50', 'options': ['10', '20', '30', '40', '50', '60', '70', '80', '90', '100'], 'description': 'Trading aggression level (10-100%)'}
-                ]
-            }
-        ]
+    """Strategies a bot can run, from the shared registry (strategies/registry.py)"""
+
+    def __init__(self, registry=None):
+        self.registry = registry or strategy_registry
 
     def get_available_strategies(self):
-        return self.available_strategies
+        return self.registry.available()
 
     def get_strategy(self, strategy_name, parameters=None):
-        return EnhancedStrategy(strategy_name, parameters)
+        return self.registry.create(strategy_name, parameters)
 
     def validate_strategy_parameters(self, strategy_name, parameters):
-        return True
+        return not self.registry.validate(strategy_name, parameters)
 
-class EnhancedStrategy:
+class EnhancedStrategy(Strategy):
     def __init__(self, strategy_name, parameters=None):
         self.strategy_name = strategy_name
         self.parameters = parameters or {}
@@ -1283,7 +1535,7 @@ class EnhancedStrategy:
             'symbol_count': max(5, int(5 + (15 * risk_percentage)))    # 5 to 20 symbols
         }
 
-    def generate_signals(self, market_data, current_positions=None, available_cash: float = 0.0):
+    def evaluate(self, market_data, current_positions=None, available_cash: float = 0.0):
         """Generate trading signals with percentage-based risk levels"""
         signals = []
         risk_config = self.get_risk_config()
@@ -1349,12 +1601,48 @@ class EnhancedStrategy:
                     })
                     current_position_count += 1
 
-        print(f"🎯 {self.risk_level}% RISK: Generated {len(signals)} signals (Max positions: {adjusted_max_positions})")
+        strategy_logger.debug("🎯 %s%% RISK: Generated %d signals (Max positions: %d)", self.risk_level, len(signals), adjusted_max_positions)
         return signals
 
+# Indicators shared by all bots (ma_cross, rsi), advancing once per bot-loop tick
+indicator_graph.tick_seconds = app.config['INDICATOR_TICK_SECONDS']
+
+# Risk-scaled random strategies, next to the indicator strategies registered in strategies/registry.py
+strategy_registry.register(
+    'moving_average_crossover', partial(EnhancedStrategy, 'moving_average_crossover'),
+    display_name='Moving Average Crossover',
+    description='Generates signals when short-term MA crosses long-term MA',
+    parameters=[
+        number('short_window', 5, 1, 50, 'Short moving average window'),
+        number('long_window', 20, 5, 100, 'Long moving average window'),
+        number('quantity', 1, 1, 10, 'Quantity to trade per signal'),
+        number('max_positions', 3, 1, 10, 'Maximum number of simultaneous positions'),
+        *EXECUTION_PARAMETERS
+    ],
+    replace=True
+)
+strategy_registry.register(
+    'mean_reversion', partial(EnhancedStrategy, 'mean_reversion'),
+    display_name='Mean Reversion',
+    description='Trades based on price deviations from historical mean',
+    parameters=[
+        number('lookback_period', 10, 5, 50, 'Lookback period for mean calculation'),
+        number('deviation_threshold', 2.0, 1.0, 5.0, 'Standard deviation threshold'),
+        number('quantity', 1, 1, 5, 'Quantity to trade per signal'),
+        number('max_positions', 3, 1, 10, 'Maximum number of simultaneous positions'),
+        *EXECUTION_PARAMETERS
+    ],
+    replace=True
+)
+
 # Initialize strategy engine
 strategy_engine = EnhancedStrategyEngine()
 
+
+@app.context_processor
+def inject_strategies():
+    return {'available_strategies': strategy_engine.get_available_strategies()}
+
 def is_market_open() -> bool:
     """Check if market is currently open"""
     try:
@@ -1371,7 +1659,7 @@ def is_market_open() -> bool:
         is_open = market_open <= current_time <= market_close
         return is_open
     except Exception as e:
-        print(f"❌ Market status check error: {e}")
+        logger.error(f"❌ Market status check error: {e}")
         return False
 
 def get_market_status_message(is_open: bool, is_weekend: bool) -> str:
@@ -1439,7 +1727,7 @@ def get_current_prices(symbols: List[str]) -> Dict[str, float]:
         return current_prices
         
     except Exception as e:
-        print(f"Error getting current prices: {e}")
+        logger.error(f"Error getting current prices: {e}")
         return {}
 
 def get_affordable_stocks(user_id: int, available_cash: float, max_capital_usage: float = 0.8) -> List[str]:
@@ -1448,15 +1736,15 @@ def get_affordable_stocks(user_id: int, available_cash: float, max_capital_usage
     Uses Zerodha API to get top gainers
     """
     try:
-        settings = UserSettings.query.filter_by(user_id=user_id).first()
-        if settings and live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
-            return live_trading.get_affordable_stocks(available_cash, max_capital_usage)
+        kite = user_kite(user_id)
+        if kite is not None:
+            return live_trading.get_affordable_stocks(available_cash, max_capital_usage, kite=kite)
         else:
-            print("❌ Cannot get affordable stocks: Live trading not configured")
+            logger.warning("❌ Cannot get affordable stocks: Live trading not configured")
             return []
                 
     except Exception as e:
-        print(f"Error getting affordable stocks: {e}")
+        logger.error(f"Error getting affordable stocks: {e}")
         return []
 
 def get_top_symbols(instrument_type: str, count: int = 20, user_id: int = None, available_cash: float = None) -> List[str]:
@@ -1490,13 +1778,7 @@ def login():
         if user and user.check_password(password):
             login_user(user)
 
-            log_entry = Log(
-                user_id=user.id,
-                message=f"User {username} logged in successfully",
-                level="INFO"
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            log_event(user.id, f"User {username} logged in successfully", "INFO")
 
             socketio.emit('user_notification', {
                 'type': 'success',
@@ -1522,13 +1804,7 @@ def logout():
     username = current_user.username
     logout_user()
 
-    log_entry = Log(
-        user_id=user_id,
-        message=f"User {username} logged out",
-        level="INFO"
-    )
-    db.session.add(log_entry)
-    db.session.commit()
+    log_event(user_id, f"User {username} logged out", "INFO")
 
     return redirect(url_for('login'))
 
@@ -1569,24 +1845,7 @@ def settings():
 def market_status():
     """Check if market is open with detailed information"""
     try:
-        now = datetime.now()
-        current_day = now.strftime('%A')
-
-        is_open = is_market_open()
-        is_weekend = now.weekday() >= 5
-
-        status_info = {
-            'is_open': is_open,
-            'is_weekend': is_weekend,
-            'current_day': current_day,
-            'current_time': now.strftime('%H:%M:%S'),
-            'open_time': '09:15',
-            'close_time': '15:30',
-            'message': get_market_status_message(is_open, is_weekend),
-            'timestamp': now.isoformat()
-        }
-
-        return jsonify(status_info)
+        return jsonify(build_market_status())
 
     except Exception as e:
         return jsonify({
@@ -1635,13 +1894,16 @@ def user_settings():
                 settings.max_capital_usage = float(data['max_capital_usage'])
             if 'default_order_type' in data:
                 settings.default_order_type = data['default_order_type']
-            if 'paper_trading_balance' in data:
-                settings.paper_trading_balance = float(data['paper_trading_balance'])
             if 'default_risk_level' in data:
                 settings.default_risk_level = int(data['default_risk_level'])
 
             db.session.commit()
 
+            if 'paper_trading_balance' in data:
+                # Paper balance is owned by the write-behind cache
+                paper_cache.set_balance(current_user.id, float(data['paper_trading_balance']))
+
+            invalidate_user_caches(current_user.id)
             kite_status = test_kite_connection(settings)
 
             socketio.emit('user_notification', {
@@ -1674,7 +1936,7 @@ def user_settings():
                 'default_max_duration': settings.default_max_duration,
                 'max_capital_usage': settings.max_capital_usage,
                 'default_order_type': settings.default_order_type,
-                'paper_trading_balance': settings.paper_trading_balance,
+                'paper_trading_balance': paper_cache.get_balance(current_user.id),
                 'default_risk_level': settings.default_risk_level,
                 'kite_status': kite_status
             })
@@ -1693,9 +1955,7 @@ def user_settings():
 def kite_connection_status():
     """Check Kite connection status"""
     try:
-        settings = UserSettings.query.filter_by(user_id=current_user.id).first()
-        status = test_kite_connection(settings)
-        return jsonify(status)
+        return jsonify(cached_kite_status(current_user.id))
     except Exception as e:
         return jsonify({'connected': False, 'message': str(e)})
 
@@ -1703,113 +1963,13 @@ def kite_connection_status():
 @login_required
 def wallet_balance():
     """Get wallet balance for both live and paper trading"""
+    trading_mode = request.args.get('mode', 'paper')  # Default to paper trading
     try:
-        trading_mode = request.args.get('mode', 'paper')  # Default to paper trading
-        
-        if trading_mode == 'live':
-            settings = UserSettings.query.filter_by(user_id=current_user.id).first()
-
-            if not settings or not settings.kite_api_key or not settings.kite_access_token:
-                return jsonify({
-                    'error': '❌ Zerodha credentials not configured. Please go to Settings and enter your API credentials.',
-                    'balance': 0,
-                    'portfolio_value': 0,
-                    'realized_pnl': 0,
-                    'unrealized_pnl': 0,
-                    'total_pnl': 0,
-                    'net_pnl': 0,
-                    'total_brokerage': 0,
-                    'currency': 'INR',
-                    'mode': 'live'
-                })
-
-            if live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
-                balance_data = live_trading.get_live_balance()
-                if balance_data['success']:
-                    pnl_data = live_trading.get_live_pnl(current_user.id)
-                    return jsonify({
-                        'balance': balance_data['available_cash'],
-                        'portfolio_value': pnl_data['portfolio_value'],
-                        'realized_pnl': pnl_data['realized_pnl'],
-                        'unrealized_pnl': pnl_data['unrealized_pnl'],
-                        'total_pnl': pnl_data['total_pnl'],
-                        'net_pnl': pnl_data['net_pnl'],
-                        'total_brokerage': 0,
-                        'currency': 'INR',
-                        'mode': 'live',
-                        'note': f'Actual Zerodha Wallet Balance: ₹{balance_data["available_cash"]:.2f}',
-                    })
-                else:
-                    return jsonify({
-                        'error': f'❌ Failed to fetch Zerodha balance: {balance_data.get("error", "Unknown error")}',
-                        'balance': 0,
-                        'portfolio_value': 0,
-                        'realized_pnl': 0,
-                        'unrealized_pnl': 0,
-                        'total_pnl': 0,
-                        'net_pnl': 0,
-                        'total_brokerage': 0,
-                        'currency': 'INR',
-                        'mode': 'live'
-                    })
-            else:
-                return jsonify({
-                    'error': '❌ Failed to connect to Zerodha. Please check your API credentials.',
-                    'balance': 0,
-                    'portfolio_value': 0,
-                    'realized_pnl': 0,
-                    'unrealized_pnl': 0,
-                    'total_pnl': 0,
-                    'net_pnl': 0,
-                    'total_brokerage': 0,
-                    'currency': 'INR',
-                    'mode': 'live'
-                })
-        
-        else:  # Paper trading
-            balance_data = paper_trading.get_paper_balance(current_user.id)
-            if balance_data['success']:
-                pnl_data = paper_trading.get_paper_pnl(current_user.id)
-                return jsonify({
-                    'balance': balance_data['paper_balance'],
-                    'portfolio_value': pnl_data['portfolio_value'],
-                    'realized_pnl': pnl_data['realized_pnl'],
-                    'unrealized_pnl': pnl_data['unrealized_pnl'],
-                    'total_pnl': pnl_data['total_pnl'],
-                    'net_pnl': pnl_data['net_pnl'],
-                    'total_brokerage': 0,
-                    'currency': 'INR',
-                    'mode': 'paper',
-                    'note': f'Paper Trading Balance: ₹{balance_data["paper_balance"]:.2f}',
-                })
-            else:
-                return jsonify({
-                    'error': f'❌ Failed to get paper balance: {balance_data.get("error", "Unknown error")}',
-                    'balance': 0,
-                    'portfolio_value': 0,
-                    'realized_pnl': 0,
-                    'unrealized_pnl': 0,
-                    'total_pnl': 0,
-                    'net_pnl': 0,
-                    'total_brokerage': 0,
-                    'currency': 'INR',
-                    'mode': 'paper'
-                })
+        return jsonify(wallet_payload(trading_mode, account_state(current_user.id, trading_mode)))
 
     except Exception as e:
-        print(f"❌ Wallet balance error: {e}")
-        return jsonify({
-            'error': f'❌ Failed to get wallet balance: {str(e)}',
-            'balance': 0,
-            'portfolio_value': 0,
-            'realized_pnl': 0,
-            'unrealized_pnl': 0,
-            'total_pnl': 0,
-            'net_pnl': 0,
-            'total_brokerage': 0,
-            'currency': 'INR',
-            'mode': 'paper'
-        }), 200
+        logger.error(f"❌ Wallet balance error: {e}")
+        return jsonify(dict(WALLET_ZERO, error=f'❌ Failed to get wallet balance: {str(e)}', mode=trading_mode)), 200
 
 @app.route('/api/reset_paper_portfolio', methods=['POST'])
 @login_required
@@ -1817,6 +1977,7 @@ def reset_paper_portfolio():
     """Reset paper trading portfolio to initial state"""
     try:
         result = paper_trading.reset_paper_portfolio(current_user.id)
+        invalidate_user_caches(current_user.id)
         
         if result['success']:
             socketio.emit('user_notification', {
@@ -1875,39 +2036,7 @@ def debug_zerodha_balance():
 def get_active_bots():
     """Get active trading bots for current user"""
     try:
-        active_sessions = BotSession.query.filter_by(
-            user_id=current_user.id,
-            status='running'
-        ).all()
-
-        bots_data = []
-        for session_row in active_sessions:
-            if session_row.trading_mode == 'live':
-                pnl_data = live_trading.get_live_pnl(current_user.id)
-                current_net_pnl = pnl_data['net_pnl']
-            else:
-                pnl_data = paper_trading.get_paper_pnl(current_user.id)
-                current_net_pnl = pnl_data['net_pnl']
-
-            bots_data.append({
-                'id': session_row.id,
-                'instrument_type': session_row.instrument_type,
-                'strategy_name': session_row.strategy_name,
-                'trading_mode': session_row.trading_mode,
-                'initial_capital': float(session_row.initial_capital),
-                'current_capital': float(session_row.current_capital) if session_row.current_capital else float(session_row.initial_capital),
-                'started_at': session_row.started_at.isoformat() if session_row.started_at else None,
-                'status': session_row.status,
-                'pnl': float(session_row.pnl) if session_row.pnl else 0.0,
-                'target_profit': float(session_row.target_profit),
-                'max_duration_hours': session_row.max_duration_hours,
-                'total_brokerage': float(session_row.total_brokerage),
-                'order_type': session_row.order_type,
-                'risk_level': session_row.risk_level,
-                'current_net_pnl': current_net_pnl
-            })
-
-        return jsonify(bots_data)
+        return jsonify(build_active_bots(current_user.id))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1922,11 +2051,11 @@ def get_market_watch_data():
         instrument_type = request.args.get('type', 'stocks')
         
         # Get current balance to determine affordable stocks
-        settings = UserSettings.query.filter_by(user_id=current_user.id).first()
-        if not settings or not live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
+        kite = user_kite(current_user.id)
+        if kite is None:
             return jsonify([])
 
-        balance_data = live_trading.get_live_balance()
+        balance_data = live_trading.get_live_balance(kite)
         if not balance_data['success']:
             return jsonify([])
 
@@ -1941,7 +2070,7 @@ def get_market_watch_data():
         return jsonify(live_rows)
 
     except Exception as e:
-        print(f"Market watch error: {e}")
+        logger.error(f"Market watch error: {e}")
         return jsonify([])
 
 @app.route('/api/strategy_parameters/<strategy_name>')
@@ -1965,41 +2094,19 @@ def get_strategy_parameters(strategy_name):
 def validate_strategy_parameters(strategy_name: str, parameters: Dict[str, Any]) -> bool:
     """Validate strategy parameters"""
     try:
-        strategies = strategy_engine.get_available_strategies()
-        strategy_info = next((s for s in strategies if s['name'] == strategy_name), None)
+        logger.debug(f"🔍 Validating parameters for {strategy_name}: {parameters}")
 
-        if not strategy_info:
-            print(f"❌ Strategy not found: {strategy_name}")
+        errors = strategy_registry.validate(strategy_name, parameters)
+        for error in errors:
+            logger.warning(f"❌ {error}")
+        if errors:
             return False
 
-        print(f"🔍 Validating parameters for {strategy_name}: {parameters}")
-
-        for param in strategy_info['parameters']:
-            param_name = param['name']
-            if param_name in parameters:
-                value = parameters[param_name]
-
-                if param['type'] == 'number':
-                    try:
-                        if isinstance(value, str):
-                            value = float(value) if '.' in value else int(value)
-
-                        if 'min' in param and value < param['min']:
-                            print(f"❌ Parameter {param_name} value {value} below minimum {param['min']}")
-                            return False
-                        if 'max' in param and value > param['max']:
-                            print(f"❌ Parameter {param_name} value {value} above maximum {param['max']}")
-                            return False
-
-                    except (ValueError, TypeError):
-                        print(f"❌ Parameter {param_name} is not a valid number: {value}")
-                        return False
-
-        print(f"✅ All parameters validated successfully for {strategy_name}")
+        logger.debug(f"✅ All parameters validated successfully for {strategy_name}")
         return True
 
     except Exception as e:
-        print(f"❌ Validation error: {e}")
+        logger.error(f"❌ Validation error: {e}")
         return False
 
 def can_start_bot(settings, trading_mode: str, capital_required: float) -> Dict[str, Any]:
@@ -2030,8 +2137,9 @@ def can_start_bot(settings, trading_mode: str, capital_required: float) -> Dict[
                     'message': f'❌ {connection_test["message"]}'
                 }
 
-            if live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
-                balance_data = live_trading.get_live_balance()
+            kite = live_trading.client(settings.kite_api_key, settings.kite_access_token)
+            if kite is not None:
+                balance_data = live_trading.get_live_balance(kite)
 
                 if balance_data['success']:
                     available_cash = balance_data['available_cash']
@@ -2063,17 +2171,18 @@ def can_start_bot(settings, trading_mode: str, capital_required: float) -> Dict[
         
         else:  # Paper trading
             # For paper trading, we don't need market hours or API credentials
-            if settings.paper_trading_balance < capital_required:
+            paper_balance = paper_cache.get_balance(settings.user_id)
+            if paper_balance < capital_required:
                 return {
                     'can_start': False,
                     'reason': 'insufficient_balance',
-                    'message': f'❌ Insufficient paper trading balance. Required: ₹{capital_required:.2f}, Available: ₹{settings.paper_trading_balance:.2f}. Please increase your paper trading balance in Settings.'
+                    'message': f'❌ Insufficient paper trading balance. Required: ₹{capital_required:.2f}, Available: ₹{paper_balance:.2f}. Please increase your paper trading balance in Settings.'
                 }
             
             return {
                 'can_start': True,
                 'message': '✅ Paper trading bot can be started.',
-                'available_balance': settings.paper_trading_balance
+                'available_balance': paper_balance
             }
 
     except Exception as e:
@@ -2089,7 +2198,7 @@ def start_bot():
     """Start trading bot with enhanced parameters - BOTH LIVE AND PAPER TRADING"""
     try:
         data = request.json
-        print(f"🚀 Starting bot with data: {data}")
+        logger.info(f"🚀 Starting bot with data: {data}")
 
         strategy_params = data.get('strategy_params', {})
         converted_params = {}
@@ -2201,26 +2310,15 @@ def start_bot():
             started_at=datetime.now()
         )
 
-        # Start thread with the trading session reference
-        thread = threading.Thread(
-            target=run_enhanced_trading_bot,
-            args=(session_row.id, bot_config, trading_session),
-            name=f"BotThread-{session_row.id}"
-        )
-        thread.daemon = True
-        thread.start()
+        # Start the bot as a background task (an OS thread, or a green thread in production)
+        thread = socketio.start_background_task(run_enhanced_trading_bot, session_row.id, bot_config, trading_session)
 
         # Update trading session with thread reference
         trading_session.thread = thread
         trading_sessions[str(session_row.id)] = trading_session
+        invalidate_user_caches(current_user.id)
 
-        log_entry = Log(
-            user_id=current_user.id,
-            message=f"{trading_mode.upper()} Bot started - Target Profit: ₹{bot_config['target_profit']}, Max Duration: {bot_config['max_duration_hours']}h, Capital: ₹{capital}, Order Type: {order_type}, Risk Level: {risk_level}%",
-            level="INFO"
-        )
-        db.session.add(log_entry)
-        db.session.commit()
+        log_event(current_user.id, f"{trading_mode.upper()} Bot started - Target Profit: ₹{bot_config['target_profit']}, Max Duration: {bot_config['max_duration_hours']}h, Capital: ₹{capital}, Order Type: {order_type}, Risk Level: {risk_level}%", "INFO")
 
         success_msg = f"✅ {trading_mode.upper()} Bot started! Target: ₹{bot_config['target_profit']}, Duration: {bot_config['max_duration_hours']}h, Capital: ₹{capital}, Order Type: {order_type}, Risk: {risk_level}%"
         socketio.emit('user_notification', {
@@ -2247,7 +2345,7 @@ def start_bot():
 
     except Exception as e:
         error_msg = f"Failed to start bot: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.error(f"❌ {error_msg}")
 
         socketio.emit('user_notification', {
             'type': 'error',
@@ -2255,13 +2353,7 @@ def start_bot():
             'timestamp': datetime.now().isoformat()
         })
 
-        log_entry = Log(
-            user_id=current_user.id,
-            message=error_msg,
-            level="ERROR"
-        )
-        db.session.add(log_entry)
-        db.session.commit()
+        log_event(current_user.id, error_msg, "ERROR")
 
         return jsonify({'success': False, 'error': error_msg})
 
@@ -2272,7 +2364,7 @@ def stop_bot(session_id):
     try:
         session_row = BotSession.query.get(session_id)
         if session_row and session_row.user_id == current_user.id:
-            print(f"🛑 IMMEDIATE STOP COMMAND for Bot {session_id} - EXITING ALL POSITIONS")
+            logger.info(f"🛑 IMMEDIATE STOP COMMAND for Bot {session_id} - EXITING ALL POSITIONS")
 
             # Set database flags first
             session_row.stop_requested = True
@@ -2290,9 +2382,9 @@ def stop_bot(session_id):
             # EXIT ALL POSITIONS based on trading mode
             exit_result = None
             if session_row.trading_mode == 'live':
-                exit_result = live_trading.exit_all_positions(current_user.id)
+                exit_result = live_trading.exit_all_positions(current_user.id, session_id=session_id)
             else:
-                exit_result = paper_trading.exit_all_positions(current_user.id)
+                exit_result = paper_trading.exit_all_positions(current_user.id, session_id=session_id)
 
             # Update final status
             session_row.status = 'stopped'
@@ -2312,8 +2404,9 @@ def stop_bot(session_id):
 
             # Remove from active sessions
             if session_key in trading_sessions:
-                print(f"🛑 Removing session {session_id} from active sessions")
+                logger.info(f"🛑 Removing session {session_id} from active sessions")
                 del trading_sessions[session_key]
+            invalidate_user_caches(current_user.id)
 
             # Log the stop action
             exit_message = ""
@@ -2322,13 +2415,7 @@ def stop_bot(session_id):
                 if exit_result.get('errors'):
                     exit_message += f" | Errors: {len(exit_result['errors'])}"
 
-            log_entry = Log(
-                user_id=current_user.id,
-                message=f"Bot STOPPED IMMEDIATELY - Session {session_id} | Final P&L: ₹{session_row.pnl:.2f}{exit_message}",
-                level="INFO"
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            log_event(current_user.id, f"Bot STOPPED IMMEDIATELY - Session {session_id} | Final P&L: ₹{session_row.pnl:.2f}{exit_message}", "INFO")
 
             # Notify user
             success_msg = f"🛑 Bot {session_id} STOPPED! Final P&L: ₹{session_row.pnl:.2f}{exit_message}"
@@ -2346,7 +2433,7 @@ def stop_bot(session_id):
                 'exited_positions': exit_result.get('exited_positions', 0) if exit_result else 0
             })
 
-            print(f"✅ Bot {session_id} completely stopped with position exit")
+            logger.info(f"✅ Bot {session_id} completely stopped with position exit")
 
             return jsonify({
                 'success': True,
@@ -2365,7 +2452,7 @@ def stop_bot(session_id):
 
     except Exception as e:
         error_msg = f"Error stopping bot: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.error(f"❌ {error_msg}")
         socketio.emit('user_notification', {
             'type': 'error',
             'message': error_msg,
@@ -2376,21 +2463,25 @@ def stop_bot(session_id):
 @app.route('/api/bot_performance/<int:session_id>')
 @login_required
 def get_bot_performance(session_id):
-    """Get detailed performance metrics for a bot session"""
+    """Per-session performance from the materialized stats row (?mark=0 skips pricing open positions)"""
     try:
-        session_row = BotSession.query.get(session_id)
-        if not session_row or session_row.user_id != current_user.id:
+        row = db.session.query(BotSession, BotSessionStats) \
+            .outerjoin(BotSessionStats, BotSessionStats.session_id == BotSession.id) \
+            .filter(BotSession.id == session_id).first()
+        if not row or row[0].user_id != current_user.id:
             return jsonify({'error': 'Session not found'}), 404
+        session_row, stats_row = row
 
-        if session_row.trading_mode == 'live':
-            pnl_data = live_trading.get_live_pnl(current_user.id)
-            positions = live_trading.get_live_positions(current_user.id)
-        else:
-            pnl_data = paper_trading.get_paper_pnl(current_user.id)
-            positions = paper_trading.get_paper_positions(current_user.id)
+        stats = session_stats.row_to_stats(stats_row) if stats_row else \
+            session_stats.new_stats(session_row.id, session_row.user_id, session_row.initial_capital)
+
+        unrealized_pnl, exposure = 0.0, 0.0
+        if request.args.get('mark', '1') != '0':
+            # Cached last prices only; this endpoint never calls the broker
+            unrealized_pnl, exposure = session_stats.mark(stats, live_trading.last_prices)
 
-        trades = Trade.query.filter_by(bot_session_id=session_id).all()
-        total_brokerage = sum(trade.brokerage for trade in trades)
+        net_pnl = stats['realized_pnl'] + unrealized_pnl - stats['charges']
+        closed_trades = stats['winning_trades'] + stats['losing_trades']
 
         running_time = 0
         if session_row.started_at:
@@ -2404,21 +2495,29 @@ def get_bot_performance(session_id):
             'strategy': session_row.strategy_name,
             'trading_mode': session_row.trading_mode,
             'initial_capital': float(session_row.initial_capital),
-            'current_portfolio_value': pnl_data['portfolio_value'],
-            'total_pnl': pnl_data['total_pnl'],
-            'net_pnl': pnl_data['net_pnl'],
-            'realized_pnl': pnl_data['realized_pnl'],
-            'unrealized_pnl': pnl_data['unrealized_pnl'],
-            'total_brokerage': total_brokerage,
-            'return_percent': (pnl_data['net_pnl'] / session_row.initial_capital) * 100 if session_row.initial_capital > 0 else 0,
-            'trades_count': len(trades),
-            'positions_count': len(positions),
+            'current_portfolio_value': float(session_row.initial_capital) + net_pnl,
+            'total_pnl': stats['realized_pnl'] + unrealized_pnl,
+            'net_pnl': net_pnl,
+            'realized_pnl': stats['realized_pnl'],
+            'unrealized_pnl': unrealized_pnl,
+            'total_brokerage': stats['charges'],
+            'turnover': stats['turnover'],
+            'exposure': exposure,
+            'return_percent': (net_pnl / session_row.initial_capital) * 100 if session_row.initial_capital > 0 else 0,
+            'trades_count': stats['trades_count'],
+            'buy_count': stats['buy_count'],
+            'sell_count': stats['sell_count'],
+            'winning_trades': stats['winning_trades'],
+            'losing_trades': stats['losing_trades'],
+            'win_rate': (stats['winning_trades'] / closed_trades) * 100 if closed_trades else 0,
+            'max_drawdown_percent': stats['max_drawdown'] * 100,
+            'positions_count': len(stats['positions']),
             'running_time_hours': running_time,
             'target_profit': float(session_row.target_profit),
             'max_duration_hours': session_row.max_duration_hours,
             'order_type': session_row.order_type,
             'risk_level': session_row.risk_level,
-            'profit_target_achieved': pnl_data['net_pnl'] >= session_row.target_profit if session_row.target_profit > 0 else False,
+            'profit_target_achieved': net_pnl >= session_row.target_profit if session_row.target_profit > 0 else False,
             'time_remaining_hours': max(0, session_row.max_duration_hours - running_time) if session_row.status == 'running' else 0
         }
 
@@ -2427,54 +2526,145 @@ def get_bot_performance(session_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/equity_curve')
+@login_required
+def get_equity_curve():
+    """Equity/cash/exposure/drawdown series for the account or one of its bots over a time range"""
+    try:
+        scope = request.args.get('scope', 'account')
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow()
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(hours=1)
+        max_points = max(10, min(request.args.get('max_points', 500, type=int), 5000))
+
+        if scope == 'bot':
+            session_row = db.session.get(BotSession, request.args.get('id', type=int) or 0)
+            if not session_row or session_row.user_id != current_user.id:
+                return jsonify({'error': 'Session not found'}), 404
+            scope_id = session_row.id
+        elif scope == 'account':
+            scope_id = current_user.id
+        else:
+            return jsonify({'error': f'Unknown scope: {scope}'}), 400
+
+        return jsonify(equity_store.range(scope, scope_id, start, end, max_points=max_points))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/positions')
 @login_required
 def get_positions():
     """Get current positions for both live and paper trading"""
     try:
         trading_mode = request.args.get('mode', 'paper')
-        
-        if trading_mode == 'live':
-            positions = live_trading.get_live_positions(current_user.id)
-        else:
-            positions = paper_trading.get_paper_positions(current_user.id)
-            
-        return jsonify(positions)
+        return jsonify(account_state(current_user.id, trading_mode).get('positions', []))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def row_dict(row) -> Dict[str, Any]:
+    """Column values of an ORM row, in the same shape as archived rows"""
+    return {column.name: getattr(row, column.name) for column in row.__table__.columns}
+
+def order_data(order: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': order['id'],
+        'symbol': order['symbol'],
+        'action': order['action'],
+        'quantity': order['quantity'],
+        'price': float(order['price']),
+        'order_type': order['order_type'],
+        'product_type': order['product_type'],
+        'status': order['status'],
+        'timestamp': order['timestamp'].isoformat() if order['timestamp'] else None,
+        'trading_mode': order['trading_mode'],
+        'order_id': order['order_id'],
+        'brokerage': float(order['brokerage'] or 0.0)
+    }
+
+def log_data(log: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': log['id'],
+        'message': log['message'],
+        'level': log['level'],
+        'timestamp': log['timestamp'].isoformat() if log['timestamp'] else None
+    }
+
+MAX_PAGE_SIZE = 500
+
+def parse_before_arg():
+    """Optional ?before=<ISO timestamp> paging cursor"""
+    before = request.args.get('before')
+    return datetime.fromisoformat(before) if before else None
+
+def with_archived(rows: List[Dict[str, Any]], table_name: str, limit: int, before,
+                  before_id: int = None, **filters) -> List[Dict[str, Any]]:
+    """Top a short page of hot rows up with archived rows older than the oldest one returned"""
+    if len(rows) >= limit or request.args.get('archived', '0') not in ('1', 'true'):
+        return rows
+    if rows:
+        before, before_id = rows[-1]['timestamp'], rows[-1]['id']
+    return rows + retention.read_archived(table_name, current_user.id, limit - len(rows),
+                                          before=before, before_id=before_id, **filters)
+
+def keyset_page(model, default_limit: int, serialize, **filters):
+    """
+    Newest-first, id-keyset page of a user's rows with a weak ETag.
+
+    ?before_id=N pages backwards, ?after_id=N (or since_id) returns only rows
+    newer than N. The ETag is derived from the newest and oldest matching
+    ids, the row count and the request arguments, so it is checked with one
+    aggregate over the index before the page query runs (deletes and
+    retention change it too); unchanged pages come back as 304.
+    """
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), MAX_PAGE_SIZE))
+    before_id = request.args.get('before_id', type=int)
+    after_id = request.args.get('after_id', type=int)
+    if after_id is None:
+        after_id = request.args.get('since_id', type=int)
+    before = parse_before_arg()
+
+    conditions = [getattr(model, column) == value for column, value in filters.items()]
+    latest_id, oldest_id, count = db.session.query(
+        func.max(model.id), func.min(model.id), func.count(model.id)).filter(*conditions).one()
+    latest_id = latest_id or 0
+
+    args = '&'.join(f"{key}={value}" for key, value in sorted(request.args.items()))
+    etag = f"{model.__tablename__}-{current_user.id}-{latest_id}-{oldest_id or 0}-{count}-{args}"
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    query = model.query.filter(*conditions)
+    if after_id is not None:
+        # Deltas: the oldest `limit` rows after the cursor, returned newest first
+        rows = query.filter(model.id > after_id).order_by(model.id.asc()).limit(limit).all()[::-1]
+        rows = [row_dict(row) for row in rows]
+    else:
+        if before_id is not None:
+            query = query.filter(model.id < before_id)
+        if before is not None:
+            query = query.filter(model.timestamp < before)
+        rows = [row_dict(row) for row in query.order_by(model.id.desc()).limit(limit).all()]
+        archive_filters = {k: v for k, v in filters.items() if k != 'user_id'}
+        rows = with_archived(rows, model.__tablename__, limit, before, before_id=before_id, **archive_filters)
+
+    response = jsonify([serialize(row) for row in rows])
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Latest-Id'] = str(latest_id)
+    if rows:
+        response.headers['X-Next-Before-Id'] = str(rows[-1]['id'])
+    return response
+
 @app.route('/api/orders')
 @login_required
 def get_orders():
-    """Get order history for both live and paper trading"""
+    """Get order history for both live and paper trading (keyset paged, ?archived=1 pages into the archive)"""
     try:
-        limit = request.args.get('limit', 50, type=int)
         trading_mode = request.args.get('mode', 'paper')
-
-        orders = Trade.query.filter_by(
-            user_id=current_user.id,
-            trading_mode=trading_mode
-        ).order_by(Trade.timestamp.desc()).limit(limit).all()
-
-        orders_data = []
-        for order in orders:
-            orders_data.append({
-                'id': order.id,
-                'symbol': order.symbol,
-                'action': order.action,
-                'quantity': order.quantity,
-                'price': float(order.price),
-                'order_type': order.order_type,
-                'product_type': order.product_type,
-                'status': order.status,
-                'timestamp': order.timestamp.isoformat() if order.timestamp else None,
-                'trading_mode': order.trading_mode,
-                'order_id': order.order_id,
-                'brokerage': float(order.brokerage)
-            })
-
-        return jsonify(orders_data)
+        return keyset_page(Trade, 50, order_data, user_id=current_user.id, trading_mode=trading_mode)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -2482,21 +2672,9 @@ def get_orders():
 @app.route('/api/logs')
 @login_required
 def get_logs():
-    """Get application logs"""
+    """Get application logs (keyset paged, ?archived=1 pages into the archive)"""
     try:
-        limit = request.args.get('limit', 100, type=int)
-        logs = Log.query.filter_by(user_id=current_user.id).order_by(Log.timestamp.desc()).limit(limit).all()
-
-        logs_data = []
-        for log in logs:
-            logs_data.append({
-                'id': log.id,
-                'message': log.message,
-                'level': log.level,
-                'timestamp': log.timestamp.isoformat() if log.timestamp else None
-            })
-
-        return jsonify(logs_data)
+        return keyset_page(Log, 100, log_data, user_id=current_user.id)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -2505,119 +2683,13 @@ def get_logs():
 @login_required
 def get_portfolio_summary():
     """Get portfolio summary with brokerage details for both live and paper trading"""
+    trading_mode = request.args.get('mode', 'paper')
     try:
-        trading_mode = request.args.get('mode', 'paper')
-        
-        if trading_mode == 'live':
-            settings = UserSettings.query.filter_by(user_id=current_user.id).first()
-
-            if not settings or not settings.kite_api_key or not settings.kite_access_token:
-                return jsonify({
-                    'error': '❌ Zerodha credentials not configured. Please go to Settings and enter your API credentials.',
-                    'available_cash': 0,
-                    'portfolio_value': 0,
-                    'realized_pnl': 0,
-                    'unrealized_pnl': 0,
-                    'total_pnl': 0,
-                    'net_pnl': 0,
-                    'mode': 'live'
-                })
-
-            if live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
-                balance_data = live_trading.get_live_balance()
-                pnl_data = live_trading.get_live_pnl(current_user.id)
-                positions = live_trading.get_live_positions(current_user.id)
-
-                if balance_data['success']:
-                    return jsonify({
-                        'initial_capital': balance_data['available_cash'],
-                        'available_cash': balance_data['available_cash'],
-                        'portfolio_value': pnl_data['portfolio_value'],
-                        'realized_pnl': pnl_data['realized_pnl'],
-                        'unrealized_pnl': pnl_data['unrealized_pnl'],
-                        'total_pnl': pnl_data['total_pnl'],
-                        'net_pnl': pnl_data['net_pnl'],
-                        'return_percent': (pnl_data['net_pnl'] / balance_data['available_cash']) * 100 if balance_data['available_cash'] > 0 else 0,
-                        'total_charges': 0,
-                        'total_brokerage': 0,
-                        'positions_count': len(positions),
-                        'trades_count': len(positions),
-                        'used_capital': pnl_data.get('total_invested', 0),
-                        'capital_usage_percent': (pnl_data.get('total_invested', 0) / balance_data['available_cash']) * 100 if balance_data['available_cash'] > 0 else 0,
-                        'mode': 'live',
-                        'note': 'Real Zerodha data'
-                    })
-                else:
-                    return jsonify({
-                        'error': f'❌ Failed to fetch Zerodha data: {balance_data.get("error", "Unknown error")}',
-                        'available_cash': 0,
-                        'portfolio_value': 0,
-                        'realized_pnl': 0,
-                        'unrealized_pnl': 0,
-                        'total_pnl': 0,
-                        'net_pnl': 0,
-                        'mode': 'live'
-                    })
-            else:
-                return jsonify({
-                    'error': '❌ Failed to connect to Zerodha. Please check your API credentials.',
-                    'available_cash': 0,
-                    'portfolio_value': 0,
-                    'realized_pnl': 0,
-                    'unrealized_pnl': 0,
-                    'total_pnl': 0,
-                    'net_pnl': 0,
-                    'mode': 'live'
-                })
-        
-        else:  # Paper trading
-            balance_data = paper_trading.get_paper_balance(current_user.id)
-            pnl_data = paper_trading.get_paper_pnl(current_user.id)
-            positions = paper_trading.get_paper_positions(current_user.id)
-            
-            if balance_data['success']:
-                return jsonify({
-                    'initial_capital': balance_data['paper_balance'],
-                    'available_cash': balance_data['paper_balance'],
-                    'portfolio_value': pnl_data['portfolio_value'],
-                    'realized_pnl': pnl_data['realized_pnl'],
-                    'unrealized_pnl': pnl_data['unrealized_pnl'],
-                    'total_pnl': pnl_data['total_pnl'],
-                    'net_pnl': pnl_data['net_pnl'],
-                    'return_percent': (pnl_data['net_pnl'] / balance_data['paper_balance']) * 100 if balance_data['paper_balance'] > 0 else 0,
-                    'total_charges': 0,
-                    'total_brokerage': 0,
-                    'positions_count': len(positions),
-                    'trades_count': len(positions),
-                    'used_capital': pnl_data.get('total_invested', 0),
-                    'capital_usage_percent': (pnl_data.get('total_invested', 0) / balance_data['paper_balance']) * 100 if balance_data['paper_balance'] > 0 else 0,
-                    'mode': 'paper',
-                    'note': 'Paper Trading Simulation'
-                })
-            else:
-                return jsonify({
-                    'error': f'❌ Failed to get paper trading data: {balance_data.get("error", "Unknown error")}',
-                    'available_cash': 0,
-                    'portfolio_value': 0,
-                    'realized_pnl': 0,
-                    'unrealized_pnl': 0,
-                    'total_pnl': 0,
-                    'net_pnl': 0,
-                    'mode': 'paper'
-                })
+        return jsonify(portfolio_payload(trading_mode, account_state(current_user.id, trading_mode)))
 
     except Exception as e:
-        print(f"❌ Portfolio summary error: {e}")
-        return jsonify({
-            'error': f'❌ Failed to get portfolio summary: {str(e)}',
-            'available_cash': 0,
-            'portfolio_value': 0,
-            'realized_pnl': 0,
-            'unrealized_pnl': 0,
-            'total_pnl': 0,
-            'net_pnl': 0,
-            'mode': 'paper'
-        }), 200
+        logger.error(f"❌ Portfolio summary error: {e}")
+        return jsonify(dict(PORTFOLIO_ZERO, error=f'❌ Failed to get portfolio summary: {str(e)}', mode=trading_mode)), 200
 
 def validate_trade_affordability(user_id: int, symbol: str, action: str, quantity: int, price: float, product_type: str = 'CNC', trading_mode: str = 'paper') -> Dict[str, Any]:
     """
@@ -2630,11 +2702,11 @@ def validate_trade_affordability(user_id: int, symbol: str, action: str, quantit
             brokerage = live_trading.calculate_zerodha_brokerage(trade_value, action, product_type)
             total_cost = trade_value + brokerage if action.upper() == 'BUY' else 0
 
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            if not settings or not live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
+            kite = user_kite(user_id)
+            if kite is None:
                 return {'can_afford': False, 'error': 'Live trading not configured'}
             
-            balance_data = live_trading.get_live_balance()
+            balance_data = live_trading.get_live_balance(kite)
             if not balance_data['success']:
                 return {'can_afford': False, 'error': f'Failed to check balance: {balance_data.get("error")}'}
             
@@ -2651,31 +2723,29 @@ def validate_trade_affordability(user_id: int, symbol: str, action: str, quantit
             brokerage = paper_trading.calculate_paper_brokerage(trade_value, action, product_type)
             total_cost = trade_value + brokerage if action.upper() == 'BUY' else 0
             
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            if not settings:
-                return {'can_afford': False, 'error': 'User settings not found'}
+            paper_balance = paper_cache.get_balance(user_id)
             
-            if action.upper() == 'BUY' and total_cost > settings.paper_trading_balance:
+            if action.upper() == 'BUY' and total_cost > paper_balance:
                 return {
                     'can_afford': False,
-                    'error': f'❌ PAPER: Insufficient balance. Required: ₹{total_cost:.2f}, Available: ₹{settings.paper_trading_balance:.2f}'
+                    'error': f'❌ PAPER: Insufficient balance. Required: ₹{total_cost:.2f}, Available: ₹{paper_balance:.2f}'
                 }
             
             # For SELL orders, check if we have the position
             if action.upper() == 'SELL':
-                position = PaperPosition.query.filter_by(user_id=user_id, symbol=symbol).first()
-                if not position or position.quantity < quantity:
+                position = paper_cache.get_position(user_id, symbol)
+                if not position or position['quantity'] < quantity:
                     return {
                         'can_afford': False,
-                        'error': f'❌ PAPER: Insufficient shares to sell. Requested: {quantity}, Available: {position.quantity if position else 0}'
+                        'error': f'❌ PAPER: Insufficient shares to sell. Requested: {quantity}, Available: {position["quantity"] if position else 0}'
                     }
             
-            return {'can_afford': True, 'available_cash': settings.paper_trading_balance}
+            return {'can_afford': True, 'available_cash': paper_balance}
             
     except Exception as e:
         return {'can_afford': False, 'error': f'Validation error: {str(e)}'}
 
-def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any]):
+def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any], trace: Trace = None):
     """Execute trade with capital validation and position tracking - BOTH LIVE AND PAPER"""
     try:
         user_id = config['user_id']
@@ -2690,15 +2760,9 @@ def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any
         # Skip trade-to-trade stocks for MIS orders (only for live trading)
         if trading_mode == 'live' and product_type == 'MIS' and live_trading._is_trade_to_trade_stock(signal['symbol']):
             error_msg = f"❌ TRADE-TO-TRADE STOCK: {signal['symbol']} cannot be traded intraday (MIS). This is a trade-to-trade stock."
-            print(error_msg)
+            bot_logger.warning(error_msg, extra={'bot_id': session_id})
             
-            log_entry = Log(
-                user_id=user_id,
-                message=error_msg,
-                level="WARNING"
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            log_event(user_id, error_msg, "WARNING")
 
             socketio.emit('user_notification', {
                 'type': 'warning',
@@ -2708,9 +2772,10 @@ def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any
             return  # STOP execution - cannot trade this stock intraday
 
         # Get current price from Zerodha (for both live and paper trading)
-        quotes = live_trading.get_market_quotes([signal['symbol']])
+        with tracer.span(trace, 'price_check'):
+            quotes = live_trading.get_market_quotes([signal['symbol']])
         if not quotes:
-            print(f"❌ Could not get current price for {signal['symbol']}")
+            bot_logger.warning(f"❌ Could not get current price for {signal['symbol']}", extra={'bot_id': session_id})
             return
 
         current_price = quotes[0]['last_price']
@@ -2720,30 +2785,25 @@ def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any
         else:
             execution_price = round(current_price * 0.998, 2)  # Slightly below current
 
-        print(f"🎯 Attempting {signal['action']} trade for {signal['symbol']} at {execution_price:.2f} ({product_type}) - Mode: {trading_mode} - Risk: {risk_level}%")
+        bot_logger.debug("🎯 Attempting %s trade for %s at %.2f (%s) - Mode: %s - Risk: %s%%", signal['action'], signal['symbol'], execution_price, product_type, trading_mode, risk_level, extra={'bot_id': session_id})
 
         # CRITICAL FIX: Validate affordability BEFORE attempting trade
-        validation_result = validate_trade_affordability(
-            user_id=user_id,
-            symbol=signal['symbol'],
-            action=signal['action'],
-            quantity=signal['quantity'],
-            price=execution_price,
-            product_type=product_type,
-            trading_mode=trading_mode
-        )
+        with tracer.span(trace, 'validate'):
+            validation_result = validate_trade_affordability(
+                user_id=user_id,
+                symbol=signal['symbol'],
+                action=signal['action'],
+                quantity=signal['quantity'],
+                price=execution_price,
+                product_type=product_type,
+                trading_mode=trading_mode
+            )
 
         if not validation_result['can_afford']:
             error_msg = validation_result['error']
-            print(f"❌ {error_msg}")
+            bot_logger.warning(f"❌ {error_msg}", extra={'bot_id': session_id})
             
-            log_entry = Log(
-                user_id=user_id,
-                message=error_msg,
-                level="WARNING"
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            log_event(user_id, error_msg, "WARNING")
 
             socketio.emit('user_notification', {
                 'type': 'warning',
@@ -2753,12 +2813,28 @@ def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any
             return  # STOP execution - cannot afford this trade
 
         # If we can afford, proceed with trade execution
-        print(f"✅ Affordability check passed. Proceeding with {trading_mode} trade...")
+        bot_logger.debug("✅ Affordability check passed. Proceeding with %s trade...", trading_mode, extra={'bot_id': session_id})
 
         if trading_mode == 'live':
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            if settings and live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
-                result = live_trading.place_order(
+            kite = user_kite(user_id)
+            if kite is not None:
+                with tracer.span(trace, ORDER_STAGE):
+                    result = live_trading.place_order(
+                        symbol=signal['symbol'],
+                        action=signal['action'],
+                        quantity=signal['quantity'],
+                        price=execution_price,
+                        user_id=user_id,
+                        product_type=product_type,
+                        kite=kite
+                    )
+            else:
+                error_msg = "Cannot execute LIVE trade: Kite not initialized or settings not found"
+                log_event(user_id, error_msg, "ERROR")
+                return
+        else:  # Paper trading
+            with tracer.span(trace, ORDER_STAGE):
+                result = paper_trading.place_paper_order(
                     symbol=signal['symbol'],
                     action=signal['action'],
                     quantity=signal['quantity'],
@@ -2766,28 +2842,10 @@ def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any
                     user_id=user_id,
                     product_type=product_type
                 )
-            else:
-                error_msg = "Cannot execute LIVE trade: Kite not initialized or settings not found"
-                log_entry = Log(
-                    user_id=user_id,
-                    message=error_msg,
-                    level="ERROR"
-                )
-                db.session.add(log_entry)
-                db.session.commit()
-                return
-        else:  # Paper trading
-            result = paper_trading.place_paper_order(
-                symbol=signal['symbol'],
-                action=signal['action'],
-                quantity=signal['quantity'],
-                price=execution_price,
-                user_id=user_id,
-                product_type=product_type
-            )
 
         if result['success']:
-            trade = Trade(
+            db_write_started = time_module.perf_counter()
+            record_fill(dict(
                 user_id=user_id,
                 bot_session_id=session_id,
                 symbol=signal['symbol'],
@@ -2799,24 +2857,16 @@ def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any
                 order_id=result.get('order_id'),
                 brokerage=result.get('brokerage', 0.0),
                 product_type=result.get('product_type', product_type)
-            )
-            db.session.add(trade)
-
-            session_row = BotSession.query.get(session_id)
-            if session_row:
-                session_row.total_brokerage += result.get('brokerage', 0.0)
+            ), session_id=session_id)
+            equity_store.on_fill(session_id, config.get('capital', 0.0), signal['symbol'], signal['action'],
+                                 signal['quantity'], execution_price, result.get('brokerage', 0.0))
+            tracer.record(trace, 'db_write', db_write_started, time_module.perf_counter())
+            invalidate_user_caches(user_id)
 
-            db.session.commit()
-
-            log_entry = Log(
-                user_id=user_id,
-                message=f"{trading_mode.upper()} Trade executed: {signal['action']} {signal['quantity']} {signal['symbol']} @ {execution_price:.2f} | Order: {result.get('order_id')} | Product: {result.get('product_type', product_type)} | Brokerage: ₹{result.get('brokerage', 0.0):.2f} | Risk: {risk_level}%",
-                level="INFO"
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            log_event(user_id, f"{trading_mode.upper()} Trade executed: {signal['action']} {signal['quantity']} {signal['symbol']} @ {execution_price:.2f} | Order: {result.get('order_id')} | Product: {result.get('product_type', product_type)} | Brokerage: ₹{result.get('brokerage', 0.0):.2f} | Risk: {risk_level}%", "INFO")
 
             # Emit position update
+            emit_started = time_module.perf_counter()
             if trading_mode == 'live':
                 positions = live_trading.get_live_positions(user_id)
             else:
@@ -2846,17 +2896,13 @@ def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any
                 'product_type': result.get('product_type', product_type),
                 'risk_level': risk_level,
                 'mode': trading_mode,
+                'trace_id': trace.trace_id if trace else None,
                 'timestamp': datetime.now().isoformat()
             })
+            tracer.record(trace, 'emit', emit_started, time_module.perf_counter())
         else:
             error_msg = f"{trading_mode.upper()} Trade failed: {result.get('error', 'Unknown error')}"
-            log_entry = Log(
-                user_id=user_id,
-                message=error_msg,
-                level="ERROR"
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            log_event(user_id, error_msg, "ERROR")
 
             socketio.emit('user_notification', {
                 'type': 'error',
@@ -2868,13 +2914,7 @@ def execute_trade(session_id: int, config: Dict[str, Any], signal: Dict[str, Any
 
     except Exception as e:
         error_msg = f"Trade execution error: {str(e)}"
-        log_entry = Log(
-            user_id=config['user_id'],
-            message=error_msg,
-            level="ERROR"
-        )
-        db.session.add(log_entry)
-        db.session.commit()
+        log_event(config['user_id'], error_msg, "ERROR")
 
         socketio.emit('user_notification', {
             'type': 'error',
@@ -2886,23 +2926,22 @@ def get_available_cash(user_id: int, trading_mode: str) -> float:
     """Get available cash for trading"""
     try:
         if trading_mode == 'live':
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            if settings and live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
-                balance_data = live_trading.get_live_balance()
+            kite = user_kite(user_id)
+            if kite is not None:
+                balance_data = live_trading.get_live_balance(kite)
                 if balance_data['success']:
                     return balance_data['available_cash']
             return 0.0
         else:  # Paper trading
-            settings = UserSettings.query.filter_by(user_id=user_id).first()
-            if settings:
-                return settings.paper_trading_balance
-            return 0.0
+            return paper_cache.get_balance(user_id)
     except Exception as e:
-        print(f"Error getting available cash: {e}")
+        logger.error(f"Error getting available cash: {e}")
         return 0.0
 
 def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_session: TradingSession):
     """Enhanced trading bot with capital validation and position tracking - BOTH LIVE AND PAPER"""
+    profiling = None
+    strategy = None
     with app.app_context():
         try:
             strategy = strategy_engine.get_strategy(config['strategy'], config['strategy_params'])
@@ -2914,7 +2953,7 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
             symbols = get_affordable_stocks(config['user_id'], current_balance, config.get('max_capital_usage', 0.8))
             
             if not symbols:
-                print(f"❌ No affordable stocks found for bot {session_id}. Stopping bot.")
+                bot_logger.warning(f"❌ No affordable stocks found for bot {session_id}. Stopping bot.", extra={'bot_id': session_id})
                 session_row = BotSession.query.get(session_id)
                 if session_row:
                     session_row.status = 'stopped'
@@ -2922,24 +2961,21 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
                     db.session.commit()
                 return
             
-            print(f"🎯 Bot {session_id} selected {len(symbols)} affordable stocks for wallet: ₹{current_balance:.2f} - Mode: {trading_mode} - Risk: {risk_level}%")
-            print(f"📊 Stocks: {symbols}")
+            bot_logger.info(f"🎯 Bot {session_id} selected {len(symbols)} affordable stocks for wallet: ₹{current_balance:.2f} - Mode: {trading_mode} - Risk: {risk_level}%", extra={'bot_id': session_id})
+            bot_logger.debug(f"📊 Stocks: {symbols}", extra={'bot_id': session_id})
 
-            log_entry = Log(
-                user_id=config['user_id'],
-                message=f"{trading_mode.upper()} Bot {session_id} started with profit target: ₹{config['target_profit']}, max duration: {config['max_duration_hours']}h, capital: ₹{config['capital']}, affordable stocks: {len(symbols)}, order type: {config.get('order_type', 'CNC')}, risk level: {risk_level}%",
-                level="INFO"
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            log_event(config['user_id'], f"{trading_mode.upper()} Bot {session_id} started with profit target: ₹{config['target_profit']}, max duration: {config['max_duration_hours']}h, capital: ₹{config['capital']}, affordable stocks: {len(symbols)}, order type: {config.get('order_type', 'CNC')}, risk level: {risk_level}%", "INFO")
 
-            print(f"🤖 {trading_mode.upper()} Bot {session_id} started! Target: ₹{config['target_profit']}, Duration: {config['max_duration_hours']}h, Capital: ₹{config['capital']}, Order Type: {config.get('order_type', 'CNC')}, Risk: {risk_level}%")
+            bot_logger.info(f"🤖 {trading_mode.upper()} Bot {session_id} started! Target: ₹{config['target_profit']}, Duration: {config['max_duration_hours']}h, Capital: ₹{config['capital']}, Order Type: {config.get('order_type', 'CNC')}, Risk: {risk_level}%", extra={'bot_id': session_id})
 
             session_row = BotSession.query.get(session_id)
             iteration = 0
             start_time = datetime.now()
 
             while session_row and session_row.status == 'running':
+                iteration_started = time_module.perf_counter()
+                profiling = profiler.begin('bot', session_id)
+
                 # THREAD-SAFE STOP CHECK
                 if (trading_session.should_stop or
                     not session_row or
@@ -2947,7 +2983,7 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
                     session_row.force_stop or
                     session_row.status != 'running'):
 
-                    print(f"🛑 IMMEDIATE STOP DETECTED for Bot {session_id}. Exiting NOW!")
+                    bot_logger.info(f"🛑 IMMEDIATE STOP DETECTED for Bot {session_id}. Exiting NOW!", extra={'bot_id': session_id})
 
                     # Final cleanup
                     if session_row:
@@ -2970,7 +3006,7 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
                 running_hours = (current_time - start_time).total_seconds() / 3600
 
                 if running_hours >= config['max_duration_hours']:
-                    print(f"⏰ Bot {session_id} reached max duration ({config['max_duration_hours']}h). Stopping...")
+                    bot_logger.info(f"⏰ Bot {session_id} reached max duration ({config['max_duration_hours']}h). Stopping...", extra={'bot_id': session_id})
                     session_row.status = 'completed'
                     session_row.stopped_at = current_time
                     db.session.commit()
@@ -2989,7 +3025,7 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
                         pnl_data = paper_trading.get_paper_pnl(config['user_id'])
                         
                     if config['target_profit'] > 0 and pnl_data['net_pnl'] >= config['target_profit']:
-                        print(f"🎯 Bot {session_id} achieved profit target! P&L: ₹{pnl_data['net_pnl']:.2f}")
+                        bot_logger.info(f"🎯 Bot {session_id} achieved profit target! P&L: ₹{pnl_data['net_pnl']:.2f}", extra={'bot_id': session_id})
                         session_row.status = 'completed'
                         session_row.stopped_at = current_time
                         session_row.pnl = pnl_data['net_pnl']
@@ -2997,8 +3033,10 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
                         break
 
                     # Generate market data for affordable symbols from Zerodha
+                    tick = tracer.start_tick(session_id, config['user_id'], config['strategy'], trading_mode)
                     market_data_dict = {}
-                    quotes = live_trading.get_market_quotes(symbols)
+                    with tracer.span(tick, 'quote_fetch'):
+                        quotes = live_trading.get_market_quotes(symbols)
                     for quote in quotes:
                         market_data_dict[quote['symbol']] = {
                             'symbol': quote['symbol'],
@@ -3014,27 +3052,29 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
                         current_positions = paper_trading.get_paper_positions(config['user_id'])
 
                     # Generate signals with capital validation
-                    signals = strategy.generate_signals(
-                        market_data_dict, 
-                        current_positions,
-                        available_cash=available_cash
-                    )
+                    with metrics.timer('generate_signals_seconds', strategy=config['strategy']), \
+                            tracer.span(tick, 'generate_signals'):
+                        signals = strategy.evaluate(
+                            market_data_dict,
+                            current_positions,
+                            available_cash=available_cash
+                        )
 
                     if signals:
-                        print(f"📈 Bot {session_id} generated {len(signals)} AFFORDABLE signals (Risk: {risk_level}%)")
+                        bot_logger.debug("📈 Bot %s generated %d AFFORDABLE signals (Risk: %s%%)", session_id, len(signals), risk_level, extra={'bot_id': session_id})
                         for signal in signals:
                             # ULTRA-FAST stop check before each trade execution
                             if trading_session.should_stop:
-                                print(f"🛑 STOP detected during trade execution. ABORTING ALL TRADES.")
+                                bot_logger.info(f"🛑 STOP detected during trade execution. ABORTING ALL TRADES.", extra={'bot_id': session_id})
                                 break
 
                             # Also check database flags
                             session_row = BotSession.query.get(session_id)
                             if not session_row or session_row.stop_requested or session_row.force_stop or session_row.status != 'running':
-                                print(f"🛑 Database stop detected. ABORTING TRADES.")
+                                bot_logger.info(f"🛑 Database stop detected. ABORTING TRADES.", extra={'bot_id': session_id})
                                 break
 
-                            execute_trade(session_id, config, signal)
+                            execute_trade(session_id, config, signal, trace=tick.child())
                     else:
                         if iteration % 10 == 0:
                             if trading_mode == 'live':
@@ -3042,49 +3082,44 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
                             else:
                                 pnl_data = paper_trading.get_paper_pnl(config['user_id'])
                                 
-                            log_entry = Log(
-                                user_id=config['user_id'],
-                                message=f"Bot {session_id} running - P&L: ₹{pnl_data['net_pnl']:.2f}, Positions: {len(current_positions)}, Risk: {risk_level}%",
-                                level="DEBUG"
-                            )
-                            db.session.add(log_entry)
-                            db.session.commit()
+                            log_event(config['user_id'], f"Bot {session_id} running - P&L: ₹{pnl_data['net_pnl']:.2f}, Positions: {len(current_positions)}, Risk: {risk_level}%", "DEBUG")
 
                     iteration += 1
 
                 # Ultra-fast stop check before sleep
                 if trading_session.should_stop:
-                    print(f"🛑 Thread stop flag detected. Exiting immediately.")
+                    bot_logger.info(f"🛑 Thread stop flag detected. Exiting immediately.", extra={'bot_id': session_id})
                     break
 
                 session_row = BotSession.query.get(session_id)
                 if not session_row or session_row.stop_requested or session_row.force_stop or session_row.status != 'running':
-                    print(f"🛑 Database stop flags detected. Exiting immediately.")
+                    bot_logger.info(f"🛑 Database stop flags detected. Exiting immediately.", extra={'bot_id': session_id})
                     break
 
+                profiler.end(profiling)
+                profiling = None
+                metrics.observe('bot_iteration_seconds', time_module.perf_counter() - iteration_started,
+                                strategy=config['strategy'], mode=trading_mode)
+
                 # Interruptible short sleep (5s total)
                 for _ in range(50):
                     if trading_session.should_stop:
-                        print(f"🛑 Stop detected during sleep. Breaking out.")
+                        bot_logger.info(f"🛑 Stop detected during sleep. Breaking out.", extra={'bot_id': session_id})
                         break
-                    time_module.sleep(0.1)
+                    socketio.sleep(0.1)
 
             # Final cleanup when loop exits
+            profiler.end(profiling)
             session_key = str(session_id)
             if session_key in trading_sessions:
-                print(f"🧹 Final cleanup for bot session {session_id}")
+                bot_logger.info(f"🧹 Final cleanup for bot session {session_id}", extra={'bot_id': session_id})
                 del trading_sessions[session_key]
 
         except Exception as e:
+            profiler.end(profiling)
             error_msg = f"{trading_mode.upper()} Bot {session_id} error: {str(e)}"
-            print(f"❌ {error_msg}")
-            log_entry = Log(
-                user_id=config['user_id'],
-                message=error_msg,
-                level="ERROR"
-            )
-            db.session.add(log_entry)
-            db.session.commit()
+            bot_logger.error(f"❌ {error_msg}", extra={'bot_id': session_id})
+            log_event(config['user_id'], error_msg, "ERROR")
 
             # Clean up on error
             session_key = str(session_id)
@@ -3103,72 +3138,483 @@ def run_enhanced_trading_bot(session_id: int, config: Dict[str, Any], trading_se
                 'message': error_msg
             })
 
+        finally:
+            if strategy is not None:
+                strategy.close()
+            equity_store.drop_ledger(session_id)
+
 # Real-time market data updates
-def broadcast_market_updates():
-    """Background task to broadcast real-time market data"""
-    with app.app_context():
-        while True:
-            try:
-                # Get current balance to determine affordable stocks
-                settings = UserSettings.query.filter_by(user_id=1).first()  # Use first user for demo
-                if settings and live_trading.initialize(settings.kite_api_key, settings.kite_access_token):
-                    balance_data = live_trading.get_live_balance()
-                    if balance_data['success']:
-                        available_cash = balance_data['available_cash']
-                        symbols = get_affordable_stocks(1, available_cash)
-                        
-                        if symbols:
-                            # Get live quotes from Zerodha
-                            market_data = live_trading.get_market_quotes(symbols)
-                            
-                            # Broadcast to all connected clients
-                            socketio.emit('market_data_update', {
-                                'data': market_data,
-                                'timestamp': datetime.now().isoformat()
-                            })
-                
-                time_module.sleep(5)  # Update every 5 seconds
-                
-            except Exception as e:
-                print(f"Market update error: {e}")
-                time_module.sleep(10)
+def user_kite(user_id: int):
+    """The user's own verified Kite client, or None without working credentials"""
+    settings = cached_settings(user_id)
+    if not settings or not settings.kite_api_key or not settings.kite_access_token:
+        return None
+    return live_trading.client(settings.kite_api_key, settings.kite_access_token)
+
+def live_cash(user_id: int) -> Optional[float]:
+    """The user's available Zerodha cash, or None without a working session"""
+    kite = user_kite(user_id)
+    if kite is None:
+        return None
+    balance_data = live_trading.get_live_balance(kite)
+    return balance_data['available_cash'] if balance_data['success'] else None
+
+def fetch_market_quotes(symbols: List[str]) -> List[Dict[str, Any]]:
+    """
+    One upstream quote call for the union of subscribed symbols, made on
+    a connected user's own Zerodha client (one already verified if any, so
+    a tick costs no extra profile() check)
+    """
+    candidates = []
+    for user_id in watch_universe.connected_users():
+        settings = cached_settings(user_id)
+        if settings and settings.kite_api_key and settings.kite_access_token:
+            candidates.append(settings)
+    candidates.sort(key=lambda settings: not live_trading.has_client(settings.kite_api_key, settings.kite_access_token))
+    for settings in candidates:
+        kite = live_trading.client(settings.kite_api_key, settings.kite_access_token)
+        if kite is not None:
+            return live_trading.get_market_quotes(symbols, kite=kite)
+    return []
+
+# Symbol <-> client index, the per-client conflating emitter, and the upstream poller feeding it
+market_subscriptions = SubscriptionRegistry()
+market_emitter = ConflatingEmitter(socketio, market_subscriptions, default_interval=app.config['MARKET_FRAME_INTERVAL'])
+market_streamer = MarketStreamer(
+    app, socketio, market_subscriptions, fetch_market_quotes,
+    interval=app.config['MARKET_STREAM_INTERVAL'],
+    emitter=market_emitter
+)
 
-# Start market update thread when app starts
-market_update_thread = None
+# Each connected user's affordable-stock universe, fed into the registry
+watch_universe = WatchUniverse(
+    app, socketio, market_subscriptions,
+    load_balance=live_cash,
+    compute_symbols=get_affordable_stocks,
+    tolerance=app.config['UNIVERSE_BALANCE_TOLERANCE'],
+    max_age=app.config['UNIVERSE_MAX_AGE_SECONDS'],
+    check_interval=app.config['UNIVERSE_CHECK_SECONDS']
+)
 
 @socketio.on('connect')
 def handle_connect():
     """Handle WebSocket connection"""
-    print(f"🔌 WebSocket connected: {request.sid}")
+    logger.debug(f"🔌 WebSocket connected: {request.sid}")
+    # The frame field table goes out before the universe subscription can produce a market_frame
     emit('connection_response', {
         'data': 'Connected to trading bot',
         'status': 'connected',
+        'fields': MARKET_FIELDS,
         'timestamp': datetime.now().isoformat()
     })
+    if current_user.is_authenticated:
+        join_room(user_room(current_user.id))
+        watch_universe.attach(request.sid, current_user.id)
     
     # Start market updates if not already running
-    global market_update_thread
-    if market_update_thread is None or not market_update_thread.is_alive():
-        market_update_thread = threading.Thread(target=broadcast_market_updates, daemon=True)
-        market_update_thread.start()
-        print("📊 Started real-time market data updates (5 second intervals)")
+    if market_streamer.start():
+        logger.info(f"📊 Started real-time market data updates ({market_streamer.interval:g} second intervals)")
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle WebSocket disconnect"""
-    print(f"🔌 WebSocket disconnected: {request.sid}")
+    logger.debug(f"🔌 WebSocket disconnected: {request.sid}")
+    account_push.unsubscribe(request.sid)
+    market_subscriptions.drop(request.sid)
+    market_emitter.forget(request.sid)
+    watch_universe.detach(request.sid)
+
+@socketio.on('account_subscribe')
+def handle_account_subscribe(data):
+    """Join the user's account channel for a trading mode and send the starting snapshot"""
+    if not current_user.is_authenticated:
+        return
+    mode = (data or {}).get('mode', 'paper')
+    emit('account_snapshot', account_push.subscribe(request.sid, current_user.id, mode))
+
+@socketio.on('account_resync')
+def handle_account_resync(data):
+    """Client saw a sequence gap: replay the missed frames or send a fresh snapshot"""
+    if not current_user.is_authenticated:
+        return
+    data = data or {}
+    kind, payload = account_push.resync(current_user.id, data.get('mode', 'paper'), data.get('since'))
+    if kind == 'replay':
+        for frame in payload:
+            emit('account_delta', frame)
+    else:
+        emit('account_snapshot', payload)
 
 @socketio.on('subscribe_market_data')
 def handle_subscribe_market_data(data):
-    """Subscribe to market data updates"""
+    """Subscribe to market data for the given symbols, optionally at a chosen frame interval (seconds)"""
+    data = data or {}
     symbols = data.get('symbols', [])
     if symbols:
+        watched = market_subscriptions.subscribe(request.sid, symbols)
+        interval = market_emitter.set_interval(request.sid, data.get('interval'))
+        market_streamer.start()
         emit('subscription_confirmed', {
-            'symbols': symbols,
-            'message': f'Subscribed to {len(symbols)} symbols',
+            'symbols': watched,
+            'fields': MARKET_FIELDS,
+            'interval': interval,
+            'message': f'Subscribed to {len(watched)} symbols',
             'timestamp': datetime.now().isoformat()
         })
 
+@socketio.on('unsubscribe_market_data')
+def handle_unsubscribe_market_data(data):
+    """Stop market data for the given symbols, or for all of them if none are given"""
+    symbols = (data or {}).get('symbols') or None
+    watched = market_subscriptions.unsubscribe(request.sid, symbols)
+    market_emitter.forget(request.sid, market_subscriptions.normalize(symbols) if symbols else None)
+    emit('subscription_confirmed', {
+        'symbols': watched,
+        'message': f'Subscribed to {len(watched)} symbols',
+        'timestamp': datetime.now().isoformat()
+    })
+
+# Shared, short-lived caches behind the dashboard endpoints
+service_cache = TTLCache(default_ttl=app.config['ACCOUNT_STATE_TTL'])
+
+WALLET_ZERO = {
+    'balance': 0, 'portfolio_value': 0, 'realized_pnl': 0, 'unrealized_pnl': 0,
+    'total_pnl': 0, 'net_pnl': 0, 'total_brokerage': 0, 'currency': 'INR'
+}
+PORTFOLIO_ZERO = {
+    'available_cash': 0, 'portfolio_value': 0, 'realized_pnl': 0, 'unrealized_pnl': 0,
+    'total_pnl': 0, 'net_pnl': 0
+}
+
+def cached_settings(user_id: int):
+    """Detached copy of the user's settings row, shared across requests for a few seconds"""
+    def load():
+        settings = UserSettings.query.filter_by(user_id=user_id).first()
+        return SimpleNamespace(**row_dict(settings)) if settings else None
+    return service_cache.get_or_load(('settings', user_id), load, ttl=5.0)
+
+def invalidate_user_caches(user_id: int):
+    """Drop the user's cached state and push the change to their open dashboards"""
+    service_cache.invalidate_where(lambda key: len(key) > 1 and key[1] == user_id)
+    account_push.notify(user_id)
+    watch_universe.balance_changed(user_id)
+
+def cached_kite_status(user_id: int) -> Dict[str, Any]:
+    return service_cache.get_or_load(
+        ('kite_status', user_id),
+        lambda: test_kite_connection(cached_settings(user_id)),
+        ttl=app.config['KITE_STATUS_TTL']
+    )
+
+def build_market_status() -> Dict[str, Any]:
+    now = datetime.now()
+    is_open = is_market_open()
+    is_weekend = now.weekday() >= 5
+    return {
+        'is_open': is_open,
+        'is_weekend': is_weekend,
+        'current_day': now.strftime('%A'),
+        'current_time': now.strftime('%H:%M:%S'),
+        'open_time': '09:15',
+        'close_time': '15:30',
+        'message': get_market_status_message(is_open, is_weekend),
+        'timestamp': now.isoformat()
+    }
+
+def account_state(user_id: int, trading_mode: str) -> Dict[str, Any]:
+    """
+    Cash, positions and P&L for one account, built with a single quote
+    batch and shared by the wallet, portfolio, positions, active-bots and
+    snapshot endpoints for ACCOUNT_STATE_TTL seconds.
+    """
+    def load():
+        if trading_mode == 'live':
+            settings = cached_settings(user_id)
+            if not settings or not settings.kite_api_key or not settings.kite_access_token:
+                return {'error': '❌ Zerodha credentials not configured. Please go to Settings and enter your API credentials.'}
+            kite = live_trading.client(settings.kite_api_key, settings.kite_access_token)
+            if kite is None:
+                return {'error': '❌ Failed to connect to Zerodha. Please check your API credentials.'}
+            balance_data = live_trading.get_live_balance(kite)
+            if not balance_data['success']:
+                return {'error': f'❌ Failed to fetch Zerodha balance: {balance_data.get("error", "Unknown error")}'}
+            cash = balance_data['available_cash']
+            watch_universe.observe_balance(user_id, cash)
+            positions = live_trading.get_live_positions(user_id)
+            pnl_data = live_trading.get_live_pnl(user_id, positions=positions)
+        else:
+            cash = paper_cache.get_balance(user_id)
+            positions = paper_trading.get_paper_positions(user_id)
+            pnl_data = paper_trading.get_paper_pnl(user_id, positions=positions)
+        return {'cash': cash, 'positions': positions, 'pnl': pnl_data}
+
+    return service_cache.get_or_load(('account_state', user_id, trading_mode), load)
+
+def wallet_payload(trading_mode: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    if 'error' in state:
+        return dict(WALLET_ZERO, error=state['error'], mode=trading_mode)
+    pnl_data = state['pnl']
+    note = f'Actual Zerodha Wallet Balance: ₹{state["cash"]:.2f}' if trading_mode == 'live' \
+        else f'Paper Trading Balance: ₹{state["cash"]:.2f}'
+    return {
+        'balance': state['cash'],
+        'portfolio_value': pnl_data['portfolio_value'],
+        'realized_pnl': pnl_data['realized_pnl'],
+        'unrealized_pnl': pnl_data['unrealized_pnl'],
+        'total_pnl': pnl_data['total_pnl'],
+        'net_pnl': pnl_data['net_pnl'],
+        'total_brokerage': 0,
+        'currency': 'INR',
+        'mode': trading_mode,
+        'note': note,
+    }
+
+def portfolio_payload(trading_mode: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    if 'error' in state:
+        return dict(PORTFOLIO_ZERO, error=state['error'], mode=trading_mode)
+    cash = state['cash']
+    pnl_data = state['pnl']
+    return {
+        'initial_capital': cash,
+        'available_cash': cash,
+        'portfolio_value': pnl_data['portfolio_value'],
+        'realized_pnl': pnl_data['realized_pnl'],
+        'unrealized_pnl': pnl_data['unrealized_pnl'],
+        'total_pnl': pnl_data['total_pnl'],
+        'net_pnl': pnl_data['net_pnl'],
+        'return_percent': (pnl_data['net_pnl'] / cash) * 100 if cash > 0 else 0,
+        'positions_count': len(state['positions']),
+        'trades_count': len(state['positions']),
+        'used_capital': pnl_data.get('total_invested', 0),
+        'capital_usage_percent': (pnl_data.get('total_invested', 0) / cash) * 100 if cash > 0 else 0,
+        'mode': trading_mode,
+        'note': 'Real Zerodha data' if trading_mode == 'live' else 'Paper Trading Simulation'
+    }
+
+def build_active_bots(user_id: int) -> List[Dict[str, Any]]:
+    active_sessions = BotSession.query.filter_by(
+        user_id=user_id,
+        status='running'
+    ).all()
+
+    bots_data = []
+    for session_row in active_sessions:
+        state = account_state(user_id, session_row.trading_mode)
+        current_net_pnl = state['pnl']['net_pnl'] if 'pnl' in state else 0.0
+
+        bots_data.append({
+            'id': session_row.id,
+            'instrument_type': session_row.instrument_type,
+            'strategy_name': session_row.strategy_name,
+            'trading_mode': session_row.trading_mode,
+            'initial_capital': float(session_row.initial_capital),
+            'current_capital': float(session_row.current_capital) if session_row.current_capital else float(session_row.initial_capital),
+            'started_at': session_row.started_at.isoformat() if session_row.started_at else None,
+            'status': session_row.status,
+            'pnl': float(session_row.pnl) if session_row.pnl else 0.0,
+            'target_profit': float(session_row.target_profit),
+            'max_duration_hours': session_row.max_duration_hours,
+            'total_brokerage': float(session_row.total_brokerage),
+            'order_type': session_row.order_type,
+            'risk_level': session_row.risk_level,
+            'current_net_pnl': current_net_pnl
+        })
+    return bots_data
+
+def account_push_state(user_id: int, trading_mode: str) -> Dict[str, Any]:
+    """The sections pushed on the per-user account channel"""
+    state = account_state(user_id, trading_mode)
+    return {
+        'wallet': wallet_payload(trading_mode, state),
+        'portfolio': portfolio_payload(trading_mode, state),
+        'positions': state.get('positions', []),
+        'bots': build_active_bots(user_id)
+    }
+
+# Per-user push of account deltas, replacing dashboard polling
+account_push = AccountPushChannel(
+    app, socketio, account_push_state,
+    room_for_user=user_room,
+    interval=app.config['ACCOUNT_PUSH_INTERVAL']
+)
+
+def build_dashboard_snapshot(user_id: int, trading_mode: str) -> Tuple[Dict[str, Any], str]:
+    """Everything the dashboard polls, in one pass; returns (payload, etag)"""
+    state = account_state(user_id, trading_mode)
+    recent_orders = Trade.query.filter_by(user_id=user_id, trading_mode=trading_mode) \
+        .order_by(Trade.id.desc()).limit(5).all()
+
+    payload = {
+        'mode': trading_mode,
+        'wallet': wallet_payload(trading_mode, state),
+        'portfolio': portfolio_payload(trading_mode, state),
+        'positions': state.get('positions', []),
+        'active_bots': build_active_bots(user_id),
+        'recent_orders': [order_data(row_dict(order)) for order in recent_orders],
+    }
+    if trading_mode == 'live':
+        payload['kite_status'] = cached_kite_status(user_id)
+
+    # The clock fields change every second; keep them out of the ETag
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:20]
+    market = build_market_status()
+    payload['market_status'] = market
+    payload['server_time'] = market['timestamp']
+    etag = f"dash-{digest}-{int(market['is_open'])}"
+    return payload, etag
+
+@app.route('/api/dashboard_snapshot')
+@login_required
+def dashboard_snapshot():
+    """Single polling endpoint for the dashboard: market, wallet, portfolio, bots, positions, recent orders"""
+    try:
+        trading_mode = request.args.get('mode', 'paper')
+        payload, etag = service_cache.get_or_load(
+            ('dashboard', current_user.id, trading_mode),
+            lambda: build_dashboard_snapshot(current_user.id, trading_mode),
+            ttl=app.config['DASHBOARD_SNAPSHOT_TTL']
+        )
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify(payload)
+            response.headers['Cache-Control'] = 'private, no-cache'
+        response.set_etag(etag, weak=True)
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition of the hot-path histograms and counters"""
+    if not metrics.enabled:
+        return 'metrics disabled\n', 404, {'Content-Type': 'text/plain; charset=utf-8'}
+    return metrics.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/api/metrics')
+@login_required
+def metrics_summary():
+    """Latency percentiles per series plus the background components' own counters"""
+    return jsonify({
+        **metrics.summary(),
+        'components': {
+            'storage': storage.stats(),
+            'service_cache': service_cache.stats(),
+            'account_push': account_push.stats(),
+            'market_streamer': market_streamer.stats(),
+            'watch_universe': watch_universe.stats(),
+            'tracer': tracer.stats(),
+            'indicator_graph': indicator_graph.stats()
+        },
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/latency')
+@login_required
+def get_latency():
+    """Tick-to-order / order-to-ack percentiles for the user's bots and per strategy, plus recent traces"""
+    bot_ids = {row.id for row in BotSession.query.with_entities(BotSession.id).filter_by(user_id=current_user.id)}
+    return jsonify({
+        **tracer.latencies(bot_ids),
+        'recent': tracer.recent(bot_ids, limit=request.args.get('limit', 20, type=int)),
+        'timestamp': datetime.now().isoformat()
+    })
+
+def admin_required(view):
+    """login_required plus membership of ADMIN_USERNAMES"""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if current_user.username not in app.config['ADMIN_USERNAMES']:
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
+
+@app.route('/api/admin/profiles', methods=['GET', 'POST'])
+@admin_required
+def admin_profiles():
+    """
+    GET lists captures. POST starts one:
+    {"target": "bot", "session_id": 12, "seconds": 30, "mode": "sample", "interval_ms": 10}
+    {"target": "request", "route": "/api/dashboard_*", "seconds": 30, "mode": "cprofile"}
+    """
+    if request.method == 'GET':
+        return jsonify({'captures': profiler.list()})
+
+    data = request.get_json(silent=True) or {}
+    target = data.get('target', 'bot')
+    match = data.get('session_id') if target == 'bot' else data.get('route')
+    if target == 'bot' and match is not None and str(match) not in trading_sessions:
+        return jsonify({'error': f"Bot {match} is not running in this process"}), 404
+    try:
+        capture = profiler.start(
+            target, match,
+            seconds=data.get('seconds', 30),
+            mode=data.get('mode', 'sample'),
+            interval=float(data['interval_ms']) / 1000 if data.get('interval_ms') else None
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(capture.to_dict()), 202
+
+@app.route('/api/admin/profiles/<int:capture_id>', methods=['GET', 'DELETE'])
+@admin_required
+def admin_profile(capture_id):
+    """
+    GET returns the output once the capture is done (202 while it runs):
+    pstats text for cprofile captures, collapsed stacks for sampled ones.
+    DELETE ends the capture early and keeps what it has.
+    """
+    capture = profiler.stop(capture_id) if request.method == 'DELETE' else profiler.get(capture_id)
+    if capture is None:
+        return jsonify({'error': 'Unknown capture'}), 404
+    if not capture.done:
+        return jsonify(capture.to_dict()), 202
+    output = capture.output(sort=request.args.get('sort', 'cumulative'),
+                            limit=request.args.get('limit', 60, type=int))
+    return output, 200, {'Content-Type': 'text/plain; charset=utf-8', 'X-Profile-Format': capture.to_dict()['format']}
+
+def init_database():
+    """Create missing tables and apply pending schema migrations, keeping existing data"""
+    db.create_all()
+    return migrations.upgrade(db.engine)
+
+def stop_orphaned_sessions() -> int:
+    """Mark sessions left 'running' by a crash or restart as stopped; no thread runs them any more"""
+    orphans = [session_row for session_row in BotSession.query.filter_by(status='running').all()
+               if str(session_row.id) not in trading_sessions]
+    for session_row in orphans:
+        session_row.status = 'stopped'
+        session_row.stopped_at = datetime.now()
+        session_row.stop_requested = False
+        session_row.force_stop = False
+    if orphans:
+        db.session.commit()
+        logger.warning(f"Marked {len(orphans)} orphaned bot sessions as stopped: {[row.id for row in orphans]}")
+    return len(orphans)
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Create missing tables and apply pending migrations"""
+    applied = init_database()
+    print(f"Schema at version {migrations.current_version(db.engine)} (applied: {applied or 'none'})")
+
+@app.cli.command('archive-now')
+def archive_now_command():
+    """Run one retention pass immediately"""
+    print(f"Archived: {retention.run_once()}")
+
+@app.cli.command('db-check-indexes')
+def db_check_indexes_command():
+    """EXPLAIN the hot queries and fail if any of them skips its index"""
+    results = migrations.explain_hot_queries(db.engine)
+    for result in results:
+        status = 'OK  ' if result['uses_index'] else 'SCAN'
+        print(f"{status} {result['query']}: {' | '.join(result['plan'])}")
+    if not all(result['uses_index'] for result in results):
+        sys.exit(1)
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -3186,8 +3632,8 @@ def unauthorized_error(error):
 if __name__ == '__main__':
     with app.app_context():
         try:
-            db.drop_all()
-            db.create_all()
+            init_database()
+            stop_orphaned_sessions()
 
             if not User.query.filter_by(username='demo').first():
                 demo_user = User(username='demo', email='demo@tradingbot.com')
@@ -3224,9 +3670,17 @@ if __name__ == '__main__':
             import traceback
             traceback.print_exc()
 
-    socketio.run(
-        app,
-        debug=True,
-        host='0.0.0.0',
-        port=5000,
-        allow_unsafe_werkzeug=True)
\ No newline at end of file
+    # SIGTERM exits through atexit so the paper cache flushes pending rows
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    retention.start()
+    equity_store.start(collect_equity_samples)
+
+    run_options = {'host': app.config['SERVER_HOST'], 'port': app.config['SERVER_PORT']}
+    if app.config['SOCKETIO_ASYNC_MODE'] == 'threading':
+        run_options.update(debug=app.config['SERVER_MODE'] != 'production', allow_unsafe_werkzeug=True)
+    else:
+        # eventlet.wsgi / gevent pywsgi: one green thread per connection, no per-request access log
+        run_options.update(log_output=app.config['SOCKETIO_LOGGING'])
+    print(f"🚀 Serving in {app.config['SERVER_MODE']} mode ({app.config['SOCKETIO_ASYNC_MODE']})")
+    socketio.run(app, **run_options)
\ No newline at end of file
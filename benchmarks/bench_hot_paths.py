@@ -0,0 +1,371 @@
+"""
+Micro-benchmarks for the per-tick hot paths, with stored baselines.
+
+Each case times one call of a hot path at several sizes:
+
+- universe size (symbols quoted / positions held): strategy signal
+  generation, Zerodha charges, and the PnL / exposure aggregations
+- history length (prices or fills): the SMA and RSI indicators, replaying
+  fills into the session stats and equity ledgers, and the
+  realized-brokerage SUM over Trade rows
+
+Timings are the best of --repeat runs per call (min is the least noisy
+estimate on a shared machine), with the median alongside. --save writes
+them as a JSON baseline; later runs compare against it and exit 1 when a
+case is more than --threshold slower:
+
+    python benchmarks/bench_hot_paths.py --save            # record the baseline
+    python benchmarks/bench_hot_paths.py                   # compare, fail on regressions
+    python benchmarks/bench_hot_paths.py --quick --case 'pnl.*'
+
+Baselines are machine-specific; record one on the machine that compares.
+"""
+import argparse
+import contextlib
+import fnmatch
+import io
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'hot_paths.json')
+
+UNIVERSE_SIZES = (10, 100, 1000, 5000)
+HISTORY_LENGTHS = (50, 500, 2000, 10000)
+QUICK_UNIVERSE_SIZES = (10, 1000)
+QUICK_HISTORY_LENGTHS = (50, 2000)
+
+CASES = {}
+
+
+def case(name, axis):
+    """Register `setup(size) -> zero-argument callable` as a benchmark over 'universe' or 'history'"""
+    def register(setup):
+        CASES[name] = (axis, setup)
+        return setup
+    return register
+
+
+def market_data(size, seed=1):
+    rng = random.Random(seed)
+    return {f"SYM{index:05d}": {'symbol': f"SYM{index:05d}", 'last_price': round(rng.uniform(50, 6000), 2)}
+            for index in range(size)}
+
+
+def fills(length, symbols=20, seed=2):
+    """Alternating BUY/SELL fills over a few symbols, prices on a random walk"""
+    rng = random.Random(seed)
+    prices = {f"SYM{index:05d}": rng.uniform(100, 2000) for index in range(symbols)}
+    result = []
+    for index in range(length):
+        symbol = f"SYM{index % symbols:05d}"
+        prices[symbol] *= 1 + rng.gauss(0, 0.01)
+        result.append((symbol, 'BUY' if (index // symbols) % 2 == 0 else 'SELL', rng.randint(1, 20),
+                       round(prices[symbol], 2), round(rng.uniform(0, 20), 2)))
+    return result
+
+
+def positions(size, seed=3):
+    rng = random.Random(seed)
+    result = []
+    for symbol, quote in market_data(size, seed).items():
+        quantity = rng.randint(1, 50)
+        average = round(quote['last_price'] * rng.uniform(0.9, 1.1), 2)
+        current = quote['last_price']
+        result.append({
+            'symbol': symbol, 'quantity': quantity, 'average_price': average, 'current_price': current,
+            'unrealized_pnl': (current - average) * quantity, 'invested_amount': quantity * average,
+            'current_value': quantity * current, 'pnl_percent': (current - average) / average * 100,
+            'product_type': 'CNC', 'action': 'sell'
+        })
+    return result
+
+
+def price_history(length, seed=5):
+    rng = random.Random(seed)
+    price, prices = 1000.0, []
+    for _ in range(length):
+        price *= 1 + rng.gauss(0, 0.01)
+        prices.append(round(price, 2))
+    return prices
+
+
+def define_cases(trading_app):
+    from strategies import MovingAverageCrossStrategy, RSIStrategy, SharedMovingAverageCrossStrategy, SharedRSIStrategy
+    from modules.indicators import IndicatorGraph
+    from modules.strategy_engine import MovingAverageCrossoverStrategy, MeanReversionStrategy, BreakoutStrategy
+    from modules import session_stats
+    from modules.timeseries import BotLedger
+
+    for name, strategy_class in (('ma_cross', MovingAverageCrossStrategy), ('rsi', RSIStrategy)):
+        @case(f"strategy.{name}.generate_signals", 'universe')
+        def indicator_signals(size, strategy_class=strategy_class):
+            # Full price history per symbol, so every call recomputes the indicator; no random demo signals
+            strategy = strategy_class({'demo_mode': False})
+            for tick in range(50):
+                strategy.generate_signals(market_data(size, seed=tick))
+            ticks = [market_data(size, seed=tick) for tick in range(50, 60)]
+            calls = itertools.cycle(ticks)
+            return lambda: strategy.generate_signals(next(calls))
+
+    for name, strategy_class in (('ma_cross', SharedMovingAverageCrossStrategy), ('rsi', SharedRSIStrategy)):
+        @case(f"strategy.shared_{name}.evaluate", 'universe')
+        def shared_signals(size, strategy_class=strategy_class):
+            # Ten bots on one indicator graph; each call is a new tick that all ten evaluate
+            clock = itertools.count()
+            graph = IndicatorGraph(tick_seconds=1.0, clock=lambda: float(next(clock)) / 10)
+            bots = [strategy_class({}, graph=graph) for _ in range(10)]
+            ticks = [market_data(size, seed=tick) for tick in range(60)]
+            for tick in ticks[:50]:
+                for bot in bots:
+                    bot.evaluate(tick)
+            calls = itertools.cycle(ticks[50:])
+
+            def run():
+                tick = next(calls)
+                for bot in bots:
+                    bot.evaluate(tick)
+            return run
+
+    @case('strategy.ma_cross.calculate_sma', 'history')
+    def sma(length):
+        strategy = MovingAverageCrossStrategy()
+        prices = price_history(length)
+        return lambda: strategy.calculate_sma(prices, strategy.slow_period)
+
+    @case('strategy.rsi.calculate_rsi', 'history')
+    def rsi(length):
+        strategy = RSIStrategy()
+        prices = price_history(length)
+        return lambda: strategy.calculate_rsi(prices, 14)
+
+    for name, strategy_class in (('moving_average_crossover', MovingAverageCrossoverStrategy),
+                                 ('mean_reversion', MeanReversionStrategy),
+                                 ('breakout', BreakoutStrategy)):
+        @case(f"strategy.{name}.generate_signals", 'universe')
+        def strategy_signals(size, strategy_class=strategy_class):
+            strategy = strategy_class()
+            data = market_data(size)
+            return lambda: strategy.generate_signals(data)
+
+    @case('strategy.enhanced.generate_signals', 'universe')
+    def enhanced_signals(size):
+        strategy = trading_app.EnhancedStrategy('enhanced', {'risk_level': 100, 'max_positions': size})
+        data = market_data(size)
+        held = positions(size // 2)
+        random.seed(4)
+        return lambda: strategy.generate_signals(data, held, 10_000_000.0)
+
+    @case('charges.calculate_zerodha_brokerage', 'universe')
+    def brokerage(size):
+        charges = trading_app.live_trading.calculate_zerodha_brokerage
+        orders = [(quote['last_price'] * 10, ('BUY', 'SELL')[index % 2], ('CNC', 'MIS')[index % 3 == 0])
+                  for index, quote in enumerate(market_data(size).values())]
+
+        def run():
+            for value, action, product in orders:
+                charges(value, action, product)
+        return run
+
+    @case('pnl.get_paper_pnl', 'universe')
+    def paper_pnl(size):
+        held = positions(size)
+        return lambda: trading_app.paper_trading.get_paper_pnl(1, held)
+
+    @case('pnl.get_live_pnl', 'universe')
+    def live_pnl(size):
+        held = positions(size)
+        return lambda: trading_app.live_trading.get_live_pnl(1, held)
+
+    @case('pnl.session_stats.mark', 'universe')
+    def stats_mark(size):
+        stats = session_stats.new_stats(1, 1, 100000.0)
+        stats['positions'] = {p['symbol']: [p['quantity'], p['average_price']] for p in positions(size)}
+        prices = {symbol: quote['last_price'] for symbol, quote in market_data(size).items()}
+        return lambda: session_stats.mark(stats, prices)
+
+    @case('pnl.bot_ledger.mark', 'universe')
+    def ledger_mark(size):
+        ledger = BotLedger(100000.0)
+        for p in positions(size):
+            ledger.apply_fill(p['symbol'], 'BUY', p['quantity'], p['average_price'], 0.0)
+        prices = {symbol: quote['last_price'] for symbol, quote in market_data(size).items()}
+        return lambda: ledger.mark(prices)
+
+    @case('pnl.session_stats.apply_fill', 'history')
+    def stats_replay(length):
+        history = fills(length)
+
+        def run():
+            stats = session_stats.new_stats(1, 1, 100000.0)
+            for fill in history:
+                session_stats.apply_fill(stats, *fill)
+        return run
+
+    @case('pnl.bot_ledger.apply_fill', 'history')
+    def ledger_replay(length):
+        history = fills(length)
+
+        def run():
+            ledger = BotLedger(100000.0)
+            for fill in history:
+                ledger.apply_fill(*fill)
+        return run
+
+    @case('pnl.realized_brokerage', 'history')
+    def realized(length):
+        # One user per history length, so each size sums exactly its own rows
+        user_id = length
+        trade_rows = [{'user_id': user_id, 'symbol': symbol, 'action': action, 'quantity': quantity,
+                       'price': price, 'brokerage': brokerage, 'trading_mode': 'paper'}
+                      for symbol, action, quantity, price, brokerage in fills(length)]
+        with trading_app.app.app_context():
+            if not trading_app.db.session.get(trading_app.User, user_id):
+                user = trading_app.User(id=user_id, username=f"bench{user_id}", email=f"bench{user_id}@example.com")
+                user.set_password('bench')
+                trading_app.db.session.add(user)
+                trading_app.db.session.execute(trading_app.Trade.__table__.insert(), trade_rows)
+                trading_app.db.session.commit()
+        return lambda: trading_app.realized_brokerage(user_id, 'paper')
+
+
+def measure(run, repeat, min_time):
+    """(best, median) seconds per call, with the call count per repeat calibrated to ~min_time"""
+    run()  # warm caches and lazy loads outside the timings
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            run()
+        timings.append((time.perf_counter() - started) / number)
+    return min(timings), statistics.median(timings), number
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print each case against the baseline; returns the (case, size) pairs slower than the threshold"""
+    regressions = []
+    print(f"{'case':48} {'size':>6} {'baseline us':>12} {'current us':>12} {'change':>8}", file=sys.stderr)
+    for name, sizes in results.items():
+        for size, timing in sizes.items():
+            before = baseline.get('results', {}).get(name, {}).get(size)
+            if before is None:
+                print(f"{name:48} {size:>6} {'-':>12} {timing['best_us']:>12.2f} {'new':>8}", file=sys.stderr)
+                continue
+            ratio = timing['best_us'] / before['best_us'] if before['best_us'] else 1.0
+            flag = ''
+            if ratio > 1 + threshold:
+                regressions.append((name, size))
+                flag = '  REGRESSION'
+            print(f"{name:48} {size:>6} {before['best_us']:>12.2f} {timing['best_us']:>12.2f} "
+                  f"{(ratio - 1) * 100:>+7.1f}%{flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time strategy, charges and PnL hot paths against a stored baseline')
+    parser.add_argument('--case', action='append', help='glob of case names to run (repeatable)')
+    parser.add_argument('--quick', action='store_true', help='two sizes per axis instead of four')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per repeat')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown before failing (0.25 = 25%%)')
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_hot_paths_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    sys.path.insert(0, ROOT)
+
+    import app as trading_app
+    for name in ('socketio.server', 'engineio.server'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    with trading_app.app.app_context():
+        trading_app.db.create_all()
+
+    define_cases(trading_app)
+    if args.list:
+        for name, (axis, _) in CASES.items():
+            print(f"{name}  ({axis})")
+        return
+
+    sizes = {
+        'universe': QUICK_UNIVERSE_SIZES if args.quick else UNIVERSE_SIZES,
+        'history': QUICK_HISTORY_LENGTHS if args.quick else HISTORY_LENGTHS
+    }
+    selected = [name for name in CASES if not args.case or any(fnmatch.fnmatchcase(name, p) for p in args.case)]
+
+    results = {}
+    # Hot paths print as they go (EnhancedStrategy logs every call); keep that out of the timings
+    with trading_app.app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        for name in selected:
+            axis, setup = CASES[name]
+            for size in sizes[axis]:
+                best, median, number = measure(setup(size), args.repeat, args.min_time)
+                results.setdefault(name, {})[str(size)] = {
+                    'axis': axis,
+                    'best_us': round(best * 1e6, 3),
+                    'median_us': round(median * 1e6, 3),
+                    'per_item_ns': round(best * 1e9 / size, 2),
+                    'calls': number
+                }
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': f"{platform.node()} {platform.machine()}",
+        'results': results
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+            baseline_file.write('\n')
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save to record one", file=sys.stderr)
+        return
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get('machine') != report['machine']:
+        print(f"Note: baseline was recorded on {baseline.get('machine')}", file=sys.stderr)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
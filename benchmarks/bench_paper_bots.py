@@ -0,0 +1,110 @@
+"""
+Paper-trading throughput benchmark.
+
+Runs N concurrent paper bots, each calling app.execute_trade() in a tight
+BUY/SELL loop against a throwaway SQLite database, and reports committed
+trades per second. Quotes come from a synthetic price feed so the run does
+not need Kite credentials.
+
+    python benchmarks/bench_paper_bots.py --bots 50 --seconds 10
+    SQLITE_JOURNAL_MODE=DELETE SQLITE_SYNCHRONOUS=FULL python benchmarks/bench_paper_bots.py
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure paper trades/second with concurrent bots')
+    parser.add_argument('--bots', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--symbols', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_paper_bots_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import app as trading_app
+    from app import app, db, User, BotSession, Trade
+
+    for name in ('socketio.server', 'engineio.server'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    symbols = [f"BENCH{i}" for i in range(args.symbols)]
+    prices = {symbol: random.uniform(100, 2000) for symbol in symbols}
+
+    def synthetic_quotes(requested):
+        return [{'symbol': s, 'last_price': round(prices.get(s, 100.0) * random.uniform(0.999, 1.001), 2)}
+                for s in requested]
+
+    trading_app.live_trading.get_market_quotes = synthetic_quotes
+
+    bots = []
+    with app.app_context():
+        db.create_all()
+        for i in range(args.bots):
+            user = User(username=f"bench{i}", email=f"bench{i}@example.com")
+            user.set_password('bench')
+            db.session.add(user)
+            db.session.flush()
+            session_row = BotSession(user_id=user.id, strategy_name='benchmark', trading_mode='paper', status='running')
+            db.session.add(session_row)
+            db.session.flush()
+            bots.append((user.id, session_row.id))
+        db.session.commit()
+
+    stop = threading.Event()
+    attempts = [0] * len(bots)
+
+    def run_bot(index, user_id, session_id):
+        config = {'user_id': user_id, 'trading_mode': 'paper', 'order_type': 'CNC', 'risk_level': 50}
+        symbol = symbols[index % len(symbols)]
+        action = 'BUY'
+        with app.app_context():
+            while not stop.is_set():
+                trading_app.execute_trade(session_id, config, {'symbol': symbol, 'action': action, 'quantity': 1})
+                attempts[index] += 1
+                action = 'SELL' if action == 'BUY' else 'BUY'
+            db.session.remove()
+
+    threads = [threading.Thread(target=run_bot, args=(i, user_id, session_id), daemon=True)
+               for i, (user_id, session_id) in enumerate(bots)]
+
+    # execute_trade prints every fill; keep that out of the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        trading_app.storage.writer.flush()
+
+    with app.app_context():
+        trades = Trade.query.count()
+
+    print(json.dumps({
+        'bots': args.bots,
+        'seconds': round(elapsed, 2),
+        'journal_mode': app.config['SQLITE_JOURNAL_MODE'],
+        'synchronous': app.config['SQLITE_SYNCHRONOUS'],
+        'attempts': sum(attempts),
+        'trades': trades,
+        'trades_per_second': round(trades / elapsed, 1),
+        'writer': trading_app.storage.stats()
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Concurrent Socket.IO client benchmark.
+
+Starts the app in a child process on the chosen async mode, opens N raw
+WebSocket (Engine.IO v4) clients against it and has a background task on
+the server broadcast a timestamped `bench_tick` every interval. Reports how
+many clients connected, connect times, broadcast delivery latency and how
+many OS threads the server needed to hold them.
+
+    python benchmarks/bench_socket_clients.py --clients 1000 --seconds 10
+    python benchmarks/bench_socket_clients.py --clients 1000 --mode eventlet
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(args):
+    """Child process: the app plus a broadcaster, on whatever SOCKETIO_ASYNC_MODE says"""
+    sys.path.insert(0, ROOT)
+    import logging
+    from app import app, socketio, init_database
+
+    for name in ('socketio.server', 'engineio.server', 'werkzeug'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    with app.app_context():
+        init_database()
+
+    def broadcast():
+        while True:
+            socketio.sleep(args.interval)
+            socketio.emit('bench_tick', {'t': time.time(), 'threads': threading.active_count()})
+
+    socketio.start_background_task(broadcast)
+    options = {'host': '127.0.0.1', 'port': args.port}
+    if app.config['SOCKETIO_ASYNC_MODE'] == 'threading':
+        options['allow_unsafe_werkzeug'] = True
+    else:
+        options['log_output'] = False
+    socketio.run(app, **options)
+
+
+def wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+
+class BenchClient:
+    """One Socket.IO connection over a raw WebSocket: handshake, pings, and bench_tick timing"""
+
+    def __init__(self, url, stop):
+        self.url = url
+        self.stop = stop
+        self.connect_seconds = None
+        self.latencies = []
+        self.server_threads = 0
+        self.error = None
+
+    def run(self):
+        import simple_websocket
+        started = time.perf_counter()
+        try:
+            ws = simple_websocket.Client.connect(self.url)
+            if not ws.receive(timeout=30).startswith('0'):  # Engine.IO open
+                raise RuntimeError('no open packet')
+            ws.send('40')
+            # The app's connect handler emits before the Socket.IO connect ack goes out
+            while not ws.receive(timeout=30).startswith('40'):
+                pass
+            self.connect_seconds = time.perf_counter() - started
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            return
+
+        try:
+            while not self.stop.is_set():
+                packet = ws.receive(timeout=0.5)
+                if packet is None:
+                    continue
+                if packet == '2':  # Engine.IO ping
+                    ws.send('3')
+                elif packet.startswith('42["bench_tick"'):
+                    tick = json.loads(packet[2:])[1]
+                    self.latencies.append(time.time() - tick['t'])
+                    self.server_threads = tick['threads']
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+        finally:
+            ws.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure concurrent Socket.IO clients and broadcast latency')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--mode', choices=('threading', 'eventlet', 'gevent'), default='threading')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench_socket_clients_')
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               SOCKETIO_ASYNC_MODE=args.mode,
+               SOCKETIO_LOGGING='0',
+               SERVER_MODE='production')
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(args.port),
+         '--interval', str(args.interval)],
+        env=env, cwd=workdir, stdout=subprocess.DEVNULL
+    )
+    try:
+        if not wait_for_port(args.port, 60):
+            raise SystemExit('server did not start')
+
+        url = f"ws://127.0.0.1:{args.port}/socket.io/?EIO=4&transport=websocket"
+        stop = threading.Event()
+        clients = [BenchClient(url, stop) for _ in range(args.clients)]
+        threads = [threading.Thread(target=client.run, daemon=True) for client in clients]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=10)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    connected = [client for client in clients if client.connect_seconds is not None]
+    latencies = [latency for client in connected for latency in client.latencies]
+    errors = {}
+    for client in clients:
+        if client.error:
+            errors[client.error] = errors.get(client.error, 0) + 1
+
+    print(json.dumps({
+        'mode': args.mode,
+        'clients': args.clients,
+        'seconds': round(elapsed, 2),
+        'connected': len(connected),
+        'failed': args.clients - len(connected),
+        'errors': errors,
+        'connect_ms': {
+            'p50': percentile([client.connect_seconds for client in connected], 0.50),
+            'p99': percentile([client.connect_seconds for client in connected], 0.99)
+        },
+        'delivery_ms': {
+            'p50': percentile(latencies, 0.50),
+            'p99': percentile(latencies, 0.99),
+            'max': percentile(latencies, 1.0)
+        },
+        'ticks_per_client': round(len(latencies) / max(len(connected), 1), 2),
+        'server_threads': max((client.server_threads for client in connected), default=0)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
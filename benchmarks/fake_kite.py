@@ -0,0 +1,620 @@
+"""
+Local stand-in for the Kite Connect REST API and WebSocket ticker.
+
+Implements the endpoints LiveTrading uses (profile, margins, holdings,
+positions, quote/ltp/ohlc, instruments, orders, place_order) and the
+binary streaming protocol KiteTicker speaks, over synthetic instruments
+whose prices follow geometric Brownian motion, so the app can run
+offline against it:
+
+    python benchmarks/fake_kite.py --port 5099 --symbols 500
+    KITE_ROOT_URL=http://127.0.0.1:5099 python app.py
+    KiteTicker(api_key, access_token, root='ws://127.0.0.1:5099/ws')
+
+Any API key / access token is accepted. Orders fill immediately at their
+limit price against a per-token cash balance, and fills are pushed to the
+token's ticker connections as order updates.
+
+Faults, for exercising retries, rate limiting and caching:
+
+    --latency lognormal:30,0.5 --latency quote=uniform:50,400
+    --error-rate 0.02 --hang-rate 0.001 --reject-rate 0.05 --rate-limit
+
+Latency specs are milliseconds: '20' (constant), 'uniform:LOW,HIGH',
+'normal:MEAN,SD', 'lognormal:MEDIAN,SIGMA' or 'exponential:MEAN',
+optionally per endpoint ('quote=...'). --rate-limit applies Kite's
+published per-token limits and answers 429 beyond them. POST
+/_fake/config changes any of these at runtime; GET /_fake/stats returns
+request and fault counts.
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import math
+import random
+import socket
+import struct
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from flask import Flask, Response, request
+from werkzeug.serving import make_server
+
+KITE_TIME = '%Y-%m-%d %H:%M:%S'
+NSE_SEGMENT = 1  # low byte of an NSE equity instrument token
+TICK_SIZE = 0.05
+
+# Trading seconds per year (252 sessions of 6h15m), the GBM time unit
+SECONDS_PER_YEAR = 252 * 6.25 * 3600
+
+# Requests per second per access token, from the Kite Connect docs
+KITE_RATE_LIMITS = {'quote': 1.0, 'orders': 10.0, 'default': 10.0}
+
+# What a random server-side failure looks like: (HTTP status, error_type, message)
+SERVER_ERRORS = (
+    (500, 'GeneralException', 'Something went wrong. Please try again.'),
+    (502, 'NetworkException', 'Gateway error. Please try again.'),
+    (503, 'NetworkException', 'Service unavailable. Please try again.'),
+)
+
+TICKER_MODES = {'ltp', 'quote', 'full'}
+TICKER_MAX_TOKENS = 3000
+
+
+class LatencyModel:
+    """A latency distribution in seconds, parsed from 'kind:args' in milliseconds"""
+
+    KINDS = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+
+    def __init__(self, kind: str = 'constant', *params: float):
+        if kind not in self.KINDS:
+            raise ValueError(f"latency kind must be one of {', '.join(self.KINDS)}")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec) -> 'LatencyModel':
+        if isinstance(spec, LatencyModel):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls('constant', float(spec) * 1000)
+        kind, _, args = str(spec).partition(':')
+        if not args:
+            return cls('constant', float(kind))
+        return cls(kind, *(float(arg) for arg in args.split(',')))
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == 'constant':
+            ms = p[0] if p else 0.0
+        elif self.kind == 'uniform':
+            ms = rng.uniform(p[0], p[1])
+        elif self.kind == 'normal':
+            ms = rng.gauss(p[0], p[1])
+        elif self.kind == 'lognormal':
+            ms = p[0] * math.exp(rng.gauss(0, p[1]))
+        else:
+            ms = rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+        return max(ms, 0.0) / 1000
+
+    def __str__(self):
+        return f"{self.kind}:{','.join(f'{param:g}' for param in self.params)}"
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'tokens', 'updated')
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class FakeKite:
+    """
+    Instruments, a GBM price per symbol, per-account cash, positions and
+    orders, and the fault settings the HTTP layer applies.
+
+    Prices advance lazily: reading a symbol moves it by one exact GBM step
+    over the time since it was last read (scaled by `speed`), so idle
+    symbols cost nothing and any read rate gives the same distribution.
+    """
+
+    def __init__(self, symbols: int = 500, cash: float = 1_000_000.0, latency=0.0, seed: int = 7,
+                 volatility: float = 0.3, drift: float = 0.0, speed: float = 1.0,
+                 error_rate: float = 0.0, hang_rate: float = 0.0, hang_seconds: float = 10.0,
+                 reject_rate: float = 0.0, rate_limits: Dict[str, float] = None):
+        self.random = random.Random(seed)
+        self.cash = cash
+        self.volatility = volatility
+        self.drift = drift
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.order_ids = itertools.count(250000000000001)
+
+        self.latency = LatencyModel.parse(latency)
+        self.endpoint_latency: Dict[str, LatencyModel] = {}
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.reject_rate = reject_rate
+        self.rate_limits = dict(rate_limits or {})
+        self._buckets: Dict[tuple, TokenBucket] = {}
+
+        self.requests = Counter()
+        self.faults = Counter()
+
+        self.instruments: List[Dict[str, Any]] = []
+        self.prices: Dict[str, Dict[str, float]] = {}
+        self.by_token: Dict[int, str] = {}
+        for index in range(symbols):
+            symbol = f"FAKE{index:04d}"
+            token = ((400 + index) << 8) | NSE_SEGMENT
+            close = round(self.random.lognormvariate(5.5, 1.0), 2)
+            self.instruments.append({
+                'instrument_token': token, 'exchange_token': 400 + index, 'tradingsymbol': symbol,
+                'name': f"FAKE COMPANY {index}", 'last_price': 0.0, 'expiry': '', 'strike': 0.0,
+                'tick_size': TICK_SIZE, 'lot_size': 1, 'instrument_type': 'EQ', 'segment': 'NSE', 'exchange': 'NSE'
+            })
+            self.prices[symbol] = {'value': close, 'last': close, 'open': close, 'high': close, 'low': close,
+                                   'close': close, 'volume': 0, 'last_quantity': 0, 'token': token,
+                                   'updated': time.monotonic(), 'traded_at': time.time()}
+            self.by_token[token] = symbol
+        self.accounts: Dict[str, Dict[str, Any]] = {}
+        self.order_listeners: Dict[str, List[deque]] = {}
+
+    def account(self, token: str) -> Dict[str, Any]:
+        with self.lock:
+            account = self.accounts.get(token)
+            if account is None:
+                account = self.accounts[token] = {'cash': self.cash, 'positions': {}, 'orders': []}
+            return account
+
+    # Prices
+
+    def tick(self, symbol: str) -> Dict[str, float]:
+        """Advance the symbol's GBM by the time since it was last read"""
+        price = self.prices[symbol]
+        now = time.monotonic()
+        if now - price['updated'] < 0.05:
+            return price
+        with self.lock:
+            elapsed = now - price['updated']
+            if elapsed < 0.05:
+                return price
+            years = elapsed * self.speed / SECONDS_PER_YEAR
+            shock = self.random.gauss(0, 1)
+            price['value'] *= math.exp((self.drift - 0.5 * self.volatility ** 2) * years
+                                       + self.volatility * math.sqrt(years) * shock)
+            price['last'] = max(TICK_SIZE, round(round(price['value'] / TICK_SIZE) * TICK_SIZE, 2))
+            price['high'] = max(price['high'], price['last'])
+            price['low'] = min(price['low'], price['last'])
+            price['last_quantity'] = self.random.randint(1, 500)
+            price['volume'] += int(self.random.expovariate(1 / 2000.0) * elapsed * self.speed) + 1
+            price['updated'] = now
+            price['traded_at'] = time.time()
+        return price
+
+    def quote(self, key: str) -> Dict[str, Any]:
+        symbol = key.split(':')[-1]
+        price = self.tick(symbol)
+        now = datetime.now().strftime(KITE_TIME)
+        return {
+            'instrument_token': price['token'],
+            'timestamp': now,
+            'last_trade_time': datetime.fromtimestamp(price['traded_at']).strftime(KITE_TIME),
+            'last_price': price['last'],
+            'last_quantity': price['last_quantity'],
+            'volume': price['volume'],
+            'average_price': round((price['open'] + price['last']) / 2, 2),
+            'buy_quantity': 1000,
+            'sell_quantity': 1000,
+            'net_change': round(price['last'] - price['close'], 2),
+            'ohlc': {'open': price['open'], 'high': price['high'], 'low': price['low'], 'close': price['close']}
+        }
+
+    # Faults
+
+    def set_latency(self, spec: str):
+        """'kind:args' for every endpoint, or 'endpoint=kind:args' for one"""
+        endpoint, _, model = spec.rpartition('=')
+        if endpoint:
+            self.endpoint_latency[endpoint] = LatencyModel.parse(model)
+        else:
+            self.latency = LatencyModel.parse(model)
+
+    def delay(self, endpoint: str) -> float:
+        return self.endpoint_latency.get(endpoint, self.latency).sample(self.random)
+
+    def allow(self, token: str, limit: str) -> bool:
+        rate = self.rate_limits.get(limit, self.rate_limits.get('default'))
+        if not rate:
+            return True
+        key = (token, limit)
+        with self.lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.rate != rate:
+                bucket = self._buckets[key] = TokenBucket(rate)
+            return bucket.take()
+
+    def configure(self, settings: Dict[str, Any]):
+        for spec in ([settings['latency']] if isinstance(settings.get('latency'), str) else settings.get('latency') or []):
+            self.set_latency(spec)
+        for name in ('error_rate', 'hang_rate', 'hang_seconds', 'reject_rate', 'volatility', 'drift', 'speed'):
+            if name in settings:
+                setattr(self, name, float(settings[name]))
+        if 'rate_limits' in settings:
+            self.rate_limits = KITE_RATE_LIMITS.copy() if settings['rate_limits'] is True else dict(settings['rate_limits'] or {})
+            self._buckets.clear()
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            'latency': str(self.latency),
+            'endpoint_latency': {endpoint: str(model) for endpoint, model in self.endpoint_latency.items()},
+            'error_rate': self.error_rate, 'hang_rate': self.hang_rate, 'hang_seconds': self.hang_seconds,
+            'reject_rate': self.reject_rate, 'rate_limits': self.rate_limits,
+            'volatility': self.volatility, 'drift': self.drift, 'speed': self.speed
+        }
+
+    # Account
+
+    def margins(self, token: str) -> Dict[str, Any]:
+        cash = round(self.account(token)['cash'], 2)
+        return {
+            'enabled': True,
+            'net': cash,
+            'available': {'adhoc_margin': 0, 'cash': cash, 'opening_balance': cash, 'live_balance': cash,
+                          'collateral': 0, 'intraday_payin': 0},
+            'utilised': {'debits': 0, 'exposure': 0, 'm2m_realised': 0, 'm2m_unrealised': 0, 'option_premium': 0,
+                         'payout': 0, 'span': 0, 'holding_sales': 0, 'turnover': 0}
+        }
+
+    def place_order(self, token: str, form: Dict[str, Any]) -> str:
+        symbol = form.get('tradingsymbol', '')
+        if symbol not in self.prices:
+            raise KiteError('InputException', f"Invalid `tradingsymbol`: {symbol}", 400)
+        quantity = int(form.get('quantity', 0))
+        side = form.get('transaction_type', 'BUY').upper()
+        price = float(form.get('price') or self.tick(symbol)['last'])
+        account = self.account(token)
+        order = {
+            'order_id': None, 'status': 'COMPLETE', 'status_message': None, 'tradingsymbol': symbol,
+            'instrument_token': self.prices[symbol]['token'], 'exchange': 'NSE', 'transaction_type': side,
+            'quantity': quantity, 'filled_quantity': quantity, 'pending_quantity': 0, 'price': price,
+            'average_price': price, 'product': form.get('product', 'CNC'), 'order_type': form.get('order_type', 'LIMIT'),
+            'variety': form.get('variety', 'regular'), 'order_timestamp': datetime.now().strftime(KITE_TIME)
+        }
+        with self.lock:
+            if side == 'BUY' and quantity * price > account['cash']:
+                raise KiteError('InputException', 'Insufficient funds', 400)
+            order['order_id'] = str(next(self.order_ids))
+            if self.reject_rate and self.random.random() < self.reject_rate:
+                # Kite accepts the order id, then the exchange rejects it
+                order.update(status='REJECTED', filled_quantity=0, average_price=0.0,
+                             status_message='RMS:Rule: Fake rejection')
+                self.faults['rejected'] += 1
+            else:
+                account['cash'] += -quantity * price if side == 'BUY' else quantity * price
+                position = account['positions'].setdefault(symbol, {'quantity': 0, 'value': 0.0,
+                                                                    'product': order['product']})
+                position['quantity'] += quantity if side == 'BUY' else -quantity
+                position['value'] += quantity * price if side == 'BUY' else -quantity * price
+            account['orders'].append(order)
+            listeners = list(self.order_listeners.get(token, ()))
+        for outbox in listeners:
+            outbox.append(order)
+        return order['order_id']
+
+    def positions(self, token: str) -> Dict[str, List[Dict[str, Any]]]:
+        net = []
+        for symbol, position in list(self.account(token)['positions'].items()):
+            quantity = position['quantity']
+            last = self.tick(symbol)['last']
+            net.append({
+                'tradingsymbol': symbol, 'exchange': 'NSE', 'instrument_token': self.prices[symbol]['token'],
+                'product': position['product'], 'quantity': quantity,
+                'average_price': round(position['value'] / quantity, 2) if quantity else 0.0,
+                'last_price': last, 'pnl': round(quantity * last - position['value'], 2)
+            })
+        return {'net': net, 'day': net}
+
+    def holdings(self, token: str) -> List[Dict[str, Any]]:
+        """Long CNC positions, as if they had settled"""
+        return [{
+            'tradingsymbol': row['tradingsymbol'], 'exchange': 'NSE', 'instrument_token': row['instrument_token'],
+            'isin': f"INEFAKE{row['instrument_token'] % 100000:05d}", 'product': 'CNC', 'quantity': row['quantity'],
+            't1_quantity': 0, 'average_price': row['average_price'], 'last_price': row['last_price'],
+            'close_price': self.prices[row['tradingsymbol']]['close'], 'pnl': row['pnl']
+        } for row in self.positions(token)['net'] if row['product'] == 'CNC' and row['quantity'] > 0]
+
+    def instruments_csv(self, exchange: str = None) -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(self.instruments[0]))
+        writer.writeheader()
+        for instrument in self.instruments:
+            if exchange is None or instrument['exchange'] == exchange:
+                writer.writerow(dict(instrument, last_price=self.prices[instrument['tradingsymbol']]['last']))
+        return buffer.getvalue()
+
+    # Ticker
+
+    def tick_packet(self, token: int, mode: str) -> bytes:
+        """One instrument's binary tick in the KiteTicker layout (prices in paise)"""
+        price = self.tick(self.by_token[token])
+        paise = lambda value: int(round(value * 100))
+        if mode == 'ltp':
+            return struct.pack('>II', token, paise(price['last']))
+        packet = struct.pack('>11I', token, paise(price['last']), price['last_quantity'],
+                             paise((price['open'] + price['last']) / 2), price['volume'], 1000, 1000,
+                             paise(price['open']), paise(price['high']), paise(price['low']), paise(price['close']))
+        if mode == 'quote':
+            return packet
+        packet += struct.pack('>5I', int(price['traded_at']), 0, 0, 0, int(time.time()))
+        depth = b''
+        for side in (-1, 1):  # five bids below the last price, then five offers above it
+            for level in range(1, 6):
+                depth += struct.pack('>IIH2x', 100 * level, paise(price['last'] + side * level * TICK_SIZE), level)
+        return packet + depth
+
+
+class KiteError(Exception):
+    def __init__(self, error_type: str, message: str, status: int):
+        super().__init__(message)
+        self.error_type = error_type
+        self.status = status
+
+
+class _ClosedWebSocket(Response):
+    """Ends a ticker request without writing an HTTP response onto the finished WebSocket stream"""
+
+    def __call__(self, environ, start_response):
+        raise ConnectionError('WebSocket closed')  # werkzeug treats this as a dropped connection
+
+
+def _endpoint_name() -> str:
+    """The request's endpoint as KiteConnect names it: quote, ltp, ohlc, margins, place_order, ..."""
+    if request.endpoint == 'quote' and request.path.rstrip('/') != '/quote':
+        return request.path.rstrip('/').rsplit('/', 1)[1]
+    if request.endpoint == 'margins_segment':
+        return 'margins'
+    return request.endpoint or 'unmatched'
+
+
+def _rate_limit_class(endpoint: str) -> str:
+    if endpoint in ('quote', 'ltp', 'ohlc'):
+        return 'quote'
+    if endpoint == 'place_order':
+        return 'orders'
+    return 'default'
+
+
+def create_app(fake: FakeKite, ticker_interval: float = 1.0) -> Flask:
+    app = Flask('fake_kite')
+
+    def ok(data):
+        return Response(json.dumps({'status': 'success', 'data': data}), mimetype='application/json')
+
+    def token() -> str:
+        auth = request.headers.get('Authorization', '')
+        if not auth.startswith('token ') or ':' not in auth:
+            raise KiteError('TokenException', 'Incorrect `api_key` or `access_token`.', 403)
+        return auth.split(':', 1)[1]
+
+    @app.before_request
+    def inject_faults():
+        rule = request.url_rule.rule if request.url_rule else request.path
+        fake.requests[rule] += 1
+        if request.path.startswith('/_fake') or request.endpoint == 'ticker':
+            return
+        endpoint = _endpoint_name()
+        delay = fake.delay(endpoint)
+        if delay:
+            time.sleep(delay)
+        if fake.rate_limits:
+            auth = request.headers.get('Authorization', '')
+            if not fake.allow(auth.split(':', 1)[-1], _rate_limit_class(endpoint)):
+                fake.faults['rate_limited'] += 1
+                raise KiteError('NetworkException', 'Too many requests', 429)
+        roll = fake.random.random()
+        if roll < fake.hang_rate:
+            fake.faults['hung'] += 1
+            time.sleep(fake.hang_seconds)
+        elif roll < fake.hang_rate + fake.error_rate:
+            fake.faults['errors'] += 1
+            status, error_type, message = fake.random.choice(SERVER_ERRORS)
+            raise KiteError(error_type, message, status)
+
+    @app.errorhandler(KiteError)
+    def kite_error(error: KiteError):
+        body = {'status': 'error', 'message': str(error), 'data': None, 'error_type': error.error_type}
+        return Response(json.dumps(body), status=error.status, mimetype='application/json')
+
+    @app.route('/user/profile')
+    def profile():
+        return ok({'user_id': 'FK' + token()[-4:].upper(), 'user_name': 'Fake Kite', 'user_shortname': 'Fake',
+                   'email': 'fake@example.com', 'user_type': 'individual', 'broker': 'ZERODHA',
+                   'exchanges': ['NSE', 'BSE'], 'products': ['CNC', 'MIS', 'NRML'], 'order_types': ['MARKET', 'LIMIT']})
+
+    @app.route('/user/margins')
+    def margins():
+        return ok({'equity': fake.margins(token()), 'commodity': {'enabled': False, 'net': 0, 'available': {}, 'utilised': {}}})
+
+    @app.route('/user/margins/<segment>')
+    def margins_segment(segment):
+        return ok(fake.margins(token()))
+
+    @app.route('/portfolio/holdings')
+    def holdings():
+        return ok(fake.holdings(token()))
+
+    @app.route('/portfolio/positions')
+    def positions():
+        return ok(fake.positions(token()))
+
+    @app.route('/instruments')
+    @app.route('/instruments/<exchange>')
+    def instruments(exchange=None):
+        return Response(fake.instruments_csv(exchange), mimetype='text/csv')
+
+    @app.route('/quote')
+    @app.route('/quote/ohlc')
+    @app.route('/quote/ltp')
+    def quote():
+        token()
+        keys = [key for key in request.args.getlist('i') if key.split(':')[-1] in fake.prices]
+        quotes = {key: fake.quote(key) for key in keys}
+        if request.path.endswith('/ltp'):
+            quotes = {key: {'instrument_token': q['instrument_token'], 'last_price': q['last_price']} for key, q in quotes.items()}
+        elif request.path.endswith('/ohlc'):
+            quotes = {key: {'instrument_token': q['instrument_token'], 'last_price': q['last_price'], 'ohlc': q['ohlc']}
+                      for key, q in quotes.items()}
+        return ok(quotes)
+
+    @app.route('/orders')
+    def orders():
+        return ok(fake.account(token())['orders'])
+
+    @app.route('/orders/<variety>', methods=['POST'])
+    def place_order(variety):
+        return ok({'order_id': fake.place_order(token(), dict(request.form, variety=variety))})
+
+    @app.route('/ws', websocket=True)
+    def ticker():
+        """KiteTicker protocol: JSON subscribe/mode commands in, binary tick batches and order updates out"""
+        import simple_websocket
+        access_token = request.args.get('access_token')
+        if not request.args.get('api_key') or not access_token:
+            raise KiteError('TokenException', 'Missing `api_key` or `access_token`.', 403)
+        ws = simple_websocket.Server(request.environ)
+        modes: Dict[int, str] = {}
+        outbox: deque = deque()
+        with fake.lock:
+            fake.order_listeners.setdefault(access_token, []).append(outbox)
+        fake.requests['ticker_connections'] += 1
+        next_tick = time.monotonic() + ticker_interval
+        try:
+            while True:
+                message = ws.receive(timeout=min(0.2, max(0.0, next_tick - time.monotonic())))
+                if message is not None:
+                    error = _ticker_command(message, modes)
+                    if error:
+                        ws.send(json.dumps({'type': 'error', 'data': error}))
+                while outbox:
+                    ws.send(json.dumps({'type': 'order', 'data': outbox.popleft()}))
+                if time.monotonic() < next_tick:
+                    continue
+                next_tick += ticker_interval
+                if not modes:
+                    ws.send(b'\x00')  # heartbeat
+                    continue
+                packets = [fake.tick_packet(token, mode) for token, mode in list(modes.items())]
+                ws.send(struct.pack('>H', len(packets))
+                        + b''.join(struct.pack('>H', len(packet)) + packet for packet in packets))
+                fake.requests['ticker_packets'] += len(packets)
+        except simple_websocket.ConnectionClosed:
+            pass
+        finally:
+            with fake.lock:
+                fake.order_listeners[access_token].remove(outbox)
+            try:
+                # werkzeug's request handler still holds file objects on the socket; shut it down so the peer sees the close
+                ws.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return _ClosedWebSocket()
+
+    def _ticker_command(message, modes: Dict[int, str]) -> Optional[str]:
+        try:
+            command = json.loads(message)
+            action, value = command['a'], command['v']
+        except (ValueError, TypeError, KeyError):
+            return 'Invalid message'
+        if action == 'subscribe':
+            tokens = [token for token in value if token in fake.by_token]
+            if len(set(modes) | set(tokens)) > TICKER_MAX_TOKENS:
+                return f"Maximum {TICKER_MAX_TOKENS} instruments per connection"
+            for token in tokens:
+                modes.setdefault(token, 'quote')
+        elif action == 'unsubscribe':
+            for token in value:
+                modes.pop(token, None)
+        elif action == 'mode':
+            mode, tokens = value
+            if mode not in TICKER_MODES:
+                return f"Invalid mode: {mode}"
+            for token in tokens:
+                if token in modes:
+                    modes[token] = mode
+        return None
+
+    @app.route('/_fake/stats')
+    def stats():
+        return Response(json.dumps({'requests': dict(fake.requests), 'faults': dict(fake.faults),
+                                    'accounts': len(fake.accounts)}), mimetype='application/json')
+
+    @app.route('/_fake/config', methods=['GET', 'POST'])
+    def config():
+        if request.method == 'POST':
+            try:
+                fake.configure(request.get_json(force=True) or {})
+            except (ValueError, TypeError, IndexError) as e:
+                return Response(json.dumps({'error': str(e)}), status=400, mimetype='application/json')
+        return Response(json.dumps(fake.settings()), mimetype='application/json')
+
+    return app
+
+
+def serve_in_thread(fake: FakeKite, port: int, host: str = '127.0.0.1', ticker_interval: float = 1.0):
+    """Start the fake API on a background thread; returns the server (call .shutdown() to stop)"""
+    server = make_server(host, port, create_app(fake, ticker_interval), threaded=True)
+    threading.Thread(target=server.serve_forever, name='FakeKite', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local fake Kite Connect API and ticker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--cash', type=float, default=1_000_000.0)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--latency', action='append', default=[],
+                        help="latency in ms: '20', 'uniform:5,50', 'lognormal:30,0.5'; prefix 'endpoint=' for one endpoint")
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with a 5xx')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='fraction of requests that stall')
+    parser.add_argument('--hang-seconds', type=float, default=10.0)
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='fraction of orders the exchange rejects')
+    parser.add_argument('--rate-limit', action='store_true', help="enforce Kite's per-token request limits")
+    parser.add_argument('--volatility', type=float, default=0.3, help='annualised GBM volatility')
+    parser.add_argument('--drift', type=float, default=0.0, help='annualised GBM drift')
+    parser.add_argument('--speed', type=float, default=1.0, help='market seconds per wall-clock second')
+    parser.add_argument('--ticker-interval', type=float, default=1.0, help='seconds between tick batches')
+    args = parser.parse_args()
+
+    fake = FakeKite(symbols=args.symbols, cash=args.cash, seed=args.seed, volatility=args.volatility,
+                    drift=args.drift, speed=args.speed, error_rate=args.error_rate, hang_rate=args.hang_rate,
+                    hang_seconds=args.hang_seconds, reject_rate=args.reject_rate,
+                    rate_limits=KITE_RATE_LIMITS if args.rate_limit else None)
+    for spec in args.latency:
+        fake.set_latency(spec)
+    print(f"Fake Kite API on http://{args.host}:{args.port}, ticker on ws://{args.host}:{args.port}/ws "
+          f"({args.symbols} symbols)")
+    make_server(args.host, args.port, create_app(fake, args.ticker_interval), threaded=True).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
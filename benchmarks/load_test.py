@@ -0,0 +1,457 @@
+"""
+Whole-process load test against a local fake Kite API.
+
+Starts benchmarks/fake_kite.py in-process and the app in a child process
+pointed at it (KITE_ROOT_URL), with U users sharing the fake broker
+account. It then:
+
+- starts P paper and L live bots, spread round-robin across the users,
+  through /api/start_bot
+- opens N Socket.IO clients (raw Engine.IO WebSockets, logged in as the
+  users) that subscribe to account deltas and market frames, and poll
+  /api/dashboard_snapshot with ETags like the dashboard does
+- samples the server's CPU and RSS from /proc every second
+
+The JSON report covers HTTP and socket throughput, latency percentiles,
+dropped account frames (sequence gaps), trades, server CPU and memory,
+fake-broker traffic and the app's own /api/metrics histograms. Write it
+with --report and diff two commits with --compare:
+
+    python benchmarks/load_test.py --users 10 --paper-bots 20 --live-bots 5 --clients 50 --seconds 60 --report after.json
+    python benchmarks/load_test.py ... --compare before.json
+
+Live bots only trade while is_market_open(); the child forces it open
+unless --respect-market-hours is given.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = 'load-test'
+
+
+def serve(args):
+    """Child process: the app with U users whose Kite credentials point at the fake API"""
+    sys.path.insert(0, ROOT)
+    import app as trading_app
+    from app import app, db, socketio, init_database, User, UserSettings
+
+    for name in ('socketio.server', 'engineio.server', 'werkzeug'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    if not args.respect_market_hours:
+        trading_app.is_market_open = lambda: True
+
+    with app.app_context():
+        init_database()
+        for index in range(args.users):
+            user = User(username=f"load{index}", email=f"load{index}@example.com")
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.flush()
+            # One shared fake account: LiveTrading keeps a single Kite client per process
+            db.session.add(UserSettings(user_id=user.id, kite_api_key='fake-key', kite_access_token='fake-token'))
+        db.session.commit()
+
+    # SIGTERM exits through atexit so queued writes reach the database
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    options = {'host': '127.0.0.1', 'port': args.port}
+    if app.config['SOCKETIO_ASYNC_MODE'] == 'threading':
+        options['allow_unsafe_werkzeug'] = True
+    else:
+        options['log_output'] = False
+    socketio.run(app, **options)
+
+
+def wait_for_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def percentiles(values):
+    if not values:
+        return {'count': 0, 'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None}
+    ordered = sorted(values)
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+    return {'count': len(ordered), 'p50_ms': at(0.5), 'p90_ms': at(0.9), 'p99_ms': at(0.99), 'max_ms': at(1.0)}
+
+
+def login(base_url, index):
+    import requests
+    session = requests.Session()
+    response = session.post(f"{base_url}/login", data={'username': f"load{index}", 'password': PASSWORD},
+                            allow_redirects=False, timeout=30)
+    if response.status_code not in (302, 303) or 'session' not in session.cookies:
+        raise RuntimeError(f"login failed for load{index}: HTTP {response.status_code}")
+    return session
+
+
+class ProcessSampler:
+    """CPU seconds and RSS of one process from /proc (Linux), sampled every second"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self.rss = []
+        self.cpu_start = self.cpu_seconds()
+        self.started = time.monotonic()
+        self.cpu_end = self.cpu_start
+        self.ended = self.started
+
+    def cpu_seconds(self):
+        try:
+            with open(f"/proc/{self.pid}/stat") as stat:
+                fields = stat.read().rsplit(')', 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / self.ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss_mb(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return None
+
+    def run(self, stop):
+        while not stop.wait(1.0):
+            rss = self.rss_mb()
+            if rss is not None:
+                self.rss.append(rss)
+        self.cpu_end = self.cpu_seconds()
+        self.ended = time.monotonic()
+
+    def report(self):
+        cpu = None
+        if self.cpu_start is not None and self.cpu_end is not None:
+            cpu = round((self.cpu_end - self.cpu_start) / max(self.ended - self.started, 1e-9) * 100, 1)
+        return {
+            'cpu_percent': cpu,
+            'rss_mb_peak': round(max(self.rss), 1) if self.rss else None,
+            'rss_mb_end': round(self.rss[-1], 1) if self.rss else None
+        }
+
+
+class LoadClient:
+    """One browser tab: a Socket.IO connection plus the dashboard snapshot poller"""
+
+    def __init__(self, base_url, http, symbols, mode, poll_interval, frame_interval, stop):
+        self.base_url = base_url
+        self.http = http
+        self.symbols = symbols
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.frame_interval = frame_interval
+        self.stop = stop
+
+        self.connected = False
+        self.events = Counter()
+        self.frame_latencies = []
+        self.seq_gaps = 0
+        self.dropped_frames = 0
+        self.socket_errors = Counter()
+        self.http_latencies = []
+        self.http_status = Counter()
+
+    # Socket.IO over a raw WebSocket
+
+    def run_socket(self):
+        import simple_websocket
+        host = self.base_url.split('://', 1)[1]
+        cookie = '; '.join(f"{name}={value}" for name, value in self.http.cookies.items())
+        try:
+            ws = simple_websocket.Client.connect(f"ws://{host}/socket.io/?EIO=4&transport=websocket",
+                                                 headers={'Cookie': cookie})
+            ws.receive(timeout=30)  # Engine.IO open
+            ws.send('40')
+            while not ws.receive(timeout=30).startswith('40'):
+                pass
+            self.connected = True
+            ws.send('42' + json.dumps(['account_subscribe', {'mode': self.mode}]))
+            ws.send('42' + json.dumps(['subscribe_market_data', {'symbols': self.symbols, 'interval': self.frame_interval}]))
+        except Exception as e:
+            self.socket_errors[str(e) or type(e).__name__] += 1
+            return
+
+        seq = None
+        try:
+            while not self.stop.is_set():
+                packet = ws.receive(timeout=0.5)
+                if packet is None:
+                    continue
+                if packet == '2':
+                    ws.send('3')
+                    continue
+                if not packet.startswith('42'):
+                    continue
+                body = packet[2:]
+                ack_id = ''
+                while body and body[0].isdigit():
+                    ack_id, body = ack_id + body[0], body[1:]
+                event, payload = json.loads(body)[:2]
+                self.events[event] += 1
+                if ack_id:
+                    ws.send(f"43{ack_id}[]")
+                if event == 'market_frame':
+                    self.frame_latencies.append((datetime.now() - datetime.fromisoformat(payload['t'])).total_seconds())
+                elif event == 'account_snapshot':
+                    seq = payload.get('seq')
+                elif event == 'account_delta' and seq is not None:
+                    if payload['seq'] > seq + 1:
+                        self.seq_gaps += 1
+                        self.dropped_frames += payload['seq'] - seq - 1
+                        ws.send('42' + json.dumps(['account_resync', {'mode': self.mode, 'since': seq}]))
+                    seq = max(seq, payload['seq'])
+        except Exception as e:
+            self.socket_errors[str(e) or type(e).__name__] += 1
+        finally:
+            ws.close()
+
+    # Dashboard polling
+
+    def run_poller(self):
+        etag = None
+        # Spread the first polls so the clients do not fire in lockstep
+        self.stop.wait(random.uniform(0, self.poll_interval))
+        while not self.stop.is_set():
+            headers = {'If-None-Match': etag} if etag else {}
+            started = time.perf_counter()
+            try:
+                response = self.http.get(f"{self.base_url}/api/dashboard_snapshot", params={'mode': self.mode},
+                                         headers=headers, timeout=30)
+                self.http_latencies.append(time.perf_counter() - started)
+                self.http_status[response.status_code] += 1
+                etag = response.headers.get('ETag', etag)
+            except Exception as e:
+                self.http_status[type(e).__name__] += 1
+            self.stop.wait(self.poll_interval)
+
+
+def start_bots(base_url, sessions, paper, live, strategies):
+    results = Counter()
+    reasons = Counter()
+    plan = ['paper'] * paper + ['live'] * live
+    for index, mode in enumerate(plan):
+        http = sessions[index % len(sessions)]
+        try:
+            response = http.post(f"{base_url}/api/start_bot", timeout=60, json={
+                'strategy': strategies[index % len(strategies)],
+                'trading_mode': mode,
+                'capital': 10000,
+                'target_profit': 0,
+                'max_duration_hours': 8,
+                'strategy_params': {'risk_level': '100', 'order_type': 'CNC'}
+            })
+            body = response.json()
+        except Exception as e:
+            body = {'success': False, 'reason': type(e).__name__}
+        if body.get('success'):
+            results[f"{mode}_started"] += 1
+        else:
+            results[f"{mode}_failed"] += 1
+            reasons[body.get('reason') or body.get('error', 'unknown')[:80]] += 1
+    return dict(results), dict(reasons)
+
+
+def count_trades(db_path):
+    try:
+        with sqlite3.connect(db_path) as conn:
+            return dict(conn.execute('SELECT trading_mode, COUNT(*) FROM trades GROUP BY trading_mode').fetchall())
+    except sqlite3.Error:
+        return {}
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return revision + ('-dirty' if dirty else '')
+    except OSError:
+        return None
+
+
+def compare(report, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    print(f"{'metric':40} {'baseline':>12} {'current':>12} {'change':>9}", file=sys.stderr)
+    for key, value in report['summary'].items():
+        before = baseline.get('summary', {}).get(key)
+        change = ''
+        if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+            change = f"{(value - before) / before * 100:+.1f}%"
+        print(f"{key:40} {str(before):>12} {str(value):>12} {change:>9}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the app with bots and socket clients against a fake Kite API')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--paper-bots', type=int, default=20)
+    parser.add_argument('--live-bots', type=int, default=5)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--symbols', type=int, default=500, help='instruments on the fake exchange')
+    parser.add_argument('--watch', type=int, default=20, help='symbols each client subscribes to')
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--frame-interval', type=float, default=1.0)
+    parser.add_argument('--kite-latency-ms', type=float, default=20.0)
+    parser.add_argument('--kite-error-rate', type=float, default=0.0, help='fraction of broker calls that fail with a 5xx')
+    parser.add_argument('--strategies', default='moving_average_crossover,mean_reversion',
+                        help='registered strategy names the bots cycle through')
+    parser.add_argument('--mode', choices=('threading', 'eventlet', 'gevent'), default='threading')
+    parser.add_argument('--port', type=int, default=5060)
+    parser.add_argument('--kite-port', type=int, default=5061)
+    parser.add_argument('--respect-market-hours', action='store_true')
+    parser.add_argument('--report', help='write the JSON report here as well as to stdout')
+    parser.add_argument('--compare', help='baseline report to print the summary against')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    from fake_kite import FakeKite, serve_in_thread
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    fake = FakeKite(symbols=args.symbols, latency=args.kite_latency_ms / 1000, error_rate=args.kite_error_rate)
+    kite_server = serve_in_thread(fake, args.kite_port)
+
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    db_path = os.path.join(workdir, 'load.db')
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{db_path}",
+               KITE_ROOT_URL=f"http://127.0.0.1:{args.kite_port}",
+               SOCKETIO_ASYNC_MODE=args.mode,
+               SOCKETIO_LOGGING='0',
+               SERVER_MODE='production')
+    child = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(args.port), '--users', str(args.users)]
+    if args.respect_market_hours:
+        child.append('--respect-market-hours')
+    server = subprocess.Popen(child, env=env, cwd=workdir, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.port}"
+    stop = threading.Event()
+    try:
+        if not wait_for_port(args.port, 60):
+            raise SystemExit('server did not start')
+        sessions = [login(base_url, index) for index in range(args.users)]
+        sampler = ProcessSampler(server.pid)
+        sampler_thread = threading.Thread(target=sampler.run, args=(stop,), daemon=True)
+        sampler_thread.start()
+
+        bots, bot_failures = start_bots(base_url, sessions, args.paper_bots, args.live_bots,
+                                        args.strategies.split(','))
+
+        symbols = [instrument['tradingsymbol'] for instrument in fake.instruments]
+        clients = [LoadClient(base_url, sessions[index % len(sessions)], random.sample(symbols, min(args.watch, len(symbols))),
+                              'paper', args.poll_interval, args.frame_interval, stop)
+                   for index in range(args.clients)]
+        threads = []
+        for client in clients:
+            threads.append(threading.Thread(target=client.run_socket, daemon=True))
+            threads.append(threading.Thread(target=client.run_poller, daemon=True))
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        elapsed = time.perf_counter() - started
+        server_metrics = sessions[0].get(f"{base_url}/api/metrics", timeout=30).json()
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=10)
+        sampler_thread.join(timeout=5)
+    finally:
+        stop.set()
+        server.terminate()
+        server.wait(timeout=30)
+        kite_server.shutdown()
+
+    events = Counter()
+    status = Counter()
+    socket_errors = Counter()
+    for client in clients:
+        events.update(client.events)
+        status.update({str(code): count for code, count in client.http_status.items()})
+        socket_errors.update(client.socket_errors)
+    http_latency = percentiles([latency for client in clients for latency in client.http_latencies])
+    frame_latency = percentiles([latency for client in clients for latency in client.frame_latencies])
+    messages = sum(events.values())
+    requests_made = sum(status.values())
+    trades = count_trades(db_path)
+    shutil.rmtree(workdir, ignore_errors=True)
+    server_stats = sampler.report()
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('serve', 'report', 'compare')},
+        'seconds': round(elapsed, 2),
+        'bots': {**bots, 'failures': bot_failures},
+        'trades': trades,
+        'server': server_stats,
+        'http': {'requests': requests_made, 'status': dict(status), 'latency': http_latency},
+        'socket': {
+            'connected': sum(1 for client in clients if client.connected),
+            'messages': messages,
+            'by_event': dict(events),
+            'frame_delivery': frame_latency,
+            'account_seq_gaps': sum(client.seq_gaps for client in clients),
+            'dropped_account_frames': sum(client.dropped_frames for client in clients),
+            'errors': dict(socket_errors)
+        },
+        'fake_kite': {'requests': dict(fake.requests), 'faults': dict(fake.faults)},
+        'server_metrics': server_metrics.get('histograms', []),
+        'summary': {
+            'bots_started': bots.get('paper_started', 0) + bots.get('live_started', 0),
+            'trades_per_second': round(sum(trades.values()) / elapsed, 2),
+            'http_requests_per_second': round(requests_made / elapsed, 2),
+            'http_p50_ms': http_latency['p50_ms'],
+            'http_p99_ms': http_latency['p99_ms'],
+            'socket_messages_per_second': round(messages / elapsed, 2),
+            'frame_delivery_p50_ms': frame_latency['p50_ms'],
+            'frame_delivery_p99_ms': frame_latency['p99_ms'],
+            'dropped_account_frames': sum(client.dropped_frames for client in clients),
+            'socket_clients_connected': sum(1 for client in clients if client.connected),
+            'server_cpu_percent': server_stats['cpu_percent'],
+            'server_rss_mb_peak': server_stats['rss_mb_peak'],
+            'kite_requests_per_second': round(sum(fake.requests.values()) / elapsed, 2)
+        }
+    }
+
+    output = json.dumps(report, indent=2, default=str)
+    print(output)
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            report_file.write(output + '\n')
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,14 +6,53 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     
     # Database Config
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///alphatrader.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///trading_bot.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLite tuning / group-commit writer
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    GROUP_COMMIT_WINDOW_MS = int(os.environ.get('GROUP_COMMIT_WINDOW_MS', 5))
+    GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 500))
+
+    # Retention / archival of logs and trades
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'archive')
+    RETENTION_LOG_DAYS = int(os.environ.get('RETENTION_LOG_DAYS', 7))
+    RETENTION_TRADE_DAYS = int(os.environ.get('RETENTION_TRADE_DAYS', 90))
+    RETENTION_INTERVAL_SECONDS = int(os.environ.get('RETENTION_INTERVAL_SECONDS', 3600))
+
+    # Equity-curve sampling and downsampling
+    EQUITY_SAMPLE_SECONDS = float(os.environ.get('EQUITY_SAMPLE_SECONDS', 1.0))
+    EQUITY_RAW_RETENTION_HOURS = int(os.environ.get('EQUITY_RAW_RETENTION_HOURS', 2))
+    EQUITY_MINUTE_RETENTION_DAYS = int(os.environ.get('EQUITY_MINUTE_RETENTION_DAYS', 7))
+
+    # Micro-caches behind the dashboard endpoints (seconds)
+    DASHBOARD_SNAPSHOT_TTL = float(os.environ.get('DASHBOARD_SNAPSHOT_TTL', 1.0))
+    ACCOUNT_STATE_TTL = float(os.environ.get('ACCOUNT_STATE_TTL', 1.0))
+    KITE_STATUS_TTL = float(os.environ.get('KITE_STATUS_TTL', 30.0))
+
+    # Socket push cadence (seconds)
+    ACCOUNT_PUSH_INTERVAL = float(os.environ.get('ACCOUNT_PUSH_INTERVAL', 2.0))
+    MARKET_STREAM_INTERVAL = float(os.environ.get('MARKET_STREAM_INTERVAL', 5.0))
+    MARKET_FRAME_INTERVAL = float(os.environ.get('MARKET_FRAME_INTERVAL', 1.0))
+
+    # Per-user watch universe: recompute when cash moves by more than the tolerance or the entry ages out
+    UNIVERSE_BALANCE_TOLERANCE = float(os.environ.get('UNIVERSE_BALANCE_TOLERANCE', 0.05))
+    UNIVERSE_MAX_AGE_SECONDS = float(os.environ.get('UNIVERSE_MAX_AGE_SECONDS', 900))
+    UNIVERSE_CHECK_SECONDS = float(os.environ.get('UNIVERSE_CHECK_SECONDS', 30))
     
     # Session Config
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
     
-    # SocketIO Config
-    SOCKETIO_ASYNC_MODE = 'threading'
+    # SocketIO Config: 'development' runs threading mode on the Werkzeug dev server with
+    # debug and packet logging; 'production' runs a green-thread server (eventlet or gevent)
+    SERVER_MODE = os.environ.get('SERVER_MODE', 'development')
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE',
+                                         'eventlet' if SERVER_MODE == 'production' else 'threading')
+    SOCKETIO_LOGGING = os.environ.get('SOCKETIO_LOGGING', '0' if SERVER_MODE == 'production' else '1') == '1'
+    SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.environ.get('SERVER_PORT', 5000))
     
     # Trading Config
     PAPER_TRADING_INITIAL_CAPITAL = 100000.0
@@ -21,9 +60,36 @@ class Config:
     # Kite Connect Config
     KITE_API_KEY = os.environ.get('KITE_API_KEY', '')
     KITE_API_SECRET = os.environ.get('KITE_API_SECRET', '')
+    # Alternative API root, e.g. a local fake server for load tests; unset means api.kite.trade
+    KITE_ROOT_URL = os.environ.get('KITE_ROOT_URL') or None
     
-    # Logging Config
-    LOG_LEVEL = 'INFO'
+    # Logging Config: records are queued and written by a listener thread (utils.helpers.setup_logging)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    # Per-logger levels, e.g. 'app.bot=DEBUG,app.strategy=WARNING,werkzeug=WARNING'
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+    # 'text' or 'json' (one object per line)
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_FILE = os.environ.get('LOG_FILE') or None
+    # Identical messages beyond LOG_REPEAT_BURST per window are dropped and counted
+    LOG_REPEAT_WINDOW_SECONDS = float(os.environ.get('LOG_REPEAT_WINDOW_SECONDS', 10))
+    LOG_REPEAT_BURST = int(os.environ.get('LOG_REPEAT_BURST', 5))
+
+    # Hot-path latency histograms and counters, exposed at /metrics; '0' turns recording into no-ops
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+    # Comma-separated usernames allowed to use the /api/admin endpoints (runtime profiler)
+    ADMIN_USERNAMES = {name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()}
+    # Longest profiling capture the admin API will run
+    PROFILER_MAX_SECONDS = float(os.environ.get('PROFILER_MAX_SECONDS', 300))
+
+    # Pipeline tracing: spans kept in the ring buffer, and the latency budgets that raise a warning
+    TRACE_BUFFER_SPANS = int(os.environ.get('TRACE_BUFFER_SPANS', 10000))
+    LATENCY_BUDGET_TICK_TO_ORDER_MS = float(os.environ.get('LATENCY_BUDGET_TICK_TO_ORDER_MS', 1000))
+    LATENCY_BUDGET_ORDER_TO_ACK_MS = float(os.environ.get('LATENCY_BUDGET_ORDER_TO_ACK_MS', 2000))
+
+    # Shared indicator graph: a symbol's indicators advance at most once per this many seconds,
+    # however many bots feed it quotes (matches the bot loop's 5 s cadence)
+    INDICATOR_TICK_SECONDS = float(os.environ.get('INDICATOR_TICK_SECONDS', 5.0))
     
     # Market Hours (IST)
     MARKET_OPEN_TIME = '09:15:00'
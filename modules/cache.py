@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small in-process cache with per-entry expiry and single-flight loading.
+
+    `get_or_load()` lets exactly one thread run the loader for a missing or
+    expired key while concurrent callers for the same key wait for its
+    result, so a burst of dashboard requests costs one settings lookup or
+    one broker call per TTL window rather than one per request.
+    """
+
+    def __init__(self, default_ttl: float = 1.0, max_entries: int = 10000):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self.counters = {'hits': 0, 'misses': 0, 'loads': 0, 'evictions': 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.counters['hits'] += 1
+                return entry[1]
+            self.counters['misses'] += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                self._evict_locked()
+            self._entries[key] = (time.monotonic() + (self.default_ttl if ttl is None else ttl), value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[1]
+            value = loader()
+            self.counters['loads'] += 1
+            self.set(key, value, ttl)
+            with self._lock:
+                self._loading.pop(key, None)
+            return value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """Drop every key matching predicate, e.g. all entries for one user"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        expired = [key for key, (expires, _) in self._entries.items() if expires <= now]
+        for key in expired or [min(self._entries, key=lambda k: self._entries[k][0])]:
+            del self._entries[key]
+            self.counters['evictions'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries))
@@ -0,0 +1,258 @@
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, List, Any, Callable, Iterable, Optional, Tuple
+
+from modules.metrics import REGISTRY as metrics
+
+metrics.describe('indicator_updates_total', 'Indicator graph node updates (one per node per tick)')
+
+NodeKey = Tuple[str, str, Tuple[Tuple[str, Any], ...]]
+
+
+class Node:
+    """
+    One indicator of one symbol. `value` is None until the node has seen
+    enough input; `update()` gets its inputs' values once per tick.
+    """
+
+    __slots__ = ('key', 'inputs', 'children', 'refs', 'depth', 'value')
+
+    def __init__(self, key: NodeKey, inputs: List['Node']):
+        self.key = key
+        self.inputs = inputs
+        self.children: List[Node] = []
+        self.refs = 0
+        self.depth = 1 + max((node.depth for node in inputs), default=-1)
+        self.value: Optional[float] = None
+
+    @property
+    def symbol(self) -> str:
+        return self.key[0]
+
+    def update(self, *values):
+        raise NotImplementedError
+
+
+class PriceNode(Node):
+    """The graph's source for a symbol: the tick's last price"""
+
+    __slots__ = ('bucket',)
+
+    def __init__(self, key: NodeKey, inputs: List[Node]):
+        super().__init__(key, inputs)
+        self.bucket = None
+
+    def update(self, price: float):
+        self.value = price
+
+
+class SMANode(Node):
+    """
+    Simple moving average of the last `window` prices, O(1) per tick. The
+    running total drifts by float rounding, so every `resync_every` ticks
+    it is recomputed from the window (as RollingWindow does).
+    """
+
+    __slots__ = ('window', 'prices', 'total', 'resync_every', 'ticks')
+
+    def __init__(self, key: NodeKey, inputs: List[Node], window: int, resync_every: int = None):
+        super().__init__(key, inputs)
+        self.window = int(window)
+        self.prices = deque()
+        self.total = 0.0
+        self.resync_every = resync_every or 64 * self.window
+        self.ticks = 0
+
+    def update(self, price: float):
+        self.prices.append(price)
+        self.total += price
+        if len(self.prices) > self.window:
+            self.total -= self.prices.popleft()
+        self.ticks += 1
+        if self.ticks % self.resync_every == 0:
+            self.total = sum(self.prices)
+        if len(self.prices) == self.window:
+            self.value = self.total / self.window
+
+
+class RSINode(Node):
+    """
+    RSI over the last `period` price changes, as simple averages of gains
+    and losses (RSIStrategy's formula). The running totals are recomputed
+    from the window every `resync_every` ticks, like SMANode's.
+    """
+
+    __slots__ = ('period', 'last', 'gains', 'losses', 'gain_total', 'loss_total', 'resync_every', 'ticks')
+
+    def __init__(self, key: NodeKey, inputs: List[Node], period: int, resync_every: int = None):
+        super().__init__(key, inputs)
+        self.period = int(period)
+        self.last = None
+        self.gains = deque()
+        self.losses = deque()
+        self.gain_total = 0.0
+        self.loss_total = 0.0
+        self.resync_every = resync_every or 64 * self.period
+        self.ticks = 0
+
+    def update(self, price: float):
+        last, self.last = self.last, price
+        if last is None:
+            return
+        change = price - last
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.gain_total += gain
+        self.loss_total += loss
+        if len(self.gains) > self.period:
+            self.gain_total -= self.gains.popleft()
+            self.loss_total -= self.losses.popleft()
+        self.ticks += 1
+        if self.ticks % self.resync_every == 0:
+            self.gain_total = sum(self.gains)
+            self.loss_total = sum(self.losses)
+        if len(self.gains) == self.period:
+            if self.loss_total <= 1e-12:
+                self.value = 100.0
+            else:
+                self.value = 100.0 - 100.0 / (1.0 + self.gain_total / self.loss_total)
+
+
+# Indicator name -> node class; every indicator reads the symbol's price node
+INDICATORS: Dict[str, Callable[..., Node]] = {
+    'sma': SMANode,
+    'rsi': RSINode
+}
+
+
+class IndicatorGraph:
+    """
+    Indicators shared by every bot in the process, keyed by (symbol,
+    indicator, params).
+
+    Bots `subscribe()` to the nodes they read and `release()` them when
+    they stop; nodes are reference counted (a node also holds a reference
+    on each of its inputs) and evicted when the last reader goes. Each
+    bot passes its quotes to `update()`, but a symbol's price node takes
+    at most one price per `tick_seconds` bucket and only then are its
+    dependents recomputed, in depth order, once each. The work per tick
+    therefore follows the number of distinct indicators, not the number
+    of bots reading them. A node created after its symbol's price arrived
+    for the current bucket is seeded with that price, so it does not miss
+    the tick the other readers already got.
+    """
+
+    def __init__(self, tick_seconds: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.tick_seconds = tick_seconds
+        self.clock = clock
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._nodes: Dict[NodeKey, Node] = {}
+        self.counters = {'ticks': 0, 'stale_ticks': 0, 'updates': 0, 'created': 0, 'evicted': 0}
+
+    @staticmethod
+    def key(symbol: str, indicator: str, **params) -> NodeKey:
+        return symbol, indicator, tuple(sorted(params.items()))
+
+    # Subscriptions
+
+    def subscribe(self, symbol: str, indicator: str, **params) -> Node:
+        if indicator != 'price' and indicator not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {indicator}")
+        with self._lock:
+            return self._acquire(self.key(symbol, indicator, **params))
+
+    def _acquire(self, key: NodeKey) -> Node:
+        node = self._nodes.get(key)
+        if node is None:
+            symbol, indicator, params = key
+            if indicator == 'price':
+                node = PriceNode(key, [])
+            else:
+                source = self._acquire(self.key(symbol, 'price'))
+                node = INDICATORS[indicator](key, [source], **dict(params))
+                source.children.append(node)
+                if source.value is not None and source.bucket == self._bucket():
+                    node.update(source.value)
+            self._nodes[key] = node
+            self.counters['created'] += 1
+        node.refs += 1
+        return node
+
+    def release(self, nodes: Iterable[Node]):
+        with self._lock:
+            for node in nodes:
+                self._release(node)
+
+    def _release(self, node: Node):
+        node.refs -= 1
+        if node.refs > 0:
+            return
+        if self._nodes.get(node.key) is node:
+            del self._nodes[node.key]
+            self.counters['evicted'] += 1
+        for source in node.inputs:
+            source.children.remove(node)
+            self._release(source)
+
+    # Ticks
+
+    def _bucket(self, now: float = None) -> int:
+        return int((self.clock() if now is None else now) // self.tick_seconds)
+
+    def update(self, prices: Dict[str, float], now: float = None):
+        """Feed one quote per symbol; symbols already updated in this tick bucket are skipped"""
+        bucket = self._bucket(now)
+        updated = 0
+        with self._lock:
+            for symbol, price in prices.items():
+                source = self._nodes.get((symbol, 'price', ()))
+                if source is None:
+                    continue
+                if source.bucket == bucket:
+                    self.counters['stale_ticks'] += 1
+                    continue
+                source.bucket = bucket
+                source.update(price)
+                updated += 1 + self._propagate(source)
+                self.counters['ticks'] += 1
+            self.counters['updates'] += updated
+        if updated:
+            metrics.inc('indicator_updates_total', updated)
+
+    @staticmethod
+    def _propagate(source: Node) -> int:
+        """Recompute everything downstream of `source` once, inputs before the nodes that read them"""
+        pending, seen = list(source.children), set()
+        affected = []
+        while pending:
+            node = pending.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            affected.append(node)
+            pending.extend(node.children)
+        affected.sort(key=lambda node: node.depth)
+        for node in affected:
+            node.update(*(parent.value for parent in node.inputs))
+        return len(affected)
+
+    def values(self, nodes: Iterable[Node]) -> List[Optional[float]]:
+        """Current values of `nodes`, read together so they belong to the same tick"""
+        with self._lock:
+            return [node.value for node in nodes]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_indicator: Dict[str, int] = {}
+            for symbol, indicator, params in self._nodes:
+                by_indicator[indicator] = by_indicator.get(indicator, 0) + 1
+            return dict(self.counters, nodes=len(self._nodes), by_indicator=by_indicator,
+                        tick_seconds=self.tick_seconds)
+
+
+GRAPH = IndicatorGraph()
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+
+class CorruptSnapshotError(Exception):
+    """The snapshot cannot be read; the journal alone no longer holds the full state"""
+
+
+class TradeJournal:
+    """
+    Append-only write-ahead journal with compacted snapshots.
+
+    Events are appended as one JSON line each and fsync'd once per batch
+    (when `batch_size` events are pending or `flush_interval` seconds have
+    passed). A snapshot stores the full state together with the sequence
+    number of the last event it contains; writing one truncates the journal.
+    On startup the snapshot is loaded and any newer events are replayed.
+    """
+
+    def __init__(self,
+                 journal_file: str,
+                 snapshot_file: str,
+                 batch_size: int = 64,
+                 flush_interval: float = 0.05,
+                 snapshot_every: int = 1000):
+        self.journal_file = journal_file
+        self.snapshot_file = snapshot_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.logger = logging.getLogger(__name__)
+
+        self.seq = 0
+        self.snapshot_seq = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._closed = False
+        self._flusher = None
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Return the last snapshot state and the journal events recorded after it.
+
+        A torn final line (a crash mid-write) is cut off the file, so new
+        events are not appended onto it. An unreadable snapshot raises
+        CorruptSnapshotError: the journal only holds the events since that
+        snapshot, so starting from an empty state would lose the rest.
+        """
+        state = None
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r') as f:
+                    state = json.load(f)
+                self.snapshot_seq = int(state.get('journal_seq', 0))
+            except Exception as e:
+                raise CorruptSnapshotError(f"Cannot load snapshot {self.snapshot_file}: {e}") from e
+
+        events = []
+        if os.path.exists(self.journal_file):
+            good_end, terminated = 0, True
+            with open(self.journal_file, 'rb') as f:
+                for raw in f:
+                    line = raw.strip()
+                    if line:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            # A torn final line from a crash mid-write; everything before it is intact
+                            self.logger.warning(f"Truncating torn journal entry in {self.journal_file} at byte {good_end}")
+                            break
+                        if event.get('seq', 0) > self.snapshot_seq:
+                            events.append(event)
+                    good_end += len(raw)
+                    terminated = raw.endswith(b'\n')
+                size = f.seek(0, os.SEEK_END)
+            if good_end < size or not terminated:
+                with open(self.journal_file, 'r+b') as f:
+                    f.truncate(good_end)
+                    if not terminated:
+                        # The last event is complete but lost its newline; end it before appending
+                        f.seek(good_end)
+                        f.write(b'\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        self.seq = events[-1]['seq'] if events else self.snapshot_seq
+        self._open()
+        return state, events
+
+    def _open(self):
+        self._file = open(self.journal_file, 'a')
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='JournalFlusher', daemon=True)
+            self._flusher.start()
+
+    def append(self, event: Dict[str, Any]) -> int:
+        """Append an event and return its sequence number"""
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self.seq += 1
+            event['seq'] = self.seq
+            self._file.write(json.dumps(event, separators=(',', ':')) + '\n')
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._sync_locked()
+            return self.seq
+
+    def sync(self):
+        """Flush and fsync any pending events"""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._file is None or self._pending == 0:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def _flush_loop(self):
+        while not self._closed:
+            time.sleep(self.flush_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                self.logger.error(f"Journal flush error: {e}")
+
+    def needs_snapshot(self) -> bool:
+        return self.seq - self.snapshot_seq >= self.snapshot_every
+
+    def write_snapshot(self, state: Dict[str, Any]):
+        """Atomically write a compacted snapshot and truncate the journal"""
+        with self._lock:
+            self._sync_locked()
+            state['journal_seq'] = self.seq
+            tmp_file = self.snapshot_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            self.snapshot_seq = self.seq
+
+            # Everything up to snapshot_seq is now in the snapshot; replay skips
+            # older entries anyway, so a crash before this truncate is harmless.
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.journal_file, 'w')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._sync_locked()
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,165 @@
+import atexit
+import queue
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Callable
+
+
+class LogSink:
+    """
+    Asynchronous, batched sink for Log rows.
+
+    Callers enqueue events without touching the database. A writer thread
+    drains the queue and bulk-inserts up to `batch_size` rows (one
+    executemany, one commit) every `flush_interval_ms` milliseconds, then
+    fans each batch out to the `log_update` socket event. The queue is
+    bounded: when it is full new events are dropped and counted instead of
+    blocking the bot thread that produced them.
+    """
+
+    def __init__(self, app, db, log_model, socketio=None,
+                 batch_size: int = 200,
+                 flush_interval_ms: int = 250,
+                 max_queue: int = 10000,
+                 room_for_user: Callable[[int], str] = None,
+                 writer=None):
+        self.app = app
+        self.db = db
+        self.table = log_model.__table__
+        self.socketio = socketio
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.room_for_user = room_for_user
+        self.writer = writer  # optional GroupCommitWriter shared with other writers
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._running = False
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_drop_report = 0.0
+        self._counter_lock = threading.Lock()
+        self.counters = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'batches': 0,
+            'write_errors': 0
+        }
+        atexit.register(self.shutdown)
+
+    def start(self):
+        with self._start_lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._writer_loop, name='LogSinkWriter', daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        """Stop the writer and flush whatever is still queued"""
+        self._running = False
+        self.flush()
+
+    def emit(self, user_id: int, message: str, level: str = 'INFO') -> bool:
+        """Queue a log event; returns False if it was dropped because the queue is full"""
+        if not self._running:
+            self.start()
+        event = {
+            'user_id': user_id,
+            'message': message,
+            'level': level,
+            'timestamp': datetime.utcnow()
+        }
+        try:
+            self._queue.put_nowait(event)
+            self._count('enqueued')
+            return True
+        except queue.Full:
+            self._count('dropped')
+            now = time.monotonic()
+            if now - self._last_drop_report > 10:
+                self._last_drop_report = now
+                self.logger.warning(f"Log sink queue full, dropped {self.counters['dropped']} events so far")
+            return False
+
+    def _count(self, name: str, amount: int = 1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters, queued=self._queue.qsize(), capacity=self._queue.maxsize)
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _writer_loop(self):
+        while self._running:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # Give the batch until the deadline to fill, blocking on the queue rather than polling it
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def flush(self):
+        """Synchronously write everything currently queued"""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        with self._flush_lock:
+            try:
+                if self.writer is not None:
+                    self.writer.execute(self.table.insert(), batch).result()  # executemany
+                else:
+                    with self.app.app_context():
+                        with self.db.engine.begin() as conn:
+                            conn.execute(self.table.insert(), batch)  # executemany
+                self._count('written', len(batch))
+                self._count('batches')
+            except Exception as e:
+                self._count('write_errors')
+                self.logger.error(f"Log sink failed to write {len(batch)} rows: {e}")
+                return
+
+        self._fan_out(batch)
+
+    def _fan_out(self, batch: List[Dict[str, Any]]):
+        if not self.socketio:
+            return
+        by_user: Dict[int, List[Dict[str, Any]]] = {}
+        for event in batch:
+            by_user.setdefault(event['user_id'], []).append({
+                'message': event['message'],
+                'level': event['level'],
+                'timestamp': event['timestamp'].isoformat()
+            })
+        for user_id, logs in by_user.items():
+            try:
+                room = self.room_for_user(user_id) if self.room_for_user else None
+                self.socketio.emit('log_update', {'user_id': user_id, 'logs': logs}, to=room)
+            except Exception as e:
+                self.logger.error(f"Log sink fan-out failed: {e}")
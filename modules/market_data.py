@@ -6,8 +6,9 @@ import random
 from datetime import datetime
 
 class MarketDataHandler:
-    def __init__(self, socketio: SocketIO):
+    def __init__(self, socketio: SocketIO, emitter=None):
         self.socketio = socketio
+        self.emitter = emitter  # optional ConflatingEmitter; one publish per tick instead of one emit per symbol
         self.subscribed_symbols = set()
         self.market_data = {}
         self.is_running = False
@@ -44,6 +45,7 @@ class MarketDataHandler:
         }
         
         while self.is_running and self.subscribed_symbols:
+            batch = []
             for symbol in list(self.subscribed_symbols):
                 base_price = base_prices.get(symbol, 1000)
                 
@@ -66,9 +68,14 @@ class MarketDataHandler:
                 }
                 
                 self.market_data[symbol] = market_data
+                batch.append(market_data)
                 
                 # Emit via WebSocket
-                self.socketio.emit('market_data_update', market_data)
+                if self.emitter is None:
+                    self.socketio.emit('market_data_update', market_data)
+            
+            if self.emitter is not None:
+                self.emitter.publish(batch)
             
             time.sleep(1)  # Update every second
     
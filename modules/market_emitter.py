@@ -0,0 +1,217 @@
+import atexit
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Iterable
+
+# Quote fields carried in market frames; clients get this list once and
+# receive values by index
+MARKET_FIELDS = ('last_price', 'change', 'change_percent', 'volume', 'open', 'high', 'low', 'close')
+
+
+def encode_delta(symbol: str, quote: Dict[str, Any], previous: Dict[str, Any]) -> List[Any]:
+    """[symbol, index, value, index, value, ...] for the fields that differ from `previous`"""
+    row = [symbol]
+    for index, field in enumerate(MARKET_FIELDS):
+        value = quote.get(field)
+        if value is not None and previous.get(field) != value:
+            row.extend((index, value))
+    return row
+
+
+class _Client:
+    """Per-connection send state: cadence, what it has been sent, unacknowledged frames"""
+
+    __slots__ = ('interval', 'next_due', 'sent_versions', 'sent_values', 'in_flight', 'last_progress')
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_due = 0.0
+        self.sent_versions: Dict[str, int] = {}
+        self.sent_values: Dict[str, Dict[str, Any]] = {}
+        self.in_flight = 0
+        self.last_progress = 0.0
+
+
+class ConflatingEmitter:
+    """
+    Last-value-wins market data emitter between quote producers and clients.
+
+    Producers `publish()` quotes as fast as they arrive; only the latest
+    value per symbol is kept. Each client is served on its own cadence
+    (`set_interval`, clamped to [min_interval, max_interval]) with a
+    `market_frame` holding only the symbols that changed since its previous
+    frame, and for each of them only the changed fields, as compact
+    [symbol, field index, value, ...] rows.
+
+    Frames are sent with an acknowledgement callback. A client with
+    `max_in_flight` frames unacknowledged is skipped for that round: its
+    pending updates stay conflated and go out in one frame once it catches
+    up, so a slow browser tab costs the others nothing and never builds an
+    unbounded backlog. Acks that never arrive are written off after
+    `ack_timeout` seconds.
+    """
+
+    def __init__(self, socketio, registry,
+                 default_interval: float = 1.0,
+                 min_interval: float = 0.25,
+                 max_interval: float = 30.0,
+                 max_in_flight: int = 2,
+                 ack_timeout: float = 10.0,
+                 tick: float = 0.05):
+        self.socketio = socketio
+        self.registry = registry
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+        self.tick = tick
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._clients: Dict[str, _Client] = {}
+        self._stop = threading.Event()
+        self._task = None
+        self._start_lock = threading.Lock()
+        self.counters = {
+            'published': 0, 'conflated': 0, 'unchanged': 0,
+            'frames': 0, 'rows': 0, 'values': 0, 'skipped_busy': 0, 'ack_timeouts': 0
+        }
+        atexit.register(self.shutdown)
+
+    def start(self):
+        with self._start_lock:
+            if self._task is not None:
+                return
+            self._task = self.socketio.start_background_task(self._emit_loop)
+
+    def shutdown(self):
+        self._stop.set()
+
+    # Producers
+
+    def publish(self, quotes: Iterable[Dict[str, Any]]):
+        """Replace the latest value of each quoted symbol; unchanged quotes are ignored"""
+        with self._lock:
+            for quote in quotes:
+                symbol = quote['symbol']
+                current = self._latest.get(symbol)
+                if current is not None and all(current.get(field) == quote.get(field) for field in MARKET_FIELDS):
+                    self.counters['unchanged'] += 1
+                    continue
+                self._latest[symbol] = quote
+                self._versions[symbol] = self._versions.get(symbol, 0) + 1
+                self.counters['published'] += 1
+        self.start()
+
+    def latest(self, symbol: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._latest.get(symbol)
+
+    # Clients
+
+    def set_interval(self, sid: str, interval: float = None) -> float:
+        interval = self.default_interval if interval is None else float(interval)
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is None:
+                client = self._clients[sid] = _Client(interval)
+            client.interval = interval
+            client.next_due = 0.0
+        return interval
+
+    def forget(self, sid: str, symbols: Iterable[str] = None):
+        """Drop delta state for symbols (or the whole client) so a resubscribe starts from full values"""
+        with self._lock:
+            if symbols is None:
+                self._clients.pop(sid, None)
+                return
+            client = self._clients.get(sid)
+            if client is not None:
+                for symbol in symbols:
+                    client.sent_versions.pop(symbol, None)
+                    client.sent_values.pop(symbol, None)
+
+    # Sending
+
+    def _emit_loop(self):
+        while not self._stop.wait(self.tick):
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Market emitter failed: {e}")
+
+    def flush(self, now: float = None) -> int:
+        """Send a frame to every client that is due and not backed up; returns frames sent"""
+        now = now or time.monotonic()
+        frames = []
+        watch = self.registry.snapshot()
+        with self._lock:
+            for sid, symbols in watch.items():
+                client = self._clients.get(sid)
+                if client is None:
+                    client = self._clients[sid] = _Client(self.default_interval)
+                if now < client.next_due:
+                    continue
+                if client.in_flight >= self.max_in_flight:
+                    if now - client.last_progress < self.ack_timeout:
+                        self.counters['skipped_busy'] += 1
+                        continue
+                    self.counters['ack_timeouts'] += 1
+                    client.in_flight = 0
+
+                rows = []
+                for symbol in symbols:
+                    version = self._versions.get(symbol, 0)
+                    sent = client.sent_versions.get(symbol, 0)
+                    if version <= sent:
+                        continue
+                    if sent:
+                        # Updates this client never saw, superseded by the latest value
+                        self.counters['conflated'] += version - sent - 1
+                    quote = self._latest[symbol]
+                    row = encode_delta(symbol, quote, client.sent_values.get(symbol, {}))
+                    client.sent_versions[symbol] = version
+                    client.sent_values[symbol] = {field: quote.get(field) for field in MARKET_FIELDS}
+                    if len(row) > 1:
+                        rows.append(row)
+                client.next_due = now + client.interval
+                if not rows:
+                    continue
+                if client.in_flight == 0:
+                    client.last_progress = now
+                client.in_flight += 1
+                frames.append((sid, rows))
+                self.counters['frames'] += 1
+                self.counters['rows'] += len(rows)
+                self.counters['values'] += sum((len(row) - 1) // 2 for row in rows)
+
+            # Clients that went away
+            for sid in [sid for sid in self._clients if sid not in watch]:
+                del self._clients[sid]
+
+        timestamp = datetime.now().isoformat()
+        for sid, rows in frames:
+            self.socketio.emit('market_frame', {'t': timestamp, 'q': rows}, to=sid,
+                               callback=lambda *args, sid=sid: self._acked(sid))
+        return len(frames)
+
+    def _acked(self, sid: str):
+        with self._lock:
+            client = self._clients.get(sid)
+            if client is not None and client.in_flight > 0:
+                client.in_flight -= 1
+                client.last_progress = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self.counters,
+                clients=len(self._clients),
+                backed_up=sum(1 for client in self._clients.values() if client.in_flight >= self.max_in_flight)
+            )
@@ -0,0 +1,309 @@
+import threading
+import time
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# Histogram resolution: 2**SUB_BITS linear sub-buckets per power of two,
+# i.e. values are kept to within ~3% (half a sub-bucket) of what was recorded
+SUB_BITS = 4
+SUB_COUNT = 1 << SUB_BITS
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _bucket(value: int) -> int:
+    shift = max(0, value.bit_length() - SUB_BITS - 1)
+    return (shift << SUB_BITS) + (value >> shift)
+
+
+def _bucket_value(index: int) -> float:
+    """Midpoint of the values that land in bucket `index`"""
+    if index < 2 * SUB_COUNT:
+        return float(index)
+    shift = index // SUB_COUNT - 1
+    low = (index - shift * SUB_COUNT) << shift
+    return low + ((1 << shift) - 1) / 2.0
+
+
+class Histogram:
+    """
+    HDR-style latency histogram over integer microseconds.
+
+    Buckets are log-linear (exact below 32 us, then SUB_COUNT buckets per
+    power of two) and stored sparsely, so recording is one dict increment
+    and memory stays at a few hundred entries whatever the range.
+    """
+
+    __slots__ = ('_lock', '_counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        micros = int(seconds * 1e6) if seconds > 0 else 0
+        shift = micros.bit_length() - SUB_BITS - 1  # _bucket(), inlined for the hot path
+        index = micros if shift <= 0 else (shift << SUB_BITS) + (micros >> shift)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantiles(self, quantiles=QUANTILES) -> Dict[float, float]:
+        """Quantile -> seconds"""
+        with self._lock:
+            counts = sorted(self._counts.items())
+            count = self.count
+        result = {}
+        if not count:
+            return {q: 0.0 for q in quantiles}
+        position, seen = 0, 0
+        for q in sorted(quantiles):
+            rank = max(1, int(q * count + 0.5))
+            while seen < rank:
+                seen += counts[position][1]
+                position += 1
+            result[q] = _bucket_value(counts[position - 1][0]) / 1e6
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        quantiles = self.quantiles()
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            **{f"p{q * 100:g}_ms": round(value * 1000, 3) for q, value in quantiles.items()},
+            'max_ms': round(self.max * 1000, 3)
+        }
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.record(time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name: str, labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = tuple(labels) + extra
+    if not pairs:
+        return name
+    return name + '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in pairs) + '}'
+
+
+class MetricsRegistry:
+    """
+    Process-wide latency histograms and counters keyed by name and labels.
+
+    `timer()` / `observe()` feed histograms (seconds), `inc()` feeds
+    counters. With `enabled` off every call returns straight away (timers
+    are a shared no-op), so the instrumentation can stay in the hot paths.
+    `render_prometheus()` writes the text exposition format, `summary()`
+    the same data as JSON.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms: Dict[LabelKey, Histogram] = {}
+        self._by_call: Dict[tuple, Histogram] = {}
+        self._counters: Dict[LabelKey, float] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        # Call sites pass labels in a fixed order, so the unsorted key finds the series without sorting
+        fast_key = (name, *labels.items())
+        histogram = self._by_call.get(fast_key)
+        if histogram is None:
+            key = _key(name, labels)
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+                self._by_call[fast_key] = histogram
+        return histogram
+
+    def timer(self, name: str, **labels):
+        """Context manager recording the block's wall time"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(name, **labels))
+
+    def observe(self, name: str, seconds: float, **labels):
+        if self.enabled:
+            self.histogram(name, **labels).record(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._by_call.clear()
+            self._counters.clear()
+
+    # Export
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines: List[str] = []
+        typed = set()
+
+        def header(name, kind):
+            if name in typed:
+                return
+            typed.add(name)
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), histogram in histograms:
+            header(name, 'summary')
+            for q, value in histogram.quantiles().items():
+                lines.append(f"{_series(name, labels, (('quantile', f'{q:g}'),))} {value:.6f}")
+            lines.append(f"{_series(name + '_sum', labels)} {histogram.total:.6f}")
+            lines.append(f"{_series(name + '_count', labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f"{_series(name, labels)} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        return {
+            'enabled': self.enabled,
+            'histograms': [dict(name=name, labels=dict(labels), **histogram.summary())
+                           for (name, labels), histogram in histograms],
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in counters]
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+REGISTRY.describe('kite_request_seconds', 'Kite Connect API call latency by endpoint')
+REGISTRY.describe('kite_errors_total', 'Kite Connect API calls that raised, by endpoint')
+REGISTRY.describe('db_commit_seconds', 'Database commit latency (ORM session or group-commit batch)')
+REGISTRY.describe('socketio_emit_seconds', 'Time spent in socketio.emit by event')
+REGISTRY.describe('generate_signals_seconds', 'Strategy signal generation latency')
+REGISTRY.describe('bot_iteration_seconds', 'One trading bot loop iteration, excluding the sleep')
+REGISTRY.describe('http_request_seconds', 'Flask request latency by endpoint')
+
+
+class InstrumentedKite:
+    """
+    KiteConnect wrapper timing every API method as
+    kite_request_seconds{endpoint=<method>}. Attribute reads and local
+    helpers (set_access_token, login_url) pass straight through.
+    """
+
+    LOCAL_METHODS = frozenset({'set_access_token', 'set_session_expiry_hook', 'login_url'})
+
+    def __init__(self, kite, registry: MetricsRegistry = None):
+        self._kite = kite
+        self._registry = registry or REGISTRY
+
+    def __getattr__(self, name):
+        attr = getattr(self._kite, name)
+        if name.startswith('_') or name in self.LOCAL_METHODS or not callable(attr):
+            return attr
+        registry = self._registry
+
+        def call(*args, **kwargs):
+            with registry.timer('kite_request_seconds', endpoint=name):
+                try:
+                    return attr(*args, **kwargs)
+                except Exception:
+                    registry.inc('kite_errors_total', endpoint=name)
+                    raise
+        return call
+
+
+def instrument_emit(socketio, registry: MetricsRegistry = None):
+    """Time socketio.emit (and flask_socketio.emit, which goes through it) per event"""
+    registry = registry or REGISTRY
+    emit = socketio.emit
+
+    def timed_emit(event, *args, **kwargs):
+        with registry.timer('socketio_emit_seconds', event=event):
+            return emit(event, *args, **kwargs)
+
+    socketio.emit = timed_emit
+
+
+def instrument_sessions(session_class, registry: MetricsRegistry = None):
+    """Time ORM commits, flush included, as db_commit_seconds{source="session"}"""
+    from sqlalchemy import event
+    registry = registry or REGISTRY
+
+    @event.listens_for(session_class, 'before_commit')
+    def _commit_started(session):
+        session.info['metrics_commit_started'] = time.perf_counter()
+
+    @event.listens_for(session_class, 'after_commit')
+    def _commit_finished(session):
+        started = session.info.pop('metrics_commit_started', None)
+        if started is not None:
+            registry.observe('db_commit_seconds', time.perf_counter() - started, source='session')
+
+
+def instrument_requests(app, registry: MetricsRegistry = None, skip: Optional[Callable[[str], bool]] = None):
+    """Time every Flask request as http_request_seconds{endpoint, method}"""
+    from flask import g, request
+    registry = registry or REGISTRY
+
+    @app.before_request
+    def _request_started():
+        if registry.enabled:
+            g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _request_finished(response):
+        started = g.pop('metrics_started', None)
+        endpoint = request.endpoint or 'unmatched'
+        if started is not None and not (skip and skip(endpoint)):
+            registry.observe('http_request_seconds', time.perf_counter() - started,
+                             endpoint=endpoint, method=request.method)
+        return response
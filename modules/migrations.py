@@ -0,0 +1,151 @@
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Tuple
+
+from sqlalchemy import text
+
+from modules import session_stats
+
+logger = logging.getLogger(__name__)
+
+
+def _create_hot_path_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trades_user_mode_action ON trades (user_id, trading_mode, action)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trades_user_mode_timestamp ON trades (user_id, trading_mode, timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trades_bot_session ON trades (bot_session_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_logs_user_timestamp ON logs (user_id, timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bot_sessions_user_status ON bot_sessions (user_id, status)"))
+
+
+def _unique_paper_positions(conn):
+    # Merge duplicate (user_id, symbol) rows into the oldest one before enforcing uniqueness
+    duplicates = conn.execute(text(
+        "SELECT user_id, symbol, MIN(id), SUM(quantity), SUM(invested_amount) "
+        "FROM paper_positions GROUP BY user_id, symbol HAVING COUNT(*) > 1"
+    )).fetchall()
+    for user_id, symbol, keep_id, quantity, invested in duplicates:
+        average_price = invested / quantity if quantity else 0.0
+        conn.execute(text(
+            "UPDATE paper_positions SET quantity = :quantity, invested_amount = :invested, "
+            "average_price = :average_price WHERE id = :keep_id"
+        ), {'quantity': quantity, 'invested': invested, 'average_price': average_price, 'keep_id': keep_id})
+        conn.execute(text(
+            "DELETE FROM paper_positions WHERE user_id = :user_id AND symbol = :symbol AND id != :keep_id"
+        ), {'user_id': user_id, 'symbol': symbol, 'keep_id': keep_id})
+    if duplicates:
+        logger.warning(f"Merged duplicate paper positions for {len(duplicates)} (user, symbol) pairs")
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_paper_positions_user_symbol ON paper_positions (user_id, symbol)"
+    ))
+
+
+def _keyset_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_trades_user_mode_id ON trades (user_id, trading_mode, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_logs_user_id ON logs (user_id, id)"))
+
+
+def _backfill_session_stats(conn):
+    # Replay existing fills so sessions created before the stats table get their row
+    sessions = conn.execute(text(
+        "SELECT id, user_id, initial_capital FROM bot_sessions "
+        "WHERE id NOT IN (SELECT session_id FROM bot_session_stats)"
+    )).fetchall()
+    for session_id, user_id, initial_capital in sessions:
+        fills = conn.execute(text(
+            "SELECT symbol, action, quantity, price, brokerage FROM trades "
+            "WHERE bot_session_id = :session_id ORDER BY id"
+        ), {'session_id': session_id}).fetchall()
+        if not fills:
+            continue
+        stats = session_stats.new_stats(session_id, user_id, initial_capital)
+        for symbol, action, quantity, price, brokerage in fills:
+            session_stats.apply_fill(stats, symbol, action, quantity, price, brokerage or 0.0)
+        row = session_stats.stats_to_row(stats)
+        conn.execute(text(
+            f"INSERT INTO bot_session_stats ({', '.join(row)}) VALUES ({', '.join(':' + key for key in row)})"
+        ), row)
+
+
+# (version, name, upgrade(conn)) - append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, 'hot path composite indexes', _create_hot_path_indexes),
+    (2, 'unique paper position per user and symbol', _unique_paper_positions),
+    (3, 'keyset pagination indexes for orders and logs', _keyset_indexes),
+    (4, 'backfill per-session performance stats', _backfill_session_stats),
+]
+
+
+# (name, sql, index the plan is expected to use)
+HOT_QUERIES: List[Tuple[str, str, str]] = [
+    ('realized brokerage',
+     "SELECT SUM(brokerage) FROM trades WHERE user_id = 1 AND trading_mode = 'paper' AND action = 'SELL'",
+     'ix_trades_user_mode_action'),
+    ('session trades',
+     "SELECT * FROM trades WHERE bot_session_id = 1",
+     'ix_trades_bot_session'),
+    ('order history',
+     "SELECT * FROM trades WHERE user_id = 1 AND trading_mode = 'paper' ORDER BY timestamp DESC LIMIT 50",
+     'ix_trades_user_mode_timestamp'),
+    ('recent logs',
+     "SELECT * FROM logs WHERE user_id = 1 ORDER BY timestamp DESC LIMIT 100",
+     'ix_logs_user_timestamp'),
+    ('order keyset page',
+     "SELECT * FROM trades WHERE user_id = 1 AND trading_mode = 'paper' AND id < 1000 ORDER BY id DESC LIMIT 50",
+     'ix_trades_user_mode_id'),
+    ('log keyset page',
+     "SELECT * FROM logs WHERE user_id = 1 AND id > 1000 ORDER BY id ASC LIMIT 100",
+     'ix_logs_user_id'),
+    ('running sessions',
+     "SELECT * FROM bot_sessions WHERE user_id = 1 AND status = 'running'",
+     'ix_bot_sessions_user_status'),
+    ('paper position lookup',
+     "SELECT * FROM paper_positions WHERE user_id = 1 AND symbol = 'RELIANCE'",
+     'uq_paper_positions_user_symbol'),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at DATETIME NOT NULL)"
+    ))
+
+
+def current_version(engine) -> int:
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def upgrade(engine) -> List[int]:
+    """Apply every pending migration, each in its own transaction; returns the versions applied"""
+    applied = []
+    version = current_version(engine)
+    for number, name, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {'version': number, 'name': name, 'applied_at': datetime.utcnow()}
+            )
+        logger.info(f"Applied migration {number}: {name}")
+        applied.append(number)
+    return applied
+
+
+def explain_hot_queries(engine) -> List[Dict[str, Any]]:
+    """Run EXPLAIN QUERY PLAN for each hot query and report whether it uses its index"""
+    results = []
+    with engine.connect() as conn:
+        for name, sql, index in HOT_QUERIES:
+            plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()]
+            results.append({
+                'query': name,
+                'index': index,
+                'uses_index': any(f"INDEX {index}" in step for step in plan),
+                'plan': plan
+            })
+    return results
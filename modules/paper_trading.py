@@ -1,53 +1,149 @@
-import json
-import os
+import atexit
+import threading
 from datetime import datetime
 from typing import Dict, List, Any
+from modules.journal import TradeJournal
 
 class PaperTrading:
-    def __init__(self, initial_capital: float = 100000.0):
+    def __init__(self, initial_capital: float = 100000.0,
+                 data_file: str = 'paper_trading_data.json',
+                 journal_file: str = 'paper_trading_journal.jsonl',
+                 snapshot_every: int = 1000):
         self.initial_capital = initial_capital
-        self.data_file = 'paper_trading_data.json'
+        self.data_file = data_file
+        self._lock = threading.RLock()
+        # data_file holds the compacted snapshot; journal_file holds events since then
+        self.journal = TradeJournal(journal_file, data_file, snapshot_every=snapshot_every)
         self.portfolio_data = self._load_portfolio_data()
+        atexit.register(self.close)
     
     def _load_portfolio_data(self) -> Dict[str, Any]:
-        """Load portfolio data from file"""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            print(f"Error loading portfolio data: {e}")
+        """Load the latest snapshot and replay journal events recorded after it"""
+        state, events = self.journal.load()
+        if state is None:
+            # Default portfolio structure
+            state = {
+                'users': {},
+                'last_updated': datetime.now().isoformat()
+            }
+        state.pop('journal_seq', None)
+        self.portfolio_data = state
         
-        # Default portfolio structure
-        return {
-            'users': {},
-            'last_updated': datetime.now().isoformat()
-        }
+        for event in events:
+            self._apply_event(event)
+        
+        if events:
+            print(f"Replayed {len(events)} paper trading journal events")
+        return self.portfolio_data
     
     def _save_portfolio_data(self):
-        """Save portfolio data to file"""
+        """Write a compacted snapshot of the portfolio data and truncate the journal"""
         try:
-            self.portfolio_data['last_updated'] = datetime.now().isoformat()
-            with open(self.data_file, 'w') as f:
-                json.dump(self.portfolio_data, f, indent=2)
+            with self._lock:
+                self.portfolio_data['last_updated'] = datetime.now().isoformat()
+                self.journal.write_snapshot(dict(self.portfolio_data))
         except Exception as e:
             print(f"Error saving portfolio data: {e}")
     
+    def _record(self, event: Dict[str, Any]) -> Any:
+        """Journal an event, apply it to in-memory state and snapshot periodically"""
+        event['ts'] = datetime.now().isoformat()
+        self.journal.append(event)
+        result = self._apply_event(event)
+        if self.journal.needs_snapshot():
+            self._save_portfolio_data()
+        return result
+    
+    def _apply_event(self, event: Dict[str, Any]) -> Any:
+        """Apply a journal event to the in-memory portfolio data"""
+        users = self.portfolio_data['users']
+        user_id_str = event['user_id']
+        event_type = event['type']
+        self.portfolio_data['last_updated'] = event['ts']
+        
+        if event_type in ('open_account', 'reset'):
+            users[user_id_str] = self._new_portfolio(event['ts'])
+            return None
+        
+        if event_type != 'trade':
+            return None
+        
+        portfolio = users.setdefault(user_id_str, self._new_portfolio(event['ts']))
+        symbol = event['symbol']
+        quantity = event['quantity']
+        price = event['price']
+        total_charges = event['charges']
+        trade_value = quantity * price
+        realized_pnl = 0.0
+        
+        if event['action'] == 'BUY':
+            # Update cash
+            portfolio['available_cash'] -= trade_value + total_charges
+            
+            # Update or create position
+            if symbol in portfolio['positions']:
+                # Average the position
+                old_position = portfolio['positions'][symbol]
+                total_quantity = old_position['quantity'] + quantity
+                total_invested = (old_position['quantity'] * old_position['average_price']) + trade_value
+                new_avg_price = total_invested / total_quantity
+                
+                portfolio['positions'][symbol] = {
+                    'quantity': total_quantity,
+                    'average_price': new_avg_price,
+                    'action': 'BUY',
+                    'last_traded': event['ts']
+                }
+            else:
+                portfolio['positions'][symbol] = {
+                    'quantity': quantity,
+                    'average_price': price,
+                    'action': 'BUY',
+                    'last_traded': event['ts']
+                }
+        
+        else:  # SELL
+            position = portfolio['positions'][symbol]
+            
+            # Calculate P&L
+            buy_value = quantity * position['average_price']
+            realized_pnl = trade_value - buy_value - total_charges
+            
+            # Update cash and realized P&L
+            portfolio['available_cash'] += trade_value - total_charges
+            portfolio['realized_pnl'] += realized_pnl
+            
+            # Update position
+            new_quantity = position['quantity'] - quantity
+            if new_quantity == 0:
+                del portfolio['positions'][symbol]
+            else:
+                position['quantity'] = new_quantity
+                position['last_traded'] = event['ts']
+        
+        # Update charges and trade count
+        portfolio['total_charges'] += total_charges
+        portfolio['trades_count'] += 1
+        return realized_pnl
+    
+    def _new_portfolio(self, created_at: str) -> Dict[str, Any]:
+        return {
+            'initial_capital': self.initial_capital,
+            'available_cash': self.initial_capital,
+            'positions': {},
+            'total_charges': 0.0,
+            'realized_pnl': 0.0,
+            'trades_count': 0,
+            'created_at': created_at
+        }
+    
     def _get_user_portfolio(self, user_id: int) -> Dict[str, Any]:
         """Get or create user portfolio"""
         user_id_str = str(user_id)
-        if user_id_str not in self.portfolio_data['users']:
-            self.portfolio_data['users'][user_id_str] = {
-                'initial_capital': self.initial_capital,
-                'available_cash': self.initial_capital,
-                'positions': {},
-                'total_charges': 0.0,
-                'realized_pnl': 0.0,
-                'trades_count': 0,
-                'created_at': datetime.now().isoformat()
-            }
-            self._save_portfolio_data()
-        return self.portfolio_data['users'][user_id_str]
+        with self._lock:
+            if user_id_str not in self.portfolio_data['users']:
+                self._record({'type': 'open_account', 'user_id': user_id_str})
+            return self.portfolio_data['users'][user_id_str]
     
     def get_portfolio(self, user_id: int) -> Dict[str, Any]:
         """Get user portfolio"""
@@ -87,87 +183,52 @@ class PaperTrading:
     def execute_trade(self, user_id: int, symbol: str, action: str, quantity: int, price: float) -> Dict[str, Any]:
         """Execute a paper trade"""
         try:
-            portfolio = self._get_user_portfolio(user_id)
-            symbol = symbol.upper()
-            
-            # Calculate charges (0.1% brokerage + taxes ~0.05%)
-            trade_value = quantity * price
-            brokerage = trade_value * 0.001
-            taxes = trade_value * 0.0005
-            total_charges = brokerage + taxes
-            
-            if action.upper() == 'BUY':
-                # Check if enough cash
-                total_cost = trade_value + total_charges
-                if total_cost > portfolio['available_cash']:
-                    return {'success': False, 'error': f'Insufficient funds. Need: ₹{total_cost:.2f}, Available: ₹{portfolio["available_cash"]:.2f}'}
+            with self._lock:
+                portfolio = self._get_user_portfolio(user_id)
+                symbol = symbol.upper()
+                action = action.upper()
                 
-                # Update cash
-                portfolio['available_cash'] -= total_cost
+                # Calculate charges (0.1% brokerage + taxes ~0.05%)
+                trade_value = quantity * price
+                brokerage = trade_value * 0.001
+                taxes = trade_value * 0.0005
+                total_charges = brokerage + taxes
                 
-                # Update or create position
-                if symbol in portfolio['positions']:
-                    # Average the position
-                    old_position = portfolio['positions'][symbol]
-                    total_quantity = old_position['quantity'] + quantity
-                    total_invested = (old_position['quantity'] * old_position['average_price']) + trade_value
-                    new_avg_price = total_invested / total_quantity
-                    
-                    portfolio['positions'][symbol] = {
-                        'quantity': total_quantity,
-                        'average_price': new_avg_price,
-                        'action': 'BUY',
-                        'last_traded': datetime.now().isoformat()
-                    }
-                else:
-                    portfolio['positions'][symbol] = {
-                        'quantity': quantity,
-                        'average_price': price,
-                        'action': 'BUY',
-                        'last_traded': datetime.now().isoformat()
-                    }
+                if action == 'BUY':
+                    # Check if enough cash
+                    total_cost = trade_value + total_charges
+                    if total_cost > portfolio['available_cash']:
+                        return {'success': False, 'error': f'Insufficient funds. Need: ₹{total_cost:.2f}, Available: ₹{portfolio["available_cash"]:.2f}'}
                 
-            elif action.upper() == 'SELL':
-                # Check if position exists and has enough quantity
-                if symbol not in portfolio['positions']:
-                    return {'success': False, 'error': f'No position found for {symbol}'}
-                
-                position = portfolio['positions'][symbol]
-                if position['quantity'] < quantity:
-                    return {'success': False, 'error': f'Insufficient quantity to sell. Have: {position["quantity"]}, Need: {quantity}'}
-                
-                # Calculate P&L
-                buy_value = quantity * position['average_price']
-                sell_value = trade_value
-                realized_pnl = sell_value - buy_value - total_charges
+                elif action == 'SELL':
+                    # Check if position exists and has enough quantity
+                    if symbol not in portfolio['positions']:
+                        return {'success': False, 'error': f'No position found for {symbol}'}
+                    
+                    position = portfolio['positions'][symbol]
+                    if position['quantity'] < quantity:
+                        return {'success': False, 'error': f'Insufficient quantity to sell. Have: {position["quantity"]}, Need: {quantity}'}
                 
-                # Update cash
-                portfolio['available_cash'] += sell_value - total_charges
+                else:
+                    return {'success': False, 'error': f'Invalid action: {action}'}
                 
-                # Update realized P&L
-                portfolio['realized_pnl'] += realized_pnl
+                realized_pnl = self._record({
+                    'type': 'trade',
+                    'user_id': str(user_id),
+                    'symbol': symbol,
+                    'action': action,
+                    'quantity': quantity,
+                    'price': price,
+                    'charges': total_charges
+                })
                 
-                # Update position
-                new_quantity = position['quantity'] - quantity
-                if new_quantity == 0:
-                    del portfolio['positions'][symbol]
-                else:
-                    portfolio['positions'][symbol]['quantity'] = new_quantity
-                    portfolio['positions'][symbol]['last_traded'] = datetime.now().isoformat()
-            
-            # Update charges and trade count
-            portfolio['total_charges'] += total_charges
-            portfolio['trades_count'] += 1
-            
-            self._save_portfolio_data()
-            
-            return {
-                'success': True,
-                'message': f'{action} {quantity} {symbol} @ ₹{price:.2f}',
-                'charges': total_charges,
-                'realized_pnl': realized_pnl if action.upper() == 'SELL' else 0,
-                'portfolio_value': portfolio['available_cash'] + self._calculate_positions_value(portfolio['positions'])
-            }
+                return {
+                    'success': True,
+                    'message': f'{action} {quantity} {symbol} @ ₹{price:.2f}',
+                    'charges': total_charges,
+                    'realized_pnl': realized_pnl,
+                    'portfolio_value': portfolio['available_cash'] + self._calculate_positions_value(portfolio['positions'])
+                }
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -209,17 +270,15 @@ class PaperTrading:
     def reset_portfolio(self, user_id: int) -> Dict[str, Any]:
         """Reset user portfolio to initial state"""
         try:
-            user_id_str = str(user_id)
-            self.portfolio_data['users'][user_id_str] = {
-                'initial_capital': self.initial_capital,
-                'available_cash': self.initial_capital,
-                'positions': {},
-                'total_charges': 0.0,
-                'realized_pnl': 0.0,
-                'trades_count': 0,
-                'created_at': datetime.now().isoformat()
-            }
-            self._save_portfolio_data()
+            with self._lock:
+                self._record({'type': 'reset', 'user_id': str(user_id)})
             return {'success': True, 'message': 'Portfolio reset successfully'}
         except Exception as e:
-            return {'success': False, 'error': str(e)}
\ No newline at end of file
+            return {'success': False, 'error': str(e)}
+    
+    def close(self):
+        """Flush pending journal events to disk"""
+        try:
+            self.journal.close()
+        except Exception as e:
+            print(f"Error closing paper trading journal: {e}")
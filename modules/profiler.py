@@ -0,0 +1,250 @@
+import cProfile
+import fnmatch
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+MODES = ('sample', 'cprofile')
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, stop=None) -> str:
+    """Root-first 'a;b;c' stack in the collapsed format flamegraph.pl and speedscope read"""
+    labels = []
+    while frame is not None and frame is not stop:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class Capture:
+    """One profiling run: what it targets, for how long, and what it collected"""
+
+    def __init__(self, capture_id: int, kind: str, match: str, mode: str, seconds: float, interval: float):
+        self.id = capture_id
+        self.kind = kind  # 'bot' or 'request'
+        self.match = match  # bot session id, or an endpoint name / path glob
+        self.mode = mode
+        self.interval = interval
+        self.started_at = time.time()
+        self.ends_at = self.started_at + seconds
+        self.stopped = False
+        self.hits = 0  # iterations or requests that ran while profiled
+        self.samples: Counter = Counter()
+        self.stats: Optional[pstats.Stats] = None
+        self.threads: Dict[int, Any] = {}  # ident -> frame the profiled section started below
+        self.lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.stopped or time.time() >= self.ends_at
+
+    def matches(self, kind: str, keys) -> bool:
+        if self.done or kind != self.kind:
+            return False
+        return any(fnmatch.fnmatchcase(str(key), self.match) for key in keys if key is not None)
+
+    def add_profile(self, profile: cProfile.Profile):
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def output(self, sort: str = 'cumulative', limit: int = 60) -> str:
+        """pstats table for cprofile captures, collapsed stacks for sampled ones"""
+        with self.lock:
+            if self.mode == 'cprofile':
+                if self.stats is None:
+                    return ''
+                buffer = io.StringIO()
+                self.stats.stream = buffer
+                self.stats.sort_stats(sort).print_stats(limit)
+                return buffer.getvalue()
+            return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'match': self.match,
+            'mode': self.mode,
+            'interval_ms': round(self.interval * 1000, 3) if self.mode == 'sample' else None,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'ends_at': datetime.fromtimestamp(self.ends_at).isoformat(),
+            'done': self.done,
+            'hits': self.hits,
+            'samples': sum(self.samples.values()),
+            'format': 'pstats' if self.mode == 'cprofile' else 'collapsed'
+        }
+
+
+class ProfilerService:
+    """
+    On-demand profiling of one bot or of matching Flask requests, while the
+    process keeps running.
+
+    Profiled code is bracketed with `begin(kind, *keys)` / `end(token)`:
+    the bot loop around each iteration (keyed by session id), the request
+    hooks around each request (keyed by endpoint and path). With no capture
+    running, `begin()` is a single list check and returns None.
+
+    A capture either samples stacks or runs cProfile, for `seconds`:
+
+    - 'sample': a sampler thread reads `sys._current_frames()` every
+      `interval` for just the threads inside a matching section and counts
+      collapsed stacks (flamegraph input). Needs OS threads, i.e. threading
+      mode; green threads are invisible to it. The sampler only runs when
+      it gets the GIL, so short pure-Python sections that never release it
+      are undersampled.
+    - 'cprofile': a cProfile.Profile is enabled in the matching thread for
+      the section and merged into the capture's pstats. Deterministic but
+      slower for the profiled code. cProfile is per thread up to Python
+      3.11; from 3.12 only one profiler can run at a time, and sections
+      that cannot get one are skipped.
+
+    Other bots and requests never run under the profiler.
+    """
+
+    def __init__(self, max_seconds: float = 300.0, max_active: int = 4, history: int = 20,
+                 default_interval: float = 0.01):
+        self.max_seconds = max_seconds
+        self.max_active = max_active
+        self.history = history
+        self.default_interval = default_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._captures: Dict[int, Capture] = {}
+        self._active: List[Capture] = []
+        self._sampler = None
+        self._wake = threading.Event()
+
+    # Control
+
+    def start(self, kind: str, match, seconds: float, mode: str = 'sample', interval: float = None) -> Capture:
+        if kind not in ('bot', 'request'):
+            raise ValueError("target must be 'bot' or 'request'")
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if match is None or str(match) == '':
+            raise ValueError('a bot session id or a route to match is required')
+        seconds = min(max(float(seconds), 1.0), self.max_seconds)
+        interval = max(float(interval or self.default_interval), 0.001)
+
+        with self._lock:
+            self._prune()
+            if len(self._active) >= self.max_active:
+                raise ValueError(f"{self.max_active} captures already running")
+            capture = Capture(next(self._ids), kind, str(match), mode, seconds, interval)
+            self._captures[capture.id] = capture
+            self._active.append(capture)
+        if mode == 'sample':
+            self._start_sampler()
+            self._wake.set()
+        return capture
+
+    def stop(self, capture_id: int) -> Optional[Capture]:
+        capture = self.get(capture_id)
+        if capture is not None:
+            capture.stopped = True
+        return capture
+
+    def get(self, capture_id: int) -> Optional[Capture]:
+        with self._lock:
+            return self._captures.get(capture_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._prune()
+            return [capture.to_dict() for capture in self._captures.values()]
+
+    def _prune(self):
+        self._active = [capture for capture in self._active if not capture.done]
+        finished = [capture_id for capture_id, capture in self._captures.items() if capture.done]
+        for capture_id in finished[:max(0, len(finished) - self.history)]:
+            del self._captures[capture_id]
+
+    # Profiled sections
+
+    def begin(self, kind: str, *keys):
+        """Enter a profiled section; returns a token for end(), or None when nothing is capturing it"""
+        if not self._active:
+            return None
+        captures = [capture for capture in self._active if capture.matches(kind, keys)]
+        if not captures:
+            return None
+
+        ident = threading.get_ident()
+        caller = sys._getframe(1)
+        profile, profiled = None, None
+        for capture in captures:
+            capture.hits += 1
+            if capture.mode == 'sample':
+                with capture.lock:
+                    capture.threads[ident] = caller
+            elif profile is None:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                    profiled = capture
+                except ValueError:
+                    profile = None  # another profiler holds the interpreter (Python 3.12+)
+        return ident, captures, profile, profiled
+
+    def end(self, token):
+        if token is None:
+            return
+        ident, captures, profile, profiled = token
+        if profile is not None:
+            profile.disable()
+            profiled.add_profile(profile)
+        for capture in captures:
+            if capture.mode == 'sample':
+                with capture.lock:
+                    capture.threads.pop(ident, None)
+
+    # Sampler
+
+    def _start_sampler(self):
+        with self._lock:
+            if self._sampler is not None and self._sampler.is_alive():
+                return
+            self._sampler = threading.Thread(target=self._sample_loop, name='ProfilerSampler', daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                self._prune()
+                sampling = [capture for capture in self._active if capture.mode == 'sample']
+            if not sampling:
+                self._wake.wait(5.0)
+                self._wake.clear()
+                continue
+            try:
+                frames = sys._current_frames()
+                for capture in sampling:
+                    with capture.lock:
+                        for ident, caller in capture.threads.items():
+                            frame = frames.get(ident)
+                            if frame is not None:
+                                # Only what runs below the profiled section, not the thread bootstrap above it
+                                capture.samples[collapse_stack(frame, stop=caller.f_back)] += 1
+                del frames
+            except Exception as e:
+                self.logger.error(f"Profiler sampling failed: {e}")
+            time.sleep(min(capture.interval for capture in sampling))
@@ -0,0 +1,238 @@
+import atexit
+import threading
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional, Tuple
+
+# Sections whose items are diffed by key rather than field by field
+KEYED_SECTIONS = {'positions': 'symbol', 'bots': 'id'}
+
+
+def _index(section: str, value) -> Dict[Any, Any]:
+    key = KEYED_SECTIONS[section]
+    return {item[key]: item for item in value or []}
+
+
+def diff_state(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Changes from `old` to `new`, both as stored by the channel.
+
+    Flat sections (wallet, portfolio) become the changed fields; keyed
+    sections become {'upsert': [items], 'remove': [keys]}. Sections that
+    did not change are left out, so an empty result means nothing to send.
+    """
+    changes = {}
+    for section, value in new.items():
+        previous = old.get(section)
+        if section in KEYED_SECTIONS:
+            previous = previous or {}
+            upsert = [item for key, item in value.items() if previous.get(key) != item]
+            remove = [key for key in previous if key not in value]
+            if upsert or remove:
+                changes[section] = {'upsert': upsert, 'remove': remove}
+        else:
+            previous = previous or {}
+            fields = {key: item for key, item in value.items() if previous.get(key) != item}
+            fields.update({key: None for key in previous if key not in value})
+            if fields:
+                changes[section] = fields
+    return changes
+
+
+class _Channel:
+    """Last published state, sequence number and recent frames for one (user, mode)"""
+
+    __slots__ = ('seq', 'state', 'history', 'sids')
+
+    def __init__(self, history: int):
+        self.seq = 0
+        self.state: Dict[str, Any] = {}
+        self.history: deque = deque(maxlen=history)
+        self.sids = set()
+
+
+class AccountPushChannel:
+    """
+    Server push of account state (wallet, portfolio, positions, bots) per user.
+
+    Each (user, mode) pair is a channel with its own Socket.IO room and
+    sequence number. A refresher thread rebuilds the state of every channel
+    that has subscribers every `interval` seconds, or immediately after
+    `notify()`, and emits an `account_delta` frame holding only what changed
+    since the previous frame; nothing is sent when nothing changed. Frames
+    are queued under the state lock and emitted after it is released, by
+    one thread at a time in queue order, so a slow socket never holds up
+    subscribers or the next rebuild. Clients
+    apply frames in sequence order and, on a gap, ask for `resync()`, which
+    replays the missed frames from a short history or falls back to a full
+    `account_snapshot`.
+    """
+
+    def __init__(self, app, socketio, build_state: Callable[[int, str], Dict[str, Any]],
+                 room_for_user: Callable[[int], str],
+                 interval: float = 2.0,
+                 history: int = 64):
+        self.app = app
+        self.socketio = socketio
+        self.build_state = build_state
+        self.room_for_user = room_for_user
+        self.interval = interval
+        self.history = history
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._channels: Dict[Tuple[int, str], _Channel] = {}
+        self._sid_channel: Dict[str, Tuple[int, str]] = {}
+        self._dirty = set()
+        self._outbox: deque = deque()  # (room, frame) in sequence order
+        self._emit_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._task = None
+        self._start_lock = threading.Lock()
+        self.counters = {'frames': 0, 'skipped': 0, 'snapshots': 0, 'replays': 0, 'errors': 0}
+        atexit.register(self.shutdown)
+
+    def start(self):
+        with self._start_lock:
+            if self._task is not None:
+                return
+            # An OS thread in threading mode, a green thread under eventlet/gevent
+            self._task = self.socketio.start_background_task(self._refresh_loop)
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
+
+    def room(self, user_id: int, mode: str) -> str:
+        return f"{self.room_for_user(user_id)}:{mode}"
+
+    # Subscriptions
+
+    def subscribe(self, sid: str, user_id: int, mode: str) -> Dict[str, Any]:
+        """Move `sid` onto the (user, mode) channel and return a full snapshot frame for it"""
+        self.unsubscribe(sid)
+        key = (user_id, mode)
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None:
+                channel = self._channels[key] = _Channel(self.history)
+            channel.sids.add(sid)
+            self._sid_channel[sid] = key
+        self.socketio.server.enter_room(sid, self.room(user_id, mode), namespace='/')
+        self.start()
+        return self.snapshot(user_id, mode)
+
+    def unsubscribe(self, sid: str):
+        with self._lock:
+            key = self._sid_channel.pop(sid, None)
+            if key is None:
+                return
+            channel = self._channels.get(key)
+            if channel is not None:
+                channel.sids.discard(sid)
+                if not channel.sids:
+                    del self._channels[key]
+        try:
+            self.socketio.server.leave_room(sid, self.room(*key), namespace='/')
+        except Exception:
+            pass  # already disconnected
+
+    def notify(self, user_id: int):
+        """Account state changed (fill, bot start/stop, reset): refresh this user's channels now"""
+        with self._lock:
+            self._dirty.update(key for key in self._channels if key[0] == user_id)
+        self._wake.set()
+
+    # Frames
+
+    def snapshot(self, user_id: int, mode: str) -> Dict[str, Any]:
+        """Publish any pending change, then return the channel's full state at its current seq"""
+        self.refresh(user_id, mode)
+        with self._lock:
+            channel = self._channels.get((user_id, mode))
+            seq, state = (channel.seq, channel.state) if channel else (0, {})
+            self.counters['snapshots'] += 1
+        return {
+            'seq': seq,
+            'mode': mode,
+            **{section: list(value.values()) if section in KEYED_SECTIONS else value
+               for section, value in state.items()},
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def resync(self, user_id: int, mode: str, since: Optional[int]) -> Tuple[str, Any]:
+        """
+        ('replay', [frames]) if every frame after `since` is still in the
+        history, otherwise ('snapshot', frame).
+        """
+        with self._lock:
+            channel = self._channels.get((user_id, mode))
+            if channel is not None and since is not None and since <= channel.seq:
+                frames = [frame for frame in channel.history if frame['seq'] > since]
+                if len(frames) == channel.seq - since:
+                    self.counters['replays'] += 1
+                    return 'replay', frames
+        return 'snapshot', self.snapshot(user_id, mode)
+
+    def refresh(self, user_id: int, mode: str) -> bool:
+        """Rebuild one channel's state and emit a delta frame if it changed"""
+        key = (user_id, mode)
+        with self.app.app_context():
+            new = self.build_state(user_id, mode)
+        stored = {section: _index(section, value) if section in KEYED_SECTIONS else value
+                  for section, value in new.items()}
+
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None:
+                return False
+            changes = diff_state(channel.state, stored)
+            channel.state = stored
+            if not changes:
+                self.counters['skipped'] += 1
+                return False
+            channel.seq += 1
+            frame = {
+                'seq': channel.seq,
+                'mode': mode,
+                'changes': changes,
+                'timestamp': datetime.now().isoformat()
+            }
+            channel.history.append(frame)
+            self.counters['frames'] += 1
+            self._outbox.append((self.room(user_id, mode), frame))
+        self._flush()
+        return True
+
+    def _flush(self):
+        """Emit queued frames; the outbox is filled in sequence order, so draining it in order keeps frames ordered"""
+        with self._emit_lock:
+            while True:
+                try:
+                    room, frame = self._outbox.popleft()
+                except IndexError:
+                    return
+                self.socketio.emit('account_delta', frame, to=room)
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            woken = self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                if woken and self._dirty:
+                    keys = list(self._dirty)
+                else:
+                    keys = list(self._channels)
+                self._dirty.clear()
+            for user_id, mode in keys:
+                try:
+                    self.refresh(user_id, mode)
+                except Exception as e:
+                    self.counters['errors'] += 1
+                    self.logger.error(f"Account push refresh failed for user {user_id} ({mode}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, channels=len(self._channels), subscribers=len(self._sid_channel))
@@ -0,0 +1,195 @@
+import atexit
+import gzip
+import json
+import os
+import threading
+import logging
+from datetime import datetime, timedelta, date
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+from sqlalchemy import select
+
+
+class ArchiveStore:
+    """
+    Date-partitioned, gzip-compressed JSONL archive.
+
+    Rows live in `<root>/<table>/<YYYY>/<MM>/<YYYY-MM-DD>.jsonl.gz`, keyed by
+    the date of their timestamp. Appends add a new gzip member to the day's
+    file, which readers see as one continuous stream.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _partition_path(self, table: str, day: date) -> str:
+        return os.path.join(self.root, table, f"{day:%Y}", f"{day:%m}", f"{day:%Y-%m-%d}.jsonl.gz")
+
+    def append(self, table: str, rows: List[Dict[str, Any]]):
+        """Append rows to their daily partitions and fsync each touched file"""
+        by_day: Dict[date, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_day.setdefault(row['timestamp'].date(), []).append(row)
+
+        for day, day_rows in by_day.items():
+            path = self._partition_path(table, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                    for row in day_rows:
+                        f.write((json.dumps(row, default=_json_default, separators=(',', ':')) + '\n').encode('utf-8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+
+    def partitions(self, table: str) -> List[str]:
+        """Partition files for a table, newest day first"""
+        base = os.path.join(self.root, table)
+        paths = []
+        for dirpath, _, filenames in os.walk(base):
+            paths.extend(os.path.join(dirpath, name) for name in filenames if name.endswith('.jsonl.gz'))
+        return sorted(paths, key=os.path.basename, reverse=True)
+
+    def read_partition(self, path: str) -> List[Dict[str, Any]]:
+        rows = []
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    row = json.loads(line)
+                    row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+                    rows.append(row)
+        return rows
+
+    def scan(self, table: str, predicate: Callable[[Dict[str, Any]], bool],
+             before: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """Yield matching archived rows newest first, skipping partitions entirely after `before`"""
+        for path in self.partitions(table):
+            day = datetime.strptime(os.path.basename(path)[:10], '%Y-%m-%d').date()
+            if before is not None and day > before.date():
+                continue
+            seen = set()
+            rows = [row for row in self.read_partition(path) if predicate(row)]
+            rows.sort(key=lambda row: (row['timestamp'], row['id']), reverse=True)
+            for row in rows:
+                # A crash between archive write and hot-table delete can archive a row twice
+                if row['id'] in seen:
+                    continue
+                seen.add(row['id'])
+                if before is None or row['timestamp'] < before:
+                    yield row
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class RetentionManager:
+    """
+    Moves rows older than each table's retention window from the hot
+    SQLite tables into the ArchiveStore, in id-ordered batches, on a
+    background schedule. Rows are written and fsync'd to the archive
+    before they are deleted, so a crash can only duplicate, never lose.
+
+    `on_delete` maps a model to `fn(conn, ids)`, run in the same
+    transaction as the delete of each batch, for totals that must keep
+    counting rows after they leave the hot table.
+    """
+
+    def __init__(self, app, db, archive: ArchiveStore, policies: Dict[Any, int],
+                 batch_size: int = 5000, interval_seconds: float = 3600, writer=None,
+                 on_delete: Dict[Any, Callable[[Any, List[int]], None]] = None):
+        self.app = app
+        self.db = db
+        self.archive = archive
+        self.policies = policies  # model -> retention days
+        self.batch_size = batch_size
+        self.interval = interval_seconds
+        self.writer = writer
+        self.on_delete = on_delete or {}
+        self.logger = logging.getLogger(__name__)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._run_lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+        atexit.register(self.shutdown)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._schedule_loop, name='RetentionScheduler', daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._stop.set()
+
+    def _schedule_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.error(f"Retention run failed: {e}")
+            self._stop.wait(self.interval)
+
+    def run_once(self) -> Dict[str, int]:
+        """Archive every row past its retention window; returns rows archived per table"""
+        with self._run_lock:
+            archived = {}
+            for model, days in self.policies.items():
+                archived[model.__tablename__] = self._archive_table(
+                    model.__table__, datetime.utcnow() - timedelta(days=days), self.on_delete.get(model))
+            self.last_run = {'finished_at': datetime.utcnow().isoformat(), 'archived': archived}
+            if any(archived.values()):
+                self.logger.info(f"Retention archived {archived}")
+            return archived
+
+    def _archive_table(self, table, cutoff: datetime,
+                       on_delete: Optional[Callable[[Any, List[int]], None]] = None) -> int:
+        total = 0
+        while not self._stop.is_set():
+            with self.app.app_context():
+                with self.db.engine.connect() as conn:
+                    rows = [dict(row._mapping) for row in conn.execute(
+                        select(table)
+                        .where(table.c.timestamp < cutoff)
+                        .order_by(table.c.id)
+                        .limit(self.batch_size)
+                    )]
+            if not rows:
+                break
+
+            self.archive.append(table.name, rows)
+            ids = [row['id'] for row in rows]
+            delete = table.delete().where(table.c.id.in_(ids))
+
+            def run(conn):
+                if on_delete is not None:
+                    on_delete(conn, ids)
+                conn.execute(delete)
+
+            if self.writer is not None:
+                self.writer.submit(run).result()
+            else:
+                with self.app.app_context():
+                    with self.db.engine.begin() as conn:
+                        run(conn)
+            total += len(rows)
+        return total
+
+    def read_archived(self, table_name: str, user_id: int, limit: int,
+                      before: Optional[datetime] = None, before_id: Optional[int] = None,
+                      **filters) -> List[Dict[str, Any]]:
+        """Newest-first archived rows for a user, optionally older than `before`/`before_id` and matching column filters"""
+        def predicate(row):
+            if before_id is not None and row['id'] >= before_id:
+                return False
+            return row.get('user_id') == user_id and all(row.get(k) == v for k, v in filters.items())
+
+        rows = []
+        for row in self.archive.scan(table_name, predicate, before=before):
+            rows.append(row)
+            if len(rows) >= limit:
+                break
+        return rows
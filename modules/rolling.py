@@ -0,0 +1,146 @@
+from collections import deque
+from typing import Dict, List, Iterable
+
+import numpy as np
+
+
+def fit(array: np.ndarray, size: int) -> np.ndarray:
+    """`array` zero-padded to `size` rows, for per-row state kept next to a RollingWindow"""
+    if len(array) >= size:
+        return array
+    grown = np.zeros((size,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class RollingWindow:
+    """
+    The last `window` values of many series at once, one ring buffer row
+    per key (symbol), with running sums so mean and variance cost O(1)
+    per value instead of O(window).
+
+    Everything is vectorized over rows: `push(rows, values)` adds one value
+    to each of `rows` (which must be distinct) in a single numpy pass. The
+    running sums drift by float rounding, so every `resync_every` pushes
+    they are recomputed from the buffers.
+    """
+
+    def __init__(self, window: int, capacity: int = 64, resync_every: int = None):
+        if window < 1:
+            raise ValueError('window must be at least 1')
+        self.window = int(window)
+        self.resync_every = resync_every or 64 * self.window
+        self.index: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self.values = np.zeros((capacity, self.window))
+        self.count = np.zeros(capacity, dtype=np.int64)  # values pushed per row, ever
+        self.sum = np.zeros(capacity)
+        self.sumsq = np.zeros(capacity)
+        self._pushes = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.count)
+
+    def rows(self, keys: Iterable[str]) -> np.ndarray:
+        """Row numbers of `keys`, adding rows for keys seen for the first time"""
+        index = self.index
+        rows = []
+        for key in keys:
+            row = index.get(key)
+            if row is None:
+                row = index[key] = len(self.keys)
+                self.keys.append(key)
+            rows.append(row)
+        if len(self.keys) > self.capacity:
+            size = max(len(self.keys), 2 * self.capacity)
+            self.values = fit(self.values, size)
+            self.count = fit(self.count, size)
+            self.sum = fit(self.sum, size)
+            self.sumsq = fit(self.sumsq, size)
+        return np.array(rows, dtype=np.int64)
+
+    def push(self, rows: np.ndarray, values: np.ndarray):
+        slots = self.count[rows] % self.window
+        evicted = np.where(self.count[rows] >= self.window, self.values[rows, slots], 0.0)
+        self.sum[rows] += values - evicted
+        self.sumsq[rows] += values * values - evicted * evicted
+        self.values[rows, slots] = values
+        self.count[rows] += 1
+
+        self._pushes += 1
+        if self._pushes % self.resync_every == 0:
+            self.sum = self.values.sum(axis=1)
+            self.sumsq = (self.values * self.values).sum(axis=1)
+
+    def ready(self, rows: np.ndarray) -> np.ndarray:
+        """Rows whose window is full"""
+        return self.count[rows] >= self.window
+
+    def filled(self, rows: np.ndarray) -> np.ndarray:
+        return np.minimum(self.count[rows], self.window)
+
+    def mean(self, rows: np.ndarray) -> np.ndarray:
+        return self.sum[rows] / np.maximum(self.filled(rows), 1)
+
+    def std(self, rows: np.ndarray) -> np.ndarray:
+        """Population standard deviation over each row's window"""
+        n = np.maximum(self.filled(rows), 1)
+        mean = self.sum[rows] / n
+        return np.sqrt(np.maximum(self.sumsq[rows] / n - mean * mean, 0.0))
+
+
+class RollingExtremes:
+    """
+    Rolling high and low of the last `window` values per row.
+
+    Each row keeps two monotonic deques of (sequence, value): pushing pops
+    the values the new one dominates and expires the one that left the
+    window, so a push is O(1) amortized and the extreme is always at the
+    front. `high` and `low` are arrays over rows for vectorized use.
+    """
+
+    def __init__(self, window: int, capacity: int = 64):
+        self.window = int(window)
+        self._maxima: List[deque] = []
+        self._minima: List[deque] = []
+        self._seq: List[int] = []
+        self.high = np.full(capacity, np.nan)
+        self.low = np.full(capacity, np.nan)
+
+    def reserve(self, rows: int):
+        """Make room for rows 0..rows-1"""
+        while len(self._seq) < rows:
+            self._maxima.append(deque())
+            self._minima.append(deque())
+            self._seq.append(0)
+        if rows > len(self.high):
+            size = max(rows, 2 * len(self.high))
+            self.high = np.concatenate([self.high, np.full(size - len(self.high), np.nan)])
+            self.low = np.concatenate([self.low, np.full(size - len(self.low), np.nan)])
+
+    def push(self, rows: np.ndarray, values: np.ndarray):
+        self.reserve(int(rows.max()) + 1 if len(rows) else 0)
+        window = self.window
+        high, low = self.high, self.low
+        for row, value in zip(rows.tolist(), values.tolist()):
+            seq = self._seq[row]
+            self._seq[row] = seq + 1
+            expired = seq - window
+
+            maxima = self._maxima[row]
+            while maxima and maxima[-1][1] <= value:
+                maxima.pop()
+            maxima.append((seq, value))
+            if maxima[0][0] <= expired:
+                maxima.popleft()
+
+            minima = self._minima[row]
+            while minima and minima[-1][1] >= value:
+                minima.pop()
+            minima.append((seq, value))
+            if minima[0][0] <= expired:
+                minima.popleft()
+
+            high[row] = maxima[0][1]
+            low[row] = minima[0][1]
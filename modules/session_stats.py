@@ -0,0 +1,125 @@
+import json
+from typing import Dict, Any, Tuple
+
+from sqlalchemy import select
+
+STAT_FIELDS = (
+    'trades_count', 'buy_count', 'sell_count', 'turnover', 'charges', 'realized_pnl',
+    'winning_trades', 'losing_trades', 'peak_equity', 'max_drawdown'
+)
+
+
+def new_stats(session_id: int, user_id: int, initial_capital: float) -> Dict[str, Any]:
+    return {
+        'session_id': session_id,
+        'user_id': user_id,
+        'initial_capital': initial_capital or 0.0,
+        'trades_count': 0,
+        'buy_count': 0,
+        'sell_count': 0,
+        'turnover': 0.0,
+        'charges': 0.0,
+        'realized_pnl': 0.0,
+        'winning_trades': 0,
+        'losing_trades': 0,
+        'peak_equity': initial_capital or 0.0,
+        'max_drawdown': 0.0,
+        'positions': {}  # symbol -> [signed quantity, average price]
+    }
+
+
+def apply_fill(stats: Dict[str, Any], symbol: str, action: str, quantity: int, price: float, brokerage: float):
+    """
+    Fold one fill into the stats in place.
+
+    Positions are tracked at average cost. A fill that reduces a position
+    realizes (price - average) * closed quantity. Win and loss counts are
+    taken on that realized amount net of the fill's charges. Drawdown is
+    measured on realized equity: initial capital + realized - charges.
+    """
+    signed = quantity if action == 'BUY' else -quantity
+    stats['trades_count'] += 1
+    stats['buy_count' if action == 'BUY' else 'sell_count'] += 1
+    stats['turnover'] += quantity * price
+    stats['charges'] += brokerage
+
+    held, average = stats['positions'].get(symbol, [0, 0.0])
+    realized = None
+    if held and (held > 0) != (signed > 0):
+        closed = min(abs(held), abs(signed))
+        direction = 1 if held > 0 else -1
+        realized = (price - average) * closed * direction
+        stats['realized_pnl'] += realized
+        remaining = held + signed
+        if remaining == 0:
+            held, average = 0, 0.0
+        elif (remaining > 0) == (held > 0):
+            held = remaining
+        else:
+            # Flipped through zero: the excess opens a new position at this price
+            held, average = remaining, price
+    else:
+        total = held + signed
+        average = (average * abs(held) + price * abs(signed)) / abs(total)
+        held = total
+
+    if held:
+        stats['positions'][symbol] = [held, round(average, 4)]
+    else:
+        stats['positions'].pop(symbol, None)
+
+    if realized is not None:
+        if realized - brokerage > 0:
+            stats['winning_trades'] += 1
+        else:
+            stats['losing_trades'] += 1
+
+    equity = stats['initial_capital'] + stats['realized_pnl'] - stats['charges']
+    stats['peak_equity'] = max(stats['peak_equity'], equity)
+    if stats['peak_equity'] > 0:
+        stats['max_drawdown'] = max(stats['max_drawdown'], (stats['peak_equity'] - equity) / stats['peak_equity'])
+
+
+def mark(stats: Dict[str, Any], prices: Dict[str, float]) -> Tuple[float, float]:
+    """(unrealized PnL, gross exposure) of the open session positions at `prices` (average cost if unquoted)"""
+    unrealized = 0.0
+    exposure = 0.0
+    for symbol, (held, average) in stats['positions'].items():
+        price = prices.get(symbol) or average
+        unrealized += (price - average) * held
+        exposure += abs(held) * price
+    return unrealized, exposure
+
+
+def row_to_stats(row) -> Dict[str, Any]:
+    stats = {field: getattr(row, field) for field in ('session_id', 'user_id', 'initial_capital') + STAT_FIELDS}
+    stats['positions'] = json.loads(row.positions or '{}')
+    return stats
+
+
+def stats_to_row(stats: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(stats, positions=json.dumps(stats['positions'], separators=(',', ':')))
+
+
+def record_fill(conn, stats_table, sessions_table, session_id: int, symbol: str, action: str,
+                quantity: int, price: float, brokerage: float):
+    """Read-modify-write the session's stats row inside the caller's (writer) transaction"""
+    row = conn.execute(select(stats_table).where(stats_table.c.session_id == session_id)).first()
+    if row is None:
+        session = conn.execute(
+            select(sessions_table.c.user_id, sessions_table.c.initial_capital)
+            .where(sessions_table.c.id == session_id)
+        ).first()
+        if session is None:
+            return
+        stats = new_stats(session_id, session.user_id, session.initial_capital)
+        apply_fill(stats, symbol, action, quantity, price, brokerage)
+        conn.execute(stats_table.insert().values(**stats_to_row(stats)))
+    else:
+        stats = row_to_stats(row)
+        apply_fill(stats, symbol, action, quantity, price, brokerage)
+        conn.execute(
+            stats_table.update()
+            .where(stats_table.c.session_id == session_id)
+            .values(**stats_to_row(stats))
+        )
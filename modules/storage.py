@@ -0,0 +1,208 @@
+import atexit
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
+
+from modules.metrics import REGISTRY as metrics
+
+
+def configure_sqlite(engine, busy_timeout_ms: int = 5000, synchronous: str = 'NORMAL',
+                     journal_mode: str = 'WAL', query_only: bool = False):
+    """Apply WAL journaling, relaxed fsync and a busy timeout to every new SQLite connection"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        if query_only:
+            cursor.execute('PRAGMA query_only=1')
+        cursor.close()
+
+
+class GroupCommitWriter:
+    """
+    Single writer thread with group commit.
+
+    Callers submit `fn(conn)` callables and get a Future back. The writer
+    collects everything submitted within `commit_window_ms` (up to
+    `max_batch` operations), runs each inside its own SAVEPOINT so a failing
+    operation does not take the rest of the batch with it, and commits the
+    whole batch once. With WAL + synchronous=NORMAL that is one fsync-free
+    commit per batch instead of one fsync per caller.
+    """
+
+    def __init__(self, app, db, commit_window_ms: int = 5, max_batch: int = 500, max_queue: int = 50000):
+        self.app = app
+        self.db = db
+        self.commit_window = commit_window_ms / 1000.0
+        self.max_batch = max_batch
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._running = False
+        self._start_lock = threading.Lock()
+        self.counters = {'operations': 0, 'commits': 0, 'failed_operations': 0, 'failed_commits': 0}
+        atexit.register(self.shutdown)
+
+    def start(self):
+        with self._start_lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._writer_loop, name='GroupCommitWriter', daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        """Stop accepting the writer loop and commit whatever is still queued"""
+        if not self._running:
+            return
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._commit_batch(self._drain([]))
+
+    def submit(self, fn: Callable[[Any], Any]) -> Future:
+        """Queue fn(conn) for the next group commit"""
+        if not self._running:
+            self.start()
+        future: Future = Future()
+        if threading.current_thread() is self._thread:
+            # Re-entrant submits from inside a batch would deadlock waiting on ourselves
+            future.set_exception(RuntimeError('submit() called from the writer thread'))
+            return future
+        self._queue.put((fn, future))
+        return future
+
+    def execute(self, statement, params=None) -> Future:
+        """Queue a single Core statement (a list of params runs as executemany)"""
+        def run(conn):
+            return conn.execute(statement, params).rowcount if params is not None else conn.execute(statement).rowcount
+        return self.submit(run)
+
+    def flush(self, timeout: float = 10.0):
+        """Block until everything submitted so far has been committed"""
+        self.submit(lambda conn: None).result(timeout=timeout)
+
+    def _drain(self, batch: List[Tuple[Callable, Future]]) -> List[Tuple[Callable, Future]]:
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _writer_loop(self):
+        while self._running:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.commit_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit_batch(self._drain(batch))
+
+    def _commit_batch(self, batch: List[Tuple[Callable, Future]]):
+        if not batch:
+            return
+        results = []
+        try:
+            with self.app.app_context(), metrics.timer('db_commit_seconds', source='group_commit'):
+                with self.db.engine.connect() as conn:
+                    with conn.begin():
+                        for fn, future in batch:
+                            savepoint = conn.begin_nested()
+                            try:
+                                results.append((future, fn(conn), None))
+                                savepoint.commit()
+                            except Exception as e:
+                                savepoint.rollback()
+                                results.append((future, None, e))
+            self.counters['commits'] += 1
+        except Exception as e:
+            self.counters['failed_commits'] += 1
+            self.logger.error(f"Group commit of {len(batch)} operations failed: {e}")
+            for fn, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            self.counters['operations'] += 1
+            if error is not None:
+                self.counters['failed_operations'] += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+class ReadConnections:
+    """
+    Per-thread read-only connections on a separate NullPool engine.
+
+    Each thread keeps its own SQLite connection, so bot threads never wait
+    on the writer or on the scoped session's pool. Every read ends its
+    transaction, so a long-lived connection still sees the latest WAL
+    commits.
+    """
+
+    def __init__(self, url, busy_timeout_ms: int = 5000):
+        self.engine = create_engine(url, poolclass=NullPool)
+        configure_sqlite(self.engine, busy_timeout_ms=busy_timeout_ms, query_only=True)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.engine.connect()
+            self._local.conn = conn
+        return conn
+
+    def read(self, statement, params=None) -> List[Any]:
+        conn = self._connection()
+        try:
+            return conn.execute(statement, params).all()
+        finally:
+            conn.rollback()
+
+    def scalar(self, statement, params=None) -> Optional[Any]:
+        conn = self._connection()
+        try:
+            return conn.execute(statement, params).scalar()
+        finally:
+            conn.rollback()
+
+
+class StorageLayer:
+    """SQLite tuning, the group-commit writer and per-thread readers behind one object"""
+
+    def __init__(self, app, db, busy_timeout_ms: int = 5000, synchronous: str = 'NORMAL',
+                 journal_mode: str = 'WAL', commit_window_ms: int = 5, max_batch: int = 500):
+        with app.app_context():
+            engine = db.engine
+            configure_sqlite(engine, busy_timeout_ms=busy_timeout_ms, synchronous=synchronous,
+                             journal_mode=journal_mode)
+            url = engine.url
+        self.writer = GroupCommitWriter(app, db, commit_window_ms=commit_window_ms, max_batch=max_batch)
+        self.readers = ReadConnections(url, busy_timeout_ms=busy_timeout_ms)
+
+    def stats(self):
+        return dict(self.writer.counters, queued=self.writer._queue.qsize())
@@ -1,8 +1,10 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from datetime import datetime
 
+from modules.rolling import RollingWindow, RollingExtremes, fit
+
 class BaseStrategy:
     def __init__(self, parameters: Dict[str, Any] = None):
         self.parameters = parameters or {}
@@ -12,6 +14,12 @@ class BaseStrategy:
         """Generate trading signals based on market data"""
         raise NotImplementedError("Subclasses must implement generate_signals method")
 
+    @staticmethod
+    def prices(market_data: Dict[str, Any]) -> Tuple[List[str], np.ndarray]:
+        """Symbols with a usable last price, and those prices as an array"""
+        symbols = [symbol for symbol, data in market_data.items() if data and data.get('last_price', 0) > 0]
+        return symbols, np.array([market_data[symbol]['last_price'] for symbol in symbols], dtype=float)
+
 class MovingAverageCrossoverStrategy(BaseStrategy):
     def __init__(self, parameters: Dict[str, Any] = None):
         super().__init__(parameters)
@@ -59,6 +67,13 @@ class MovingAverageCrossoverStrategy(BaseStrategy):
         return signals
 
 class MeanReversionStrategy(BaseStrategy):
+    """
+    Rolling z-score mean reversion, long only: buys a symbol whose price is
+    `deviation_threshold` standard deviations below its mean over the last
+    `lookback_period` ticks and sells once it is back at the mean. All
+    symbols of a tick are scored in one vectorized pass.
+    """
+
     def __init__(self, parameters: Dict[str, Any] = None):
         super().__init__(parameters)
         self.name = "mean_reversion"
@@ -68,77 +83,102 @@ class MeanReversionStrategy(BaseStrategy):
             'quantity': 5
         }
         self.parameters = {**self.default_params, **(parameters or {})}
-        
+        self.window = RollingWindow(int(self.parameters['lookback_period']))
+        self.holding = np.zeros(self.window.capacity, dtype=bool)
+
     def generate_signals(self, market_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        symbols, prices = self.prices(market_data)
+        if not symbols:
+            return []
+        rows = self.window.rows(symbols)
+        self.holding = fit(self.holding, self.window.capacity)
+
+        # Score against the window before this tick joins it
+        ready = self.window.ready(rows)
+        mean = self.window.mean(rows)
+        std = self.window.std(rows)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(std > 0, (prices - mean) / std, 0.0)
+        holding = self.holding[rows]
+        buy = ready & ~holding & (z <= -self.parameters['deviation_threshold'])
+        sell = ready & holding & (z >= 0)
+        self.window.push(rows, prices)
+        self.holding[rows[buy]] = True
+        self.holding[rows[sell]] = False
+
         signals = []
-        
-        for symbol, data in market_data.items():
-            if not data or 'last_price' not in data:
-                continue
-                
-            current_price = data['last_price']
-            
-            # Generate demo signals
-            price_hash = hash(symbol + str(datetime.now().minute)) % 100
-            should_trade = price_hash < 25  # 25% chance to trade
-            
-            if should_trade:
-                action = 'BUY' if price_hash < 12 else 'SELL'
-                signals.append({
-                    'symbol': symbol,
-                    'action': action,
-                    'quantity': self.parameters['quantity'],
-                    'price': round(current_price * (0.995 if action == 'BUY' else 1.005), 2),
-                    'strategy': self.name,
-                    'timestamp': datetime.now()
-                })
-                
+        for i in np.flatnonzero(buy | sell):
+            action = 'BUY' if buy[i] else 'SELL'
+            signals.append({
+                'symbol': symbols[i],
+                'action': action,
+                'quantity': self.parameters['quantity'],
+                'price': round(float(prices[i]) * (0.995 if action == 'BUY' else 1.005), 2),
+                'strategy': self.name,
+                'z_score': round(float(z[i]), 3),
+                'timestamp': datetime.now()
+            })
         return signals
 
 class BreakoutStrategy(BaseStrategy):
+    """
+    Channel breakout, long only: buys when the price clears the high of the
+    last `lookback_period` ticks and is at least `resistance_level` times
+    their mean; sells when it falls through the channel low or to
+    `support_level` times the mean. Highs and lows come from monotonic
+    deques, the comparisons from one vectorized pass over all symbols.
+    """
+
     def __init__(self, parameters: Dict[str, Any] = None):
         super().__init__(parameters)
         self.name = "breakout"
         self.default_params = {
+            'lookback_period': 20,
             'resistance_level': 1.02,
             'support_level': 0.98,
             'quantity': 8
         }
         self.parameters = {**self.default_params, **(parameters or {})}
-        
+        lookback = int(self.parameters['lookback_period'])
+        self.window = RollingWindow(lookback)
+        self.channel = RollingExtremes(lookback)
+        self.holding = np.zeros(self.window.capacity, dtype=bool)
+
     def generate_signals(self, market_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        symbols, prices = self.prices(market_data)
+        if not symbols:
+            return []
+        rows = self.window.rows(symbols)
+        self.holding = fit(self.holding, self.window.capacity)
+
+        # Compare against the channel before this tick joins it
+        ready = self.window.ready(rows)
+        mean = self.window.mean(rows)
+        self.channel.reserve(self.window.capacity)
+        high = self.channel.high[rows]
+        low = self.channel.low[rows]
+        holding = self.holding[rows]
+        with np.errstate(invalid='ignore'):
+            buy = ready & ~holding & (prices > high) & (prices >= mean * self.parameters['resistance_level'])
+            sell = ready & holding & ((prices < low) | (prices <= mean * self.parameters['support_level']))
+        self.window.push(rows, prices)
+        self.channel.push(rows, prices)
+        self.holding[rows[buy]] = True
+        self.holding[rows[sell]] = False
+
         signals = []
-        
-        for symbol, data in market_data.items():
-            if not data or 'last_price' not in data:
-                continue
-                
-            current_price = data['last_price']
-            base_price = 1000 + (hash(symbol) % 5000)  # Demo base price
-            
-            # Check for breakout
-            resistance = base_price * self.parameters['resistance_level']
-            support = base_price * self.parameters['support_level']
-            
-            if current_price >= resistance:
-                signals.append({
-                    'symbol': symbol,
-                    'action': 'BUY',
-                    'quantity': self.parameters['quantity'],
-                    'price': round(current_price * 1.001, 2),
-                    'strategy': self.name,
-                    'timestamp': datetime.now()
-                })
-            elif current_price <= support:
-                signals.append({
-                    'symbol': symbol,
-                    'action': 'SELL',
-                    'quantity': self.parameters['quantity'],
-                    'price': round(current_price * 0.999, 2),
-                    'strategy': self.name,
-                    'timestamp': datetime.now()
-                })
-                
+        for i in np.flatnonzero(buy | sell):
+            action = 'BUY' if buy[i] else 'SELL'
+            signals.append({
+                'symbol': symbols[i],
+                'action': action,
+                'quantity': self.parameters['quantity'],
+                'price': round(float(prices[i]) * (1.001 if action == 'BUY' else 0.999), 2),
+                'strategy': self.name,
+                'channel_high': float(high[i]),
+                'channel_low': float(low[i]),
+                'timestamp': datetime.now()
+            })
         return signals
 
 class StrategyEngine:
@@ -172,10 +212,11 @@ class StrategyEngine:
             {
                 'name': 'breakout',
                 'display_name': 'Breakout Strategy',
-                'description': 'Trades when price breaks through support/resistance levels',
+                'description': 'Buys when price breaks above its recent high, sells when it breaks below its recent low',
                 'parameters': [
-                    {'name': 'resistance_level', 'type': 'number', 'default': 1.02, 'min': 1.01, 'max': 1.10, 'description': 'Resistance level multiplier'},
-                    {'name': 'support_level', 'type': 'number', 'default': 0.98, 'min': 0.90, 'max': 0.99, 'description': 'Support level multiplier'},
+                    {'name': 'lookback_period', 'type': 'number', 'default': 20, 'min': 5, 'max': 200, 'description': 'Ticks in the high/low channel'},
+                    {'name': 'resistance_level', 'type': 'number', 'default': 1.02, 'min': 1.0, 'max': 1.10, 'description': 'Minimum price to channel mean ratio for a buy'},
+                    {'name': 'support_level', 'type': 'number', 'default': 0.98, 'min': 0.90, 'max': 1.0, 'description': 'Price to channel mean ratio that forces a sell'},
                     {'name': 'quantity', 'type': 'number', 'default': 8, 'min': 1, 'max': 50, 'description': 'Quantity to trade per signal'}
                 ]
             }
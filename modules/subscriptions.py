@@ -0,0 +1,195 @@
+import atexit
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Iterable, Set
+
+
+class SubscriptionRegistry:
+    """
+    Fan-out index for market data: symbol -> subscriber sids and sid -> symbols.
+
+    Quotes are sent per sid (each client gets one batch or frame holding
+    only its own symbols), so this index is the only fan-out state; the
+    union of subscribed symbols is what the streamer fetches upstream.
+    Subscriptions are tagged with a source ('client' for explicit
+    subscribe_market_data requests, 'universe' for the user's watch
+    universe); a sid watches a symbol while any source wants it.
+    """
+
+    def __init__(self, max_symbols_per_sid: int = 200):
+        self.max_symbols_per_sid = max_symbols_per_sid
+        self._lock = threading.Lock()
+        self._by_symbol: Dict[str, Set[str]] = {}
+        self._by_sid: Dict[str, Dict[str, Set[str]]] = {}  # sid -> symbol -> sources
+
+    @staticmethod
+    def normalize(symbols: Iterable[str]) -> List[str]:
+        return sorted({str(symbol).strip().upper() for symbol in symbols or [] if str(symbol).strip()})
+
+    def subscribe(self, sid: str, symbols: Iterable[str], source: str = 'client') -> List[str]:
+        """Add symbols to sid's watch set (up to the per-sid cap); returns its full set"""
+        with self._lock:
+            watched = self._by_sid.setdefault(sid, {})
+            for symbol in self.normalize(symbols):
+                sources = watched.get(symbol)
+                if sources is not None:
+                    sources.add(source)
+                    continue
+                if len(watched) >= self.max_symbols_per_sid:
+                    break
+                watched[symbol] = {source}
+                self._by_symbol.setdefault(symbol, set()).add(sid)
+            return sorted(watched)
+
+    def unsubscribe(self, sid: str, symbols: Iterable[str] = None, source: str = 'client') -> List[str]:
+        """
+        Withdraw `source`'s interest in symbols (all of them if None); a
+        symbol is dropped once no source wants it. Returns what is left.
+        """
+        with self._lock:
+            watched = self._by_sid.get(sid)
+            if watched is None:
+                return []
+            for symbol in (list(watched) if symbols is None else self.normalize(symbols)):
+                sources = watched.get(symbol)
+                if sources is None:
+                    continue
+                sources.discard(source)
+                if sources:
+                    continue
+                del watched[symbol]
+                sids = self._by_symbol.get(symbol)
+                if sids is not None:
+                    sids.discard(sid)
+                    if not sids:
+                        del self._by_symbol[symbol]
+            if not watched:
+                del self._by_sid[sid]
+            return sorted(watched)
+
+    def drop(self, sid: str):
+        """Forget a disconnected sid entirely, whatever the sources"""
+        with self._lock:
+            watched = self._by_sid.pop(sid, {})
+            for symbol in watched:
+                sids = self._by_symbol.get(symbol)
+                if sids is not None:
+                    sids.discard(sid)
+                    if not sids:
+                        del self._by_symbol[symbol]
+
+    def symbols(self) -> List[str]:
+        """Union of every sid's symbols"""
+        with self._lock:
+            return sorted(self._by_symbol)
+
+    def subscribers(self, symbol: str) -> List[str]:
+        with self._lock:
+            return list(self._by_symbol.get(symbol, ()))
+
+    def symbols_for(self, sid: str) -> List[str]:
+        with self._lock:
+            return sorted(self._by_sid.get(sid, ()))
+
+    def snapshot(self) -> Dict[str, List[str]]:
+        """sid -> symbols, copied so the caller can iterate without the lock"""
+        with self._lock:
+            return {sid: list(symbols) for sid, symbols in self._by_sid.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sids': len(self._by_sid),
+                'symbols': len(self._by_symbol),
+                'subscriptions': sum(len(symbols) for symbols in self._by_sid.values())
+            }
+
+
+class MarketStreamer:
+    """
+    Polls quotes for the union of subscribed symbols and fans them out.
+
+    Every `interval` seconds it makes one `fetch_quotes(symbols)` call for
+    all symbols any client watches. With an `emitter` the quotes are
+    handed to it, which conflates and delta-encodes them per client;
+    without one each client gets a full `market_data_update` batch holding
+    only its own symbols. Either way upstream calls stay at one per tick
+    and each client's bandwidth follows its watch list. Idle when nobody
+    is subscribed.
+    """
+
+    def __init__(self, app, socketio, registry: SubscriptionRegistry,
+                 fetch_quotes: Callable[[List[str]], List[Dict[str, Any]]],
+                 interval: float = 5.0,
+                 emitter=None):
+        self.app = app
+        self.socketio = socketio
+        self.registry = registry
+        self.fetch_quotes = fetch_quotes
+        self.interval = interval
+        self.emitter = emitter  # optional ConflatingEmitter
+        self.logger = logging.getLogger(__name__)
+
+        self.latest: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._task = None
+        self._start_lock = threading.Lock()
+        self.counters = {'ticks': 0, 'fetches': 0, 'symbols_fetched': 0, 'batches': 0, 'quotes_sent': 0, 'errors': 0}
+        atexit.register(self.shutdown)
+
+    def start(self):
+        with self._start_lock:
+            if self._task is not None:
+                return False
+            self._task = self.socketio.start_background_task(self._stream_loop)
+            return True
+
+    def shutdown(self):
+        self._stop.set()
+
+    def _stream_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                self.counters['errors'] += 1
+                self.logger.error(f"Market streamer tick failed: {e}")
+            self._stop.wait(self.interval)
+
+    def tick(self) -> int:
+        """One fetch for the union of symbols, then one batch per subscriber; returns batches sent"""
+        self.counters['ticks'] += 1
+        symbols = self.registry.symbols()
+        if not symbols:
+            return 0
+
+        with self.app.app_context():
+            quotes = self.fetch_quotes(symbols) or []
+        self.counters['fetches'] += 1
+        self.counters['symbols_fetched'] += len(symbols)
+        for quote in quotes:
+            self.latest[quote['symbol']] = quote
+        if self.emitter is not None:
+            self.emitter.publish(quotes)
+            return 0
+
+        timestamp = datetime.now().isoformat()
+        sent = 0
+        for sid, watched in self.registry.snapshot().items():
+            batch = [self.latest[symbol] for symbol in watched if symbol in self.latest]
+            if batch:
+                self.send(sid, batch, timestamp)
+                sent += 1
+        return sent
+
+    def send(self, sid: str, batch: List[Dict[str, Any]], timestamp: str):
+        self.socketio.emit('market_data_update', {'data': batch, 'timestamp': timestamp}, to=sid)
+        self.counters['batches'] += 1
+        self.counters['quotes_sent'] += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self.counters, **self.registry.stats())
+        if self.emitter is not None:
+            stats['emitter'] = self.emitter.stats()
+        return stats
@@ -0,0 +1,288 @@
+import atexit
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from sqlalchemy import select, and_
+
+# Resolutions in seconds, finest first
+RAW, MINUTE, HOUR = 1, 60, 3600
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(ts: datetime, resolution: int) -> datetime:
+    """Start of the bucket holding `ts`; timestamps are naive UTC, like every other column"""
+    seconds = int((ts - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds // resolution * resolution)
+
+
+class BotLedger:
+    """Running cash flow and net quantity per symbol for one bot session, fed from fills"""
+
+    def __init__(self, initial_capital: float):
+        self.initial_capital = initial_capital
+        self.cash_flow = 0.0
+        self.quantities: Dict[str, int] = {}
+        self.last_fill_prices: Dict[str, float] = {}
+
+    def apply_fill(self, symbol: str, action: str, quantity: int, price: float, brokerage: float):
+        signed = quantity if action == 'BUY' else -quantity
+        self.cash_flow -= signed * price + brokerage
+        self.quantities[symbol] = self.quantities.get(symbol, 0) + signed
+        if self.quantities[symbol] == 0:
+            del self.quantities[symbol]
+        self.last_fill_prices[symbol] = price
+
+    def mark(self, prices: Dict[str, float]) -> Tuple[float, float, float]:
+        """(equity, cash, exposure) marked at `prices`, falling back to the last fill price"""
+        exposure = 0.0
+        market_value = 0.0
+        for symbol, quantity in self.quantities.items():
+            price = prices.get(symbol) or self.last_fill_prices.get(symbol, 0.0)
+            market_value += quantity * price
+            exposure += abs(quantity) * price
+        cash = self.initial_capital + self.cash_flow
+        return cash + market_value, cash, exposure
+
+
+class _Rollup:
+    """Accumulates one series' samples for the bucket currently being filled"""
+
+    __slots__ = ('bucket', 'equity', 'equity_min', 'equity_max', 'cash', 'exposure', 'drawdown')
+
+    def __init__(self, bucket: datetime, equity: float, cash: float, exposure: float, drawdown: float):
+        self.bucket = bucket
+        self.equity = self.equity_min = self.equity_max = equity
+        self.cash = cash
+        self.exposure = exposure
+        self.drawdown = drawdown
+
+    def add(self, equity: float, cash: float, exposure: float, drawdown: float):
+        self.equity = equity
+        self.equity_min = min(self.equity_min, equity)
+        self.equity_max = max(self.equity_max, equity)
+        self.cash = cash
+        self.exposure = exposure
+        self.drawdown = max(self.drawdown, drawdown)
+
+
+class EquityStore:
+    """
+    Equity-curve time series for accounts and bots.
+
+    A sampler thread calls `collect()` every `sample_interval` seconds; each
+    (scope, scope_id, equity, cash, exposure) sample is stored at 1s
+    resolution (only when it changed) and rolled up in memory into 1m and
+    1h buckets, which are written when the bucket closes. Raw and minute
+    rows are pruned after their retention window, so long ranges are
+    served from the coarser series. All writes go through the shared
+    group-commit writer; range queries use the per-thread readers.
+    Buckets are naive UTC. Open buckets are written when a bot's series
+    is dropped and on shutdown.
+    """
+
+    def __init__(self, app, db, sample_model, storage,
+                 sample_interval: float = 1.0,
+                 raw_retention: timedelta = timedelta(hours=2),
+                 minute_retention: timedelta = timedelta(days=7)):
+        self.app = app
+        self.db = db
+        self.table = sample_model.__table__
+        self.storage = storage
+        self.sample_interval = sample_interval
+        self.retention = {RAW: raw_retention, MINUTE: minute_retention}
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._peaks: Dict[Tuple[str, int], float] = {}
+        self._last_raw: Dict[Tuple[str, int], Tuple[float, float, float]] = {}
+        self._rollups: Dict[Tuple[str, int, int], _Rollup] = {}
+        self.ledgers: Dict[int, BotLedger] = {}
+        self._ledger_lock = threading.Lock()
+
+        self._collect: Optional[Callable[[], List[Tuple[str, int, float, float, float]]]] = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._ticks = 0
+        atexit.register(self.shutdown)
+
+    def start(self, collect: Callable[[], List[Tuple[str, int, float, float, float]]]):
+        if self._thread is not None:
+            return
+        self._collect = collect
+        self._thread = threading.Thread(target=self._sample_loop, name='EquitySampler', daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stop sampling and write every bucket still being filled"""
+        self._stop.set()
+        with self._lock:
+            rows = [self._row(scope, scope_id, resolution, rollup)
+                    for (scope, scope_id, resolution), rollup in self._rollups.items()]
+            self._rollups.clear()
+        self._write(rows, wait=True)
+
+    # Bot ledgers
+
+    def on_fill(self, session_id: int, initial_capital: float, symbol: str, action: str,
+                quantity: int, price: float, brokerage: float):
+        with self._ledger_lock:
+            ledger = self.ledgers.get(session_id)
+            if ledger is None:
+                ledger = self.ledgers[session_id] = BotLedger(initial_capital)
+            ledger.apply_fill(symbol, action, quantity, price, brokerage)
+
+    def ledger(self, session_id: int, initial_capital: float) -> BotLedger:
+        with self._ledger_lock:
+            ledger = self.ledgers.get(session_id)
+            if ledger is None:
+                ledger = self.ledgers[session_id] = BotLedger(initial_capital)
+            return ledger
+
+    def drop_ledger(self, session_id: int):
+        """Forget a stopped bot: write its open 1m/1h buckets and drop its ledger and series state"""
+        with self._ledger_lock:
+            self.ledgers.pop(session_id, None)
+        key = ('bot', session_id)
+        with self._lock:
+            self._peaks.pop(key, None)
+            self._last_raw.pop(key, None)
+            rows = [self._row('bot', session_id, resolution, rollup)
+                    for resolution in (MINUTE, HOUR)
+                    for rollup in [self._rollups.pop(key + (resolution,), None)] if rollup is not None]
+        self._write(rows)
+
+    # Sampling
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            try:
+                with self.app.app_context():
+                    samples = self._collect()
+                self.record(samples)
+                self._ticks += 1
+                if self._ticks % 300 == 0:
+                    self.prune()
+            except Exception as e:
+                self.logger.error(f"Equity sampling failed: {e}")
+
+    def record(self, samples: List[Tuple[str, int, float, float, float]], now: datetime = None):
+        """Store one sample per series and emit any 1m/1h buckets that closed"""
+        now = now or datetime.utcnow()
+        raw_bucket = bucket_start(now, RAW)
+        rows = []
+        with self._lock:
+            for scope, scope_id, equity, cash, exposure in samples:
+                key = (scope, scope_id)
+                peak = max(self._peaks.get(key, equity), equity)
+                self._peaks[key] = peak
+                drawdown = (peak - equity) / peak if peak > 0 else 0.0
+
+                values = (round(equity, 2), round(cash, 2), round(exposure, 2))
+                if self._last_raw.get(key) != values:
+                    self._last_raw[key] = values
+                    rows.append(self._row(scope, scope_id, RAW, _Rollup(raw_bucket, equity, cash, exposure, drawdown)))
+
+                for resolution in (MINUTE, HOUR):
+                    bucket = bucket_start(now, resolution)
+                    rollup = self._rollups.get((scope, scope_id, resolution))
+                    if rollup is None or rollup.bucket != bucket:
+                        if rollup is not None:
+                            rows.append(self._row(scope, scope_id, resolution, rollup))
+                        self._rollups[(scope, scope_id, resolution)] = _Rollup(bucket, equity, cash, exposure, drawdown)
+                    else:
+                        rollup.add(equity, cash, exposure, drawdown)
+
+        self._write(rows)
+
+    def _write(self, rows: List[Dict[str, Any]], wait: bool = False):
+        if not rows:
+            return
+        future = self.storage.writer.execute(self.table.insert().prefix_with('OR REPLACE'), rows)
+        if not wait:
+            future.add_done_callback(self._log_write_error)
+            return
+        try:
+            future.result(timeout=10)
+        except Exception as e:
+            self.logger.error(f"Equity sample write failed: {e}")
+
+    def _row(self, scope: str, scope_id: int, resolution: int, rollup: _Rollup) -> Dict[str, Any]:
+        return {
+            'scope': scope,
+            'scope_id': scope_id,
+            'resolution': resolution,
+            'bucket': rollup.bucket,
+            'equity': rollup.equity,
+            'equity_min': rollup.equity_min,
+            'equity_max': rollup.equity_max,
+            'cash': rollup.cash,
+            'exposure': rollup.exposure,
+            'drawdown': rollup.drawdown
+        }
+
+    def _log_write_error(self, future):
+        if future.exception() is not None:
+            self.logger.error(f"Equity sample write failed: {future.exception()}")
+
+    def prune(self):
+        """Delete raw and minute rows past their retention"""
+        now = datetime.utcnow()
+        for resolution, keep in self.retention.items():
+            self.storage.writer.execute(
+                self.table.delete().where(and_(
+                    self.table.c.resolution == resolution,
+                    self.table.c.bucket < now - keep
+                ))
+            )
+
+    # Queries
+
+    def pick_resolution(self, start: datetime, end: datetime, max_points: int) -> int:
+        """Finest resolution that still covers `start` and fits within `max_points`"""
+        span = max((end - start).total_seconds(), 1)
+        now = datetime.utcnow()
+        for resolution in (RAW, MINUTE):
+            if start >= now - self.retention[resolution] and span / resolution <= max_points:
+                return resolution
+        return HOUR
+
+    def range(self, scope: str, scope_id: int, start: datetime, end: datetime,
+              max_points: int = 500, resolution: int = None) -> Dict[str, Any]:
+        resolution = resolution or self.pick_resolution(start, end, max_points)
+        t = self.table
+        rows = self.storage.readers.read(
+            select(t.c.bucket, t.c.equity, t.c.equity_min, t.c.equity_max, t.c.cash, t.c.exposure, t.c.drawdown)
+            .where(
+                t.c.scope == scope,
+                t.c.scope_id == scope_id,
+                t.c.resolution == resolution,
+                t.c.bucket >= bucket_start(start, resolution),
+                t.c.bucket <= end
+            )
+            .order_by(t.c.bucket)
+        )
+        points = [{
+            'timestamp': row.bucket.isoformat(),
+            'equity': row.equity,
+            'equity_min': row.equity_min,
+            'equity_max': row.equity_max,
+            'cash': row.cash,
+            'exposure': row.exposure,
+            'drawdown': row.drawdown
+        } for row in rows]
+
+        # The bucket still being filled is only in memory
+        if resolution != RAW:
+            with self._lock:
+                rollup = self._rollups.get((scope, scope_id, resolution))
+                if rollup is not None and start <= rollup.bucket <= end:
+                    live = self._row(scope, scope_id, resolution, rollup)
+                    points.append({
+                        'timestamp': live['bucket'].isoformat(),
+                        **{k: live[k] for k in ('equity', 'equity_min', 'equity_max', 'cash', 'exposure', 'drawdown')}
+                    })
+
+        return {'scope': scope, 'id': scope_id, 'resolution': resolution, 'points': points}
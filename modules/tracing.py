@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+import logging
+from collections import deque, OrderedDict
+from typing import Dict, List, Any, Callable, Iterable, Optional
+
+from modules.metrics import Histogram, REGISTRY as metrics
+
+# Pipeline stages, in the order a signal normally passes through them
+STAGES = ('quote_fetch', 'generate_signals', 'price_check', 'validate', 'place_order', 'db_write', 'emit')
+ORDER_STAGE = 'place_order'
+LATENCIES = ('tick_to_order', 'order_to_ack')
+
+metrics.describe('trace_stage_seconds', 'Duration of each bot pipeline stage')
+metrics.describe('trace_tick_to_order_seconds', 'Bot tick start to order submission, by strategy')
+metrics.describe('trace_order_to_ack_seconds', 'Order submission to broker or paper acknowledgement, by strategy')
+metrics.describe('trace_budget_exceeded_total', 'Pipeline latencies over their budget')
+
+
+class Trace:
+    """
+    Identity and clock origin of one bot tick, or of one signal raised by it.
+
+    `t0` is the monotonic time the tick started (its quote fetch); signal
+    traces are children that keep the tick's `t0`, so tick-to-order covers
+    fetch, signal generation and validation.
+    """
+
+    __slots__ = ('trace_id', 'parent_id', 'bot_id', 'user_id', 'strategy', 'mode', 't0', 'wall0')
+
+    def __init__(self, bot_id: int, user_id: int, strategy: str, mode: str,
+                 parent: 'Trace' = None):
+        self.trace_id = os.urandom(8).hex()
+        self.parent_id = parent.trace_id if parent else None
+        self.bot_id = bot_id
+        self.user_id = user_id
+        self.strategy = strategy
+        self.mode = mode
+        self.t0 = parent.t0 if parent else time.perf_counter()
+        self.wall0 = parent.wall0 if parent else time.time()
+
+    def child(self) -> 'Trace':
+        return Trace(self.bot_id, self.user_id, self.strategy, self.mode, parent=self)
+
+
+class _Span:
+    __slots__ = ('tracer', 'trace', 'stage', 'started')
+
+    def __init__(self, tracer: 'Tracer', trace: Trace, stage: str):
+        self.tracer = tracer
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.record(self.trace, self.stage, self.started, time.perf_counter(), failed=exc_type is not None)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Per-stage spans of the tick -> signal -> order pipeline.
+
+    Every finished span goes into a fixed-size ring buffer (trace id,
+    stage, offset from the tick, duration) and into the per-stage
+    histogram. The order stage also yields the two pipeline latencies:
+    tick-to-order (tick start to order submission) and order-to-ack
+    (submission to the broker's or paper book's answer), kept as
+    histograms per bot and per strategy.
+
+    A latency over its budget calls `on_budget_exceeded(trace, latency,
+    seconds, budget)`, at most once per `alert_interval` per bot and
+    latency.
+    """
+
+    def __init__(self, capacity: int = 10000,
+                 budgets: Dict[str, float] = None,
+                 on_budget_exceeded: Callable[[Trace, str, float, float], None] = None,
+                 alert_interval: float = 60.0,
+                 max_bots: int = 500):
+        self.budgets = dict(budgets or {})
+        self.on_budget_exceeded = on_budget_exceeded
+        self.alert_interval = alert_interval
+        self.max_bots = max_bots
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._spans: deque = deque(maxlen=capacity)
+        self._by_bot: 'OrderedDict[int, Dict[str, Histogram]]' = OrderedDict()
+        self._by_strategy: Dict[str, Dict[str, Histogram]] = {}
+        self._bot_strategy: Dict[int, str] = {}
+        self._last_alert: Dict[tuple, float] = {}
+        self.counters = {'spans': 0, 'orders': 0, 'budget_exceeded': 0}
+
+    def start_tick(self, bot_id: int, user_id: int, strategy: str, mode: str) -> Trace:
+        return Trace(bot_id, user_id, strategy, mode)
+
+    def span(self, trace: Optional[Trace], stage: str):
+        """Context manager timing one stage of `trace`; a no-op without a trace"""
+        if trace is None:
+            return _NULL_SPAN
+        return _Span(self, trace, stage)
+
+    def record(self, trace: Optional[Trace], stage: str, started: float, finished: float, failed: bool = False):
+        """Add a finished span (perf_counter times); for stages that cannot be wrapped in span()"""
+        if trace is None:
+            return
+        duration = finished - started
+        metrics.observe('trace_stage_seconds', duration, stage=stage)
+        with self._lock:
+            self._spans.append((trace.trace_id, trace.parent_id, trace.bot_id, trace.user_id, trace.strategy,
+                                stage, trace.wall0, started - trace.t0, duration, failed))
+            self.counters['spans'] += 1
+        if stage == ORDER_STAGE:
+            self.counters['orders'] += 1
+            self._latency(trace, 'tick_to_order', started - trace.t0)
+            self._latency(trace, 'order_to_ack', duration)
+
+    def _latency(self, trace: Trace, latency: str, seconds: float):
+        metrics.observe(f"trace_{latency}_seconds", seconds, strategy=trace.strategy)
+        with self._lock:
+            per_bot = self._by_bot.get(trace.bot_id)
+            if per_bot is None:
+                per_bot = self._by_bot[trace.bot_id] = {name: Histogram() for name in LATENCIES}
+                self._bot_strategy[trace.bot_id] = trace.strategy
+                while len(self._by_bot) > self.max_bots:
+                    evicted, _ = self._by_bot.popitem(last=False)
+                    self._bot_strategy.pop(evicted, None)
+            else:
+                self._by_bot.move_to_end(trace.bot_id)
+            per_strategy = self._by_strategy.setdefault(trace.strategy, {name: Histogram() for name in LATENCIES})
+        per_bot[latency].record(seconds)
+        per_strategy[latency].record(seconds)
+
+        budget = self.budgets.get(latency)
+        if budget is None or seconds <= budget:
+            return
+        self.counters['budget_exceeded'] += 1
+        metrics.inc('trace_budget_exceeded_total', latency=latency, strategy=trace.strategy)
+        key = (trace.bot_id, latency)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_alert.get(key, -self.alert_interval) < self.alert_interval:
+                return
+            self._last_alert[key] = now
+        if self.on_budget_exceeded is not None:
+            try:
+                self.on_budget_exceeded(trace, latency, seconds, budget)
+            except Exception as e:
+                self.logger.error(f"Latency budget alert failed: {e}")
+
+    # Reporting
+
+    @staticmethod
+    def _summaries(histograms: Dict[str, Histogram]) -> Dict[str, Any]:
+        return {latency: histogram.summary() for latency, histogram in histograms.items()}
+
+    def latencies(self, bot_ids: Iterable[int] = None) -> Dict[str, Any]:
+        """p50/p99 tick-to-order and order-to-ack per bot (optionally only `bot_ids`) and per strategy"""
+        with self._lock:
+            bots = [(bot_id, self._bot_strategy.get(bot_id), histograms) for bot_id, histograms in self._by_bot.items()
+                    if bot_ids is None or bot_id in bot_ids]
+            strategies = list(self._by_strategy.items())
+        return {
+            'bots': {str(bot_id): {'strategy': strategy, **self._summaries(histograms)}
+                     for bot_id, strategy, histograms in bots},
+            'strategies': {strategy: self._summaries(histograms) for strategy, histograms in strategies},
+            'budgets_ms': {latency: round(budget * 1000, 3) for latency, budget in self.budgets.items()}
+        }
+
+    def recent(self, bot_ids: Iterable[int] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """The latest traces from the ring buffer, newest first, each with its spans in order"""
+        with self._lock:
+            spans = list(self._spans)
+        traces: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        for trace_id, parent_id, bot_id, user_id, strategy, stage, wall0, offset, duration, failed in reversed(spans):
+            if bot_ids is not None and bot_id not in bot_ids:
+                continue
+            trace = traces.get(trace_id)
+            if trace is None:
+                if len(traces) >= limit:
+                    continue
+                trace = traces[trace_id] = {
+                    'trace_id': trace_id, 'parent_id': parent_id, 'bot_id': bot_id, 'strategy': strategy,
+                    'tick_started_at': wall0, 'spans': []
+                }
+            trace['spans'].append({'stage': stage, 'offset_ms': round(offset * 1000, 3),
+                                   'duration_ms': round(duration * 1000, 3), 'failed': failed})
+        for trace in traces.values():
+            trace['spans'].reverse()
+        return list(traces.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counters, buffered=len(self._spans), bots=len(self._by_bot))
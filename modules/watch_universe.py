@@ -0,0 +1,211 @@
+import atexit
+import threading
+import time
+import logging
+from typing import Dict, List, Any, Callable, Optional, Set
+
+UNIVERSE_SOURCE = 'universe'
+
+
+class _Universe:
+    """One user's cached watch universe and the cash it was computed for"""
+
+    __slots__ = ('symbols', 'cash', 'computed_at', 'check_due')
+
+    def __init__(self):
+        self.symbols: List[str] = []
+        self.cash: Optional[float] = None
+        self.computed_at = 0.0
+        self.check_due = True
+
+
+class WatchUniverse:
+    """
+    Per-user market watch universe, computed from the user's own settings
+    and wallet.
+
+    `compute_symbols(user_id, cash)` (an instrument dump plus a sample) is
+    expensive, so each user's result is cached. It is recomputed only when
+    the user's cash has moved by more than `tolerance` (relative) since the
+    last computation, or after `max_age` seconds. Balance checks happen
+    when `balance_changed()` flags the user (after a fill, settings change
+    or reset) or when `observe_balance()` is handed a fresh figure, and
+    never more than once per `check_interval` per user, not per market
+    tick.
+
+    Every connected sid of the user is subscribed to the universe in the
+    shared SubscriptionRegistry under the 'universe' source. Users whose
+    universes overlap therefore share one upstream quote fetch per symbol.
+    """
+
+    def __init__(self, app, socketio, registry,
+                 load_balance: Callable[[int], Optional[float]],
+                 compute_symbols: Callable[[int, float], List[str]],
+                 tolerance: float = 0.05,
+                 max_age: float = 900.0,
+                 check_interval: float = 30.0):
+        self.app = app
+        self.socketio = socketio
+        self.registry = registry
+        self.load_balance = load_balance
+        self.compute_symbols = compute_symbols
+        self.tolerance = tolerance
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._universes: Dict[int, _Universe] = {}
+        self._sids: Dict[int, Set[str]] = {}
+        self._sid_user: Dict[str, int] = {}
+        self._last_check: Dict[int, float] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._task = None
+        self._start_lock = threading.Lock()
+        self.counters = {'balance_checks': 0, 'computations': 0, 'reused': 0, 'errors': 0}
+        atexit.register(self.shutdown)
+
+    def start(self):
+        with self._start_lock:
+            if self._task is not None:
+                return
+            self._task = self.socketio.start_background_task(self._refresh_loop)
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
+
+    # Connections
+
+    def attach(self, sid: str, user_id: int):
+        """Subscribe a new connection to its user's universe, computing it in the background if needed"""
+        with self._lock:
+            self._sid_user[sid] = user_id
+            self._sids.setdefault(user_id, set()).add(sid)
+            universe = self._universes.get(user_id)
+            symbols = list(universe.symbols) if universe else []
+            if universe is None:
+                self._universes[user_id] = _Universe()
+        if symbols:
+            self.registry.subscribe(sid, symbols, source=UNIVERSE_SOURCE)
+        self.start()
+        self._wake.set()
+
+    def detach(self, sid: str):
+        with self._lock:
+            user_id = self._sid_user.pop(sid, None)
+            if user_id is None:
+                return
+            sids = self._sids.get(user_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    # Keep the computed universe for a reconnect; only the subscription goes
+                    del self._sids[user_id]
+
+    def connected_users(self) -> List[int]:
+        with self._lock:
+            return list(self._sids)
+
+    def symbols(self, user_id: int) -> List[str]:
+        with self._lock:
+            universe = self._universes.get(user_id)
+            return list(universe.symbols) if universe else []
+
+    # Balance signals
+
+    def balance_changed(self, user_id: int):
+        """The user's cash may have moved: re-check it on the next refresh"""
+        with self._lock:
+            universe = self._universes.get(user_id)
+            if universe is None or user_id not in self._sids:
+                return
+            universe.check_due = True
+        self._wake.set()
+
+    def observe_balance(self, user_id: int, cash: float):
+        """A fresh cash figure seen elsewhere (e.g. the live wallet); recompute only if it moved enough"""
+        with self._lock:
+            universe = self._universes.get(user_id)
+            if universe is None or user_id not in self._sids or not self._moved(universe, cash):
+                return
+            universe.check_due = True
+        self._wake.set()
+
+    def _moved(self, universe: _Universe, cash: float) -> bool:
+        if universe.cash is None:
+            return True
+        return abs(cash - universe.cash) > self.tolerance * max(abs(universe.cash), 1.0)
+
+    # Refresh
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+            for user_id in self._due_users():
+                try:
+                    self.refresh(user_id)
+                except Exception as e:
+                    self.counters['errors'] += 1
+                    self.logger.error(f"Watch universe refresh failed for user {user_id}: {e}")
+
+    def _due_users(self) -> List[int]:
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for user_id in self._sids:
+                universe = self._universes.get(user_id)
+                stale = universe is None or now - universe.computed_at >= self.max_age
+                flagged = universe is not None and universe.check_due
+                throttled = universe is not None and universe.computed_at and \
+                    now - self._last_check.get(user_id, 0.0) < self.check_interval
+                if (stale or flagged) and not throttled:
+                    due.append(user_id)
+        return due
+
+    def refresh(self, user_id: int, force: bool = False) -> List[str]:
+        """Check the user's cash and recompute the universe if it moved, aged out, or was never computed"""
+        self._last_check[user_id] = time.monotonic()
+        with self.app.app_context():
+            cash = self.load_balance(user_id)
+        self.counters['balance_checks'] += 1
+
+        with self._lock:
+            universe = self._universes.setdefault(user_id, _Universe())
+            universe.check_due = False
+            fresh = time.monotonic() - universe.computed_at < self.max_age
+            if cash is None:
+                # No usable broker session for this user; wait for max_age or the next balance signal
+                universe.computed_at = time.monotonic()
+                return list(universe.symbols)
+            if not force and fresh and universe.computed_at and not self._moved(universe, cash):
+                self.counters['reused'] += 1
+                return list(universe.symbols)
+
+        with self.app.app_context():
+            symbols = self.registry.normalize(self.compute_symbols(user_id, cash) or [])
+        self.counters['computations'] += 1
+
+        with self._lock:
+            previous = set(universe.symbols)
+            universe.symbols = symbols
+            universe.cash = cash
+            universe.computed_at = time.monotonic()
+            sids = list(self._sids.get(user_id, ()))
+        removed = sorted(previous - set(symbols))
+        for sid in sids:
+            if removed:
+                self.registry.unsubscribe(sid, removed, source=UNIVERSE_SOURCE)
+            self.registry.subscribe(sid, symbols, source=UNIVERSE_SOURCE)
+        return symbols
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self.counters,
+                users=len(self._sids),
+                cached_universes=len(self._universes),
+                symbols=len({symbol for universe in self._universes.values() for symbol in universe.symbols})
+            )
@@ -0,0 +1,215 @@
+import atexit
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, Set
+
+
+class PaperAccount:
+    """In-memory paper trading account: cash balance and open positions"""
+
+    def __init__(self, user_id: int, balance: float, positions: Dict[str, Dict[str, Any]]):
+        self.user_id = user_id
+        self.balance = balance
+        self.positions = positions  # symbol -> {quantity, average_price, invested_amount, product_type}
+        self.lock = threading.RLock()
+
+
+class PaperAccountCache:
+    """
+    Write-behind cache of paper balances (UserSettings.paper_trading_balance)
+    and PaperPosition rows.
+
+    Reads and trades work against per-user PaperAccount objects in memory.
+    Mutations only mark the account dirty; a background thread coalesces the
+    dirty balances and positions into one bulk flush every `flush_interval`
+    seconds. `flush()` is also registered with atexit so pending rows are
+    written on shutdown.
+    """
+
+    def __init__(self, app, db, settings_model, position_model,
+                 flush_interval: float = 2.0, default_balance: float = 100000.0, writer=None):
+        self.app = app
+        self.db = db
+        self.settings_model = settings_model
+        self.position_model = position_model
+        self.flush_interval = flush_interval
+        self.default_balance = default_balance
+        self.writer = writer  # optional GroupCommitWriter; flushes then share its commits
+        self.logger = logging.getLogger(__name__)
+
+        self._accounts: Dict[int, PaperAccount] = {}
+        self._accounts_lock = threading.Lock()
+        self._dirty_balances: Set[int] = set()
+        self._dirty_positions: Dict[int, Set[str]] = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        atexit.register(self.shutdown)
+
+    def start(self):
+        """Start the background flusher thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._flush_loop, name='PaperCacheFlusher', daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """Stop the flusher and write everything that is still dirty"""
+        self._running = False
+        self.flush()
+
+    def account(self, user_id: int) -> PaperAccount:
+        """Get the cached account for a user, loading it from the database on first use"""
+        account = self._accounts.get(user_id)
+        if account is not None:
+            return account
+
+        with self._accounts_lock:
+            account = self._accounts.get(user_id)
+            if account is None:
+                account = self._load_account(user_id)
+                self._accounts[user_id] = account
+        self.start()
+        return account
+
+    def _load_account(self, user_id: int) -> PaperAccount:
+        settings = self.settings_model.query.filter_by(user_id=user_id).first()
+        rows = self.position_model.query.filter_by(user_id=user_id).all()
+
+        positions = {}
+        for row in rows:
+            positions[row.symbol] = {
+                'quantity': row.quantity,
+                'average_price': row.average_price,
+                'invested_amount': row.invested_amount,
+                'product_type': row.product_type
+            }
+
+        if settings is None or settings.paper_trading_balance is None:
+            balance = self.default_balance
+            # Missing settings row is created by the next flush
+            with self._dirty_lock:
+                self._dirty_balances.add(user_id)
+        else:
+            balance = settings.paper_trading_balance
+
+        return PaperAccount(user_id, balance, positions)
+
+    def cached_user_ids(self):
+        """Users whose accounts are currently loaded"""
+        return list(self._accounts)
+
+    def get_balance(self, user_id: int) -> float:
+        return self.account(user_id).balance
+
+    def set_balance(self, user_id: int, balance: float):
+        account = self.account(user_id)
+        with account.lock:
+            account.balance = balance
+        self.mark_dirty(user_id)
+
+    def get_position(self, user_id: int, symbol: str) -> Optional[Dict[str, Any]]:
+        account = self.account(user_id)
+        with account.lock:
+            position = account.positions.get(symbol)
+            return dict(position) if position else None
+
+    def get_positions(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        account = self.account(user_id)
+        with account.lock:
+            return {symbol: dict(position) for symbol, position in account.positions.items()}
+
+    def mark_dirty(self, user_id: int, symbol: str = None):
+        """Record that the account balance (and optionally a position) changed"""
+        with self._dirty_lock:
+            self._dirty_balances.add(user_id)
+            if symbol:
+                self._dirty_positions.setdefault(user_id, set()).add(symbol)
+
+    def invalidate(self, user_id: int):
+        """Drop a cached account after flushing it, so the next read reloads from the database"""
+        self.flush()
+        with self._accounts_lock:
+            self._accounts.pop(user_id, None)
+
+    def _flush_loop(self):
+        while self._running:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _collect_dirty(self) -> Dict[int, Dict[str, Any]]:
+        with self._dirty_lock:
+            balances = self._dirty_balances
+            positions = self._dirty_positions
+            self._dirty_balances = set()
+            self._dirty_positions = {}
+
+        pending = {}
+        for user_id in balances | set(positions):
+            account = self._accounts.get(user_id)
+            if account is None:
+                continue
+            with account.lock:
+                pending[user_id] = {
+                    'balance': account.balance,
+                    'positions': {symbol: (dict(account.positions[symbol]) if symbol in account.positions else None)
+                                  for symbol in positions.get(user_id, ())}
+                }
+        return pending
+
+    def _restore_dirty(self, pending: Dict[int, Dict[str, Any]]):
+        for user_id, entry in pending.items():
+            self.mark_dirty(user_id)
+            for symbol in entry['positions']:
+                self.mark_dirty(user_id, symbol)
+
+    def flush(self) -> int:
+        """Write all dirty balances and positions in one transaction; returns rows touched"""
+        with self._flush_lock:
+            pending = self._collect_dirty()
+            if not pending:
+                return 0
+
+            try:
+                if self.writer is not None:
+                    return self.writer.submit(lambda conn: self._write_pending(conn, pending)).result()
+                with self.app.app_context():
+                    with self.db.engine.begin() as conn:
+                        return self._write_pending(conn, pending)
+
+            except Exception as e:
+                self._restore_dirty(pending)
+                self.logger.error(f"Paper cache flush failed, will retry: {e}")
+                return 0
+
+    def _write_pending(self, conn, pending: Dict[int, Dict[str, Any]]) -> int:
+        settings = self.settings_model.__table__
+        positions = self.position_model.__table__
+        now = datetime.utcnow()
+        touched = 0
+
+        for user_id, entry in pending.items():
+            updated = conn.execute(
+                settings.update()
+                .where(settings.c.user_id == user_id)
+                .values(paper_trading_balance=entry['balance'], updated_at=now)
+            ).rowcount
+            if not updated:
+                conn.execute(settings.insert().values(user_id=user_id, paper_trading_balance=entry['balance']))
+            touched += 1
+
+            for symbol, position in entry['positions'].items():
+                match = (positions.c.user_id == user_id) & (positions.c.symbol == symbol)
+                if position is None:
+                    conn.execute(positions.delete().where(match))
+                else:
+                    updated = conn.execute(positions.update().where(match).values(updated_at=now, **position)).rowcount
+                    if not updated:
+                        conn.execute(positions.insert().values(user_id=user_id, symbol=symbol, **position))
+                touched += 1
+
+        return touched
@@ -6,6 +6,10 @@ class TradingBotApp {
         this.activeBots = new Map();
         this.marketData = new Map();
         this.portfolioData = {};
+        this.recentOrders = [];
+        this.accountState = null;
+        this.accountSeq = null;
+        this.accountResyncing = false;
         this.init();
     }
 
@@ -18,8 +22,25 @@ class TradingBotApp {
 
     setupSocketListeners() {
         // Market data updates
-        this.socket.on('market_data_update', (data) => {
-            this.handleMarketDataUpdate(data);
+        // Field table for market_frame rows, sent on connect and with every subscription
+        this.marketFields = [];
+        this.socket.on('connection_response', (data) => {
+            if (data.fields) this.marketFields = data.fields;
+        });
+        this.socket.on('subscription_confirmed', (data) => {
+            if (data.fields) this.marketFields = data.fields;
+        });
+
+        // Conflated market frames: [symbol, field index, value, ...] rows with changed fields only
+        this.socket.on('market_frame', (frame, ack) => {
+            frame.q.forEach(row => {
+                const quote = { ...(this.marketData.get(row[0]) || { symbol: row[0] }) };
+                for (let i = 1; i < row.length; i += 2) {
+                    quote[this.marketFields[row[i]]] = row[i + 1];
+                }
+                this.handleMarketDataUpdate(quote);
+            });
+            if (ack) ack();
         });
 
         // Bot status updates
@@ -41,8 +62,17 @@ class TradingBotApp {
         this.socket.on('connect', () => {
             this.showNotification('Connected to trading server', 'success');
             this.updateConnectionStatus(true);
+            // A new connection gets full values again, so start from empty quotes
+            this.marketData.clear();
+            this.accountSeq = null;
+            this.accountResyncing = false;
+            this.socket.emit('account_subscribe', { mode: this.tradingMode() });
         });
 
+        // Account push channel: one snapshot, then sequence-numbered deltas
+        this.socket.on('account_snapshot', (data) => this.applyAccountSnapshot(data));
+        this.socket.on('account_delta', (frame) => this.applyAccountDelta(frame));
+
         this.socket.on('disconnect', () => {
             this.showNotification('Disconnected from trading server', 'warning');
             this.updateConnectionStatus(false);
@@ -111,6 +141,87 @@ class TradingBotApp {
         }
     }
 
+    handleBotStatusUpdate(data) {
+        this.showNotification(`Bot ${data.session_id}: ${data.message}`, 'info');
+    }
+
+    handleTradeUpdate(data) {
+        this.recentOrders = [{ ...data, status: 'COMPLETED' }, ...this.recentOrders].slice(0, 5);
+        this.updateOrdersTable(this.recentOrders);
+    }
+
+    tradingMode() {
+        // The page's mode toggle (base.html) when there is one
+        return typeof currentTradingMode === 'undefined' ? 'paper' : currentTradingMode;
+    }
+
+    applyAccountSnapshot(data) {
+        if (data.mode !== this.tradingMode()) return;
+        this.accountSeq = data.seq;
+        this.accountResyncing = false;
+        this.accountState = {
+            wallet: data.wallet || {},
+            portfolio: data.portfolio || {},
+            positions: new Map(),
+            bots: new Map()
+        };
+        (data.positions || []).forEach(position => this.accountState.positions.set(String(position.symbol), position));
+        (data.bots || []).forEach(bot => this.accountState.bots.set(String(bot.id), bot));
+        this.renderAccount(['wallet', 'portfolio', 'positions', 'bots']);
+    }
+
+    applyAccountDelta(frame) {
+        if (frame.mode !== this.tradingMode() || this.accountSeq === null || frame.seq <= this.accountSeq) return;
+        if (frame.seq !== this.accountSeq + 1) {
+            // Missed a frame: ask once for the gap (or a fresh snapshot) and drop frames until it arrives
+            if (!this.accountResyncing) {
+                this.accountResyncing = true;
+                this.socket.emit('account_resync', { mode: frame.mode, since: this.accountSeq });
+            }
+            return;
+        }
+        this.accountSeq = frame.seq;
+        this.accountResyncing = false;
+
+        const keys = { positions: 'symbol', bots: 'id' };
+        Object.entries(frame.changes).forEach(([section, change]) => {
+            if (keys[section]) {
+                change.upsert.forEach(item => this.accountState[section].set(String(item[keys[section]]), item));
+                change.remove.forEach(key => this.accountState[section].delete(String(key)));
+            } else {
+                Object.assign(this.accountState[section], change);
+            }
+        });
+        this.renderAccount(Object.keys(frame.changes));
+    }
+
+    renderAccount(sections) {
+        if (sections.includes('wallet') || sections.includes('portfolio')) {
+            this.updateAccountSummary(this.accountState.wallet, this.accountState.portfolio);
+        }
+        if (sections.includes('bots')) {
+            this.updateActiveBotsDisplay([...this.accountState.bots.values()].sort((a, b) => a.id - b.id));
+        }
+        if (sections.includes('positions')) {
+            this.updatePortfolioDisplay([...this.accountState.positions.values()], this.recentOrders);
+        }
+    }
+
+    handleLogUpdate(data) {
+        const tbody = document.getElementById('logsTable');
+        if (!tbody || !data.logs) return;
+
+        data.logs.forEach(log => {
+            const row = document.createElement('tr');
+            row.innerHTML = `
+                <td>${new Date(log.timestamp + 'Z').toLocaleTimeString()}</td>
+                <td>${log.level}</td>
+                <td>${log.message}</td>
+            `;
+            tbody.insertBefore(row, tbody.firstChild);
+        });
+    }
+
     handleMarketDataUpdate(data) {
         this.marketData.set(data.symbol, data);
         this.updateMarketWatchTable(data);
@@ -163,9 +274,7 @@ class TradingBotApp {
 
     async loadInitialData() {
         await Promise.all([
-            this.loadMarketStatus(),
-            this.loadActiveBots(),
-            this.loadPortfolioData(),
+            this.loadDashboardSnapshot(),
             this.loadMarketWatch()
         ]);
     }
@@ -174,6 +283,7 @@ class TradingBotApp {
         try {
             const response = await fetch('/api/market_status');
             const data = await response.json();
+            this.lastMarketStatus = data;
             this.updateMarketStatusDisplay(data);
         } catch (error) {
             console.error('Error loading market status:', error);
@@ -289,6 +399,18 @@ class TradingBotApp {
         }
     }
 
+    updateAccountSummary(wallet, portfolio) {
+        const fields = {
+            availableCash: wallet.balance,
+            portfolioValue: portfolio.portfolio_value,
+            totalPnl: portfolio.net_pnl
+        };
+        Object.entries(fields).forEach(([id, value]) => {
+            const element = document.getElementById(id);
+            if (element && typeof value === 'number') element.textContent = this.formatCurrency(value);
+        });
+    }
+
     updatePositionsTable(positions) {
         const tbody = document.getElementById('positionsTable');
         if (!tbody) return;
@@ -536,15 +658,34 @@ class TradingBotApp {
         }
     }
 
+    async loadDashboardSnapshot() {
+        try {
+            const response = await fetch(`/api/dashboard_snapshot?mode=${this.tradingMode()}`);
+            if (response.status === 304) return;
+            const data = await response.json();
+            this.lastMarketStatus = data.market_status;
+            this.recentOrders = data.recent_orders;
+            this.updateMarketStatusDisplay(data.market_status);
+            this.updateActiveBotsDisplay(data.active_bots);
+            this.updatePortfolioDisplay(data.positions, data.recent_orders);
+        } catch (error) {
+            console.error('Error loading dashboard snapshot:', error);
+        }
+    }
+
     startDataUpdates() {
-        // Update market status every second
-        setInterval(() => this.loadMarketStatus(), 1000);
-        
-        // Update active bots every 10 seconds
-        setInterval(() => this.loadActiveBots(), 10000);
+        // Tick the clock locally every second
+        setInterval(() => {
+            if (this.lastMarketStatus) this.updateMarketStatusDisplay(this.lastMarketStatus);
+        }, 1000);
         
-        // Update portfolio every 30 seconds
-        setInterval(() => this.loadPortfolioData(), 30000);
+        // Bots and portfolio are pushed over the socket; poll the snapshot only while disconnected
+        setInterval(() => {
+            if (!this.socket.connected) this.loadDashboardSnapshot();
+        }, 5000);
+
+        // Market status every 30 seconds
+        setInterval(() => this.loadMarketStatus(), 30000);
     }
 }
 
@@ -1,6 +1,23 @@
 # Strategy package
-from .base_strategy import BaseStrategy
-from .moving_average_cross import MovingAverageCrossStrategy
-from .rsi_strategy import RSIStrategy
+import importlib
 
-__all__ = ['BaseStrategy', 'MovingAverageCrossStrategy', 'RSIStrategy']
\ No newline at end of file
+from .registry import REGISTRY, Strategy, StrategySpec, StrategyRegistry, EXECUTION_PARAMETERS, number, select
+
+# Strategy classes import pandas/numpy; load them on first use like the registry does
+_LAZY = {
+    'BaseStrategy': '.base_strategy',
+    'MovingAverageCrossStrategy': '.moving_average_cross',
+    'RSIStrategy': '.rsi_strategy',
+    'SharedMovingAverageCrossStrategy': '.indicator_strategies',
+    'SharedRSIStrategy': '.indicator_strategies'
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['BaseStrategy', 'MovingAverageCrossStrategy', 'RSIStrategy', 'SharedMovingAverageCrossStrategy', 'SharedRSIStrategy',
+           'REGISTRY', 'Strategy', 'StrategySpec', 'StrategyRegistry', 'EXECUTION_PARAMETERS', 'number', 'select']
@@ -0,0 +1,136 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from modules.indicators import GRAPH, IndicatorGraph, Node
+from .registry import Strategy
+
+logger = logging.getLogger(__name__)
+
+
+class SharedIndicatorStrategy(Strategy):
+    """
+    Base for strategies that read their indicators from the process-wide
+    IndicatorGraph instead of keeping their own price history: bots with
+    the same parameters on the same symbols share the nodes. Subscriptions
+    are taken on a symbol's first tick and dropped by `close()`.
+    """
+
+    name = 'shared_indicator_strategy'
+
+    def __init__(self, config: Dict[str, Any] = None, graph: IndicatorGraph = None):
+        self.config = config or {}
+        self.graph = graph or GRAPH
+        self.capital_per_trade = self.config.get('capital_per_trade', 10000)
+        self.position: Dict[str, str] = {}
+        self.signal_count = 0
+        self._nodes: Dict[str, Tuple[Node, ...]] = {}
+
+    def indicators(self, symbol: str) -> Tuple[Node, ...]:
+        """Subscribe to the nodes this strategy reads for `symbol`"""
+        raise NotImplementedError
+
+    def decide(self, symbol: str, price: float, values: List[Optional[float]]) -> Optional[Dict[str, Any]]:
+        """A signal for `symbol` from its indicator values (all ready), or None"""
+        raise NotImplementedError
+
+    def evaluate(self, market_data: Dict[str, Any], current_positions: List[Dict[str, Any]] = None,
+                 available_cash: float = 0.0) -> List[Dict[str, Any]]:
+        prices = {symbol: data['last_price'] for symbol, data in market_data.items()
+                  if data and data.get('last_price', 0) > 0}
+        for symbol in prices:
+            if symbol not in self._nodes:
+                self._nodes[symbol] = self.indicators(symbol)
+        self.graph.update(prices)
+
+        symbols = list(prices)
+        nodes = [node for symbol in symbols for node in self._nodes[symbol]]
+        values = self.graph.values(nodes)
+        width = len(nodes) // len(symbols) if symbols else 0
+
+        signals = []
+        for i, symbol in enumerate(symbols):
+            symbol_values = values[i * width:(i + 1) * width]
+            if any(value is None for value in symbol_values):
+                continue
+            signal = self.decide(symbol, prices[symbol], symbol_values)
+            if signal is not None:
+                self.position[symbol] = 'LONG' if signal['action'] == 'BUY' else 'OUT'
+                self.signal_count += 1
+                signals.append(signal)
+        return signals
+
+    def close(self):
+        nodes = [node for symbol_nodes in self._nodes.values() for node in symbol_nodes]
+        self._nodes.clear()
+        self.graph.release(nodes)
+
+    def calculate_quantity(self, price: float) -> int:
+        quantity = max(1, int(self.capital_per_trade / price))
+        return min(quantity, 10)  # Max 10 shares per trade, as in the per-bot strategies
+
+    def signal(self, symbol: str, action: str, price: float, signal_type: str, **fields) -> Dict[str, Any]:
+        logger.debug(f"🎯 {self.name} {action} signal #{self.signal_count + 1} for {symbol} at ₹{price:.2f} ({signal_type})")
+        return {
+            'symbol': symbol,
+            'action': action,
+            'quantity': self.calculate_quantity(price),
+            'price': price,
+            'strategy': self.name,
+            'signal_type': signal_type,
+            'timestamp': datetime.now(),
+            **fields
+        }
+
+
+class SharedMovingAverageCrossStrategy(SharedIndicatorStrategy):
+    """MovingAverageCrossStrategy's golden/death cross on shared SMA nodes"""
+
+    def __init__(self, config: Dict[str, Any] = None, graph: IndicatorGraph = None):
+        super().__init__(config, graph)
+        self.name = "Moving Average Crossover"
+        self.fast_period = self.config.get('fast_period', 5)
+        self.slow_period = self.config.get('slow_period', 10)
+        self._last_spread: Dict[str, float] = {}
+
+    def indicators(self, symbol: str) -> Tuple[Node, ...]:
+        return (self.graph.subscribe(symbol, 'sma', window=self.fast_period),
+                self.graph.subscribe(symbol, 'sma', window=self.slow_period))
+
+    def decide(self, symbol: str, price: float, values: List[Optional[float]]) -> Optional[Dict[str, Any]]:
+        fast, slow = values
+        # Crosses are judged against what this bot saw last, so a tick shared with other bots counts once
+        spread = fast - slow
+        previous = self._last_spread.get(symbol)
+        self._last_spread[symbol] = spread
+        if previous is None:
+            return None
+        current_position = self.position.get(symbol, 'OUT')
+        if previous <= 0 < spread and current_position != 'LONG':
+            return self.signal(symbol, 'BUY', price, 'GOLDEN_CROSS', fast_ma=fast, slow_ma=slow)
+        if previous >= 0 > spread and current_position == 'LONG':
+            return self.signal(symbol, 'SELL', price, 'DEATH_CROSS', fast_ma=fast, slow_ma=slow)
+        return None
+
+
+class SharedRSIStrategy(SharedIndicatorStrategy):
+    """RSIStrategy's oversold/overbought rule on a shared RSI node"""
+
+    def __init__(self, config: Dict[str, Any] = None, graph: IndicatorGraph = None):
+        super().__init__(config, graph)
+        self.name = "RSI Mean Reversion"
+        self.rsi_period = self.config.get('rsi_period', 6)
+        self.oversold = self.config.get('oversold', 30)
+        self.overbought = self.config.get('overbought', 70)
+
+    def indicators(self, symbol: str) -> Tuple[Node, ...]:
+        return (self.graph.subscribe(symbol, 'rsi', period=self.rsi_period),)
+
+    def decide(self, symbol: str, price: float, values: List[Optional[float]]) -> Optional[Dict[str, Any]]:
+        rsi, = values
+        current_position = self.position.get(symbol, 'OUT')
+        if rsi < self.oversold and current_position != 'LONG':
+            return self.signal(symbol, 'BUY', price, 'OVERSOLD', rsi_value=rsi)
+        if rsi > self.overbought and current_position == 'LONG':
+            return self.signal(symbol, 'SELL', price, 'OVERBOUGHT', rsi_value=rsi)
+        return None
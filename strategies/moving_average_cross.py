@@ -3,6 +3,9 @@ import numpy as np
 from typing import Dict, List, Any
 from datetime import datetime
 import random
+import logging
+
+logger = logging.getLogger(__name__)
 
 class MovingAverageCrossStrategy:
     def __init__(self, config: Dict[str, Any] = None):
@@ -65,8 +68,8 @@ class MovingAverageCrossStrategy:
                 })
                 self.position[symbol] = 'LONG'
                 self.signal_count += 1
-                print(f"🎯 BUY signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
-                print(f"   Fast MA: {current_fast:.2f}, Slow MA: {current_slow:.2f}")
+                logger.debug(f"🎯 BUY signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
+                logger.debug(f"   Fast MA: {current_fast:.2f}, Slow MA: {current_slow:.2f}")
             
             # Death Cross - SELL signal (Fast MA crosses below Slow MA)
             elif (previous_fast >= previous_slow and 
@@ -88,8 +91,8 @@ class MovingAverageCrossStrategy:
                 })
                 self.position[symbol] = 'OUT'
                 self.signal_count += 1
-                print(f"🎯 SELL signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
-                print(f"   Fast MA: {current_fast:.2f}, Slow MA: {current_slow:.2f}")
+                logger.debug(f"🎯 SELL signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
+                logger.debug(f"   Fast MA: {current_fast:.2f}, Slow MA: {current_slow:.2f}")
             
             # Demo mode: Generate random signals if no real signals (for testing)
             elif self.config.get('demo_mode', True) and random.random() < 0.1:  # 10% chance
@@ -107,7 +110,7 @@ class MovingAverageCrossStrategy:
                     })
                     self.position[symbol] = 'LONG'
                     self.signal_count += 1
-                    print(f"🎲 DEMO BUY signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
+                    logger.debug(f"🎲 DEMO BUY signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
                 else:
                     # Random SELL signal
                     quantity = self.calculate_quantity(data['last_price'])
@@ -122,7 +125,7 @@ class MovingAverageCrossStrategy:
                     })
                     self.position[symbol] = 'OUT'
                     self.signal_count += 1
-                    print(f"🎲 DEMO SELL signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
+                    logger.debug(f"🎲 DEMO SELL signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
         
         return signals
     
@@ -0,0 +1,305 @@
+import importlib
+import inspect
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional, Union
+
+# Parameter schemas are the dicts the start-bot form renders:
+# {'name', 'type' ('number' or 'select'), 'default', 'min'/'max' or 'options', 'description'}
+
+
+def number(name: str, default, min=None, max=None, description: str = '') -> Dict[str, Any]:
+    param = {'name': name, 'type': 'number', 'default': default}
+    if min is not None:
+        param['min'] = min
+    if max is not None:
+        param['max'] = max
+    param['description'] = description
+    return param
+
+
+def select(name: str, default: str, options: List[str], description: str = '') -> Dict[str, Any]:
+    return {'name': name, 'type': 'select', 'default': default, 'options': list(options), 'description': description}
+
+
+# How the bot executes signals; read by start_bot and execute_trade whatever the strategy
+EXECUTION_PARAMETERS = [
+    select('order_type', 'CNC', ['MIS', 'CNC'], 'Order type (MIS for intraday, CNC for delivery)'),
+    number('risk_level', 50, 10, 100, 'Trading aggression level (10-100%)')
+]
+
+
+class Strategy:
+    """
+    Common interface of every registered strategy.
+
+    Streaming: `on_tick(symbol, tick)` for each quote (a dict with at least
+    'last_price') and `on_bar(symbol, bar)` for each OHLCV bar; batch:
+    `evaluate(market_data, current_positions, available_cash)` for a
+    symbol -> tick dict, which is what the bot loop calls once per
+    iteration. Each returns a list of signal dicts (symbol, action,
+    quantity, price, ...). Subclasses override `on_tick` or `evaluate`;
+    each defaults to the other.
+    """
+
+    name = 'strategy'
+
+    def on_tick(self, symbol: str, tick: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.evaluate({symbol: tick})
+
+    def on_bar(self, symbol: str, bar: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.on_tick(symbol, {
+            'symbol': symbol,
+            'last_price': bar['close'],
+            'volume': bar.get('volume', 0),
+            'timestamp': bar.get('timestamp') or datetime.now()
+        })
+
+    def evaluate(self, market_data: Dict[str, Any], current_positions: List[Dict[str, Any]] = None,
+                 available_cash: float = 0.0) -> List[Dict[str, Any]]:
+        signals = []
+        for symbol, tick in market_data.items():
+            if tick:
+                signals.extend(self.on_tick(symbol, tick))
+        return signals
+
+    def generate_signals(self, market_data: Dict[str, Any], current_positions: List[Dict[str, Any]] = None,
+                         available_cash: float = 0.0) -> List[Dict[str, Any]]:
+        return self.evaluate(market_data, current_positions, available_cash)
+
+    def close(self):
+        """Release shared resources (indicator subscriptions) when the bot stops"""
+
+
+class LegacyStrategy(Strategy):
+    """
+    A strategy object that only has `generate_signals(market_data)` (the
+    strategies/ classes, modules.strategy_engine) behind the common
+    interface; other attributes are passed through to it.
+    """
+
+    def __init__(self, strategy, takes_account: bool = False):
+        self.strategy = strategy
+        self.name = getattr(strategy, 'name', type(strategy).__name__)
+        self.takes_account = takes_account  # generate_signals() also takes positions and cash
+
+    def on_tick(self, symbol: str, tick: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.evaluate({symbol: tick})
+
+    def evaluate(self, market_data: Dict[str, Any], current_positions: List[Dict[str, Any]] = None,
+                 available_cash: float = 0.0) -> List[Dict[str, Any]]:
+        if self.takes_account:
+            return self.strategy.generate_signals(market_data, current_positions, available_cash=available_cash)
+        return self.strategy.generate_signals(market_data)
+
+    def __getattr__(self, attr):
+        if attr == 'strategy':
+            raise AttributeError(attr)
+        return getattr(self.strategy, attr)
+
+
+class StrategySpec:
+    """
+    One registered strategy: its declarative schema and where its code is.
+
+    `target` is a factory taking the resolved parameters, or a
+    'package.module:Name' string imported on first use, so strategy
+    modules (and what they import) load only once a bot runs them.
+    `config` is passed to the strategy on top of the parameters but not
+    shown in the form.
+    """
+
+    def __init__(self, name: str, target: Union[str, Callable], display_name: str = None,
+                 description: str = '', parameters: List[Dict[str, Any]] = None,
+                 config: Dict[str, Any] = None):
+        self.name = name
+        self.target = target
+        self.display_name = display_name or name.replace('_', ' ').title()
+        self.description = description
+        self.parameters = list(parameters or [])
+        self.config = dict(config or {})
+        self._factory: Optional[Callable] = None if isinstance(target, str) else target
+        self._takes_account: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._factory is not None
+
+    def load(self) -> Callable:
+        if self._factory is None:
+            with self._lock:
+                if self._factory is None:
+                    module_name, _, attr = self.target.partition(':')
+                    if not attr:
+                        raise ValueError(f"Strategy target must be 'module:Name', got {self.target!r}")
+                    self._factory = getattr(importlib.import_module(module_name), attr)
+        return self._factory
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'display_name': self.display_name,
+            'description': self.description,
+            'parameters': self.parameters
+        }
+
+    # Parameters
+
+    def validate(self, parameters: Dict[str, Any]) -> List[str]:
+        """Problems with `parameters`, one message each; empty when they are usable"""
+        errors = []
+        for param in self.parameters:
+            value = parameters.get(param['name'])
+            if value is None or value == '':
+                continue
+            if param['type'] == 'number':
+                try:
+                    value = self._number(value, param['default'])
+                except (ValueError, TypeError):
+                    errors.append(f"Parameter {param['name']} is not a valid number: {value}")
+                    continue
+                if 'min' in param and value < param['min']:
+                    errors.append(f"Parameter {param['name']} value {value} below minimum {param['min']}")
+                if 'max' in param and value > param['max']:
+                    errors.append(f"Parameter {param['name']} value {value} above maximum {param['max']}")
+            elif param['type'] == 'select' and str(value) not in param['options']:
+                errors.append(f"Parameter {param['name']} value {value} not one of {', '.join(param['options'])}")
+        return errors
+
+    def resolve(self, parameters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """`parameters` with defaults filled in and numbers converted; unknown keys are kept"""
+        resolved = dict(parameters or {})
+        for param in self.parameters:
+            value = resolved.get(param['name'])
+            if value is None or value == '':
+                resolved[param['name']] = param['default']
+            elif param['type'] == 'number':
+                try:
+                    resolved[param['name']] = self._number(value, param['default'])
+                except (ValueError, TypeError):
+                    resolved[param['name']] = param['default']
+        return resolved
+
+    @staticmethod
+    def _number(value, default):
+        value = float(value)
+        if isinstance(default, int) and value.is_integer():
+            return int(value)
+        return value
+
+    def create(self, parameters: Dict[str, Any] = None) -> Strategy:
+        factory = self.load()
+        strategy = factory({**self.config, **self.resolve(parameters)})
+        if isinstance(strategy, Strategy):
+            return strategy
+        if self._takes_account is None:
+            accepted = inspect.signature(strategy.generate_signals).parameters
+            self._takes_account = 'available_cash' in accepted
+        return LegacyStrategy(strategy, self._takes_account)
+
+
+class StrategyRegistry:
+    """
+    Name -> StrategySpec for every strategy a bot can run.
+
+    Registration is cheap (nothing is imported for string targets), so
+    plugins register at import time and the first `create()` loads them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._specs: Dict[str, StrategySpec] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, name: str, target: Union[str, Callable], display_name: str = None,
+                 description: str = '', parameters: List[Dict[str, Any]] = None,
+                 config: Dict[str, Any] = None, replace: bool = False) -> StrategySpec:
+        spec = StrategySpec(name, target, display_name, description, parameters, config)
+        with self._lock:
+            if name in self._specs and not replace:
+                raise ValueError(f"Strategy already registered: {name}")
+            self._specs[name] = spec
+        return spec
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._specs.pop(name, None)
+
+    def get(self, name: str) -> StrategySpec:
+        spec = self._specs.get(name)
+        if spec is None:
+            raise ValueError(f"Unknown strategy: {name}")
+        return spec
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def available(self) -> List[Dict[str, Any]]:
+        """Schemas of all strategies, in registration order"""
+        return [spec.to_dict() for spec in list(self._specs.values())]
+
+    def validate(self, name: str, parameters: Dict[str, Any]) -> List[str]:
+        if name not in self._specs:
+            return [f"Strategy not found: {name}"]
+        return self.get(name).validate(parameters or {})
+
+    def create(self, name: str, parameters: Dict[str, Any] = None) -> Strategy:
+        spec = self.get(name)
+        if not spec.loaded:
+            self.logger.info(f"Loading strategy {name} from {spec.target}")
+        return spec.create(parameters)
+
+
+REGISTRY = StrategyRegistry()
+
+REGISTRY.register(
+    'ma_cross', 'strategies.indicator_strategies:SharedMovingAverageCrossStrategy',
+    display_name='SMA Crossover (indicator)',
+    description='Buys on a golden cross of the fast over the slow simple moving average, sells on a death cross',
+    parameters=[
+        number('fast_period', 5, 2, 50, 'Fast moving average period'),
+        number('slow_period', 10, 3, 200, 'Slow moving average period'),
+        number('capital_per_trade', 10000, 1000, 1000000, 'Capital per trade (quantity is capped at 10)'),
+        *EXECUTION_PARAMETERS
+    ]
+)
+REGISTRY.register(
+    'rsi', 'strategies.indicator_strategies:SharedRSIStrategy',
+    display_name='RSI Mean Reversion (indicator)',
+    description='Buys when RSI drops below the oversold level, sells when it rises above the overbought level',
+    parameters=[
+        number('rsi_period', 6, 2, 50, 'RSI period'),
+        number('oversold', 30, 5, 50, 'Oversold RSI level'),
+        number('overbought', 70, 50, 95, 'Overbought RSI level'),
+        number('capital_per_trade', 10000, 1000, 1000000, 'Capital per trade (quantity is capped at 10)'),
+        *EXECUTION_PARAMETERS
+    ]
+)
+REGISTRY.register(
+    'zscore_mean_reversion', 'modules.strategy_engine:MeanReversionStrategy',
+    display_name='Z-Score Mean Reversion (indicator)',
+    description='Buys when price falls a number of standard deviations below its rolling mean, sells back at the mean',
+    parameters=[
+        number('lookback_period', 10, 5, 200, 'Lookback period for mean calculation'),
+        number('deviation_threshold', 2.0, 1.0, 5.0, 'Standard deviation threshold'),
+        number('quantity', 5, 1, 50, 'Quantity to trade per signal'),
+        *EXECUTION_PARAMETERS
+    ]
+)
+REGISTRY.register(
+    'breakout', 'modules.strategy_engine:BreakoutStrategy',
+    display_name='Breakout Strategy',
+    description='Buys when price breaks above its recent high, sells when it breaks below its recent low',
+    parameters=[
+        number('lookback_period', 20, 5, 200, 'Ticks in the high/low channel'),
+        number('resistance_level', 1.02, 1.0, 1.10, 'Minimum price to channel mean ratio for a buy'),
+        number('support_level', 0.98, 0.90, 1.0, 'Price to channel mean ratio that forces a sell'),
+        number('quantity', 8, 1, 50, 'Quantity to trade per signal'),
+        *EXECUTION_PARAMETERS
+    ]
+)
@@ -3,6 +3,9 @@ import numpy as np
 from typing import Dict, List, Any
 from datetime import datetime
 import random
+import logging
+
+logger = logging.getLogger(__name__)
 
 class RSIStrategy:
     def __init__(self, config: Dict[str, Any] = None):
@@ -55,7 +58,7 @@ class RSIStrategy:
                 })
                 self.position[symbol] = 'LONG'
                 self.signal_count += 1
-                print(f"🎯 RSI BUY signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f} (RSI: {current_rsi:.1f})")
+                logger.debug(f"🎯 RSI BUY signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f} (RSI: {current_rsi:.1f})")
             
             # Overbought - SELL signal
             elif current_rsi > self.overbought and current_position == 'LONG':
@@ -73,7 +76,7 @@ class RSIStrategy:
                 })
                 self.position[symbol] = 'OUT'
                 self.signal_count += 1
-                print(f"🎯 RSI SELL signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f} (RSI: {current_rsi:.1f})")
+                logger.debug(f"🎯 RSI SELL signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f} (RSI: {current_rsi:.1f})")
             
             # Demo mode: Generate random signals if no real signals
             elif self.config.get('demo_mode', True) and random.random() < 0.08:  # 8% chance
@@ -90,7 +93,7 @@ class RSIStrategy:
                     })
                     self.position[symbol] = 'LONG'
                     self.signal_count += 1
-                    print(f"🎲 RSI DEMO BUY signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
+                    logger.debug(f"🎲 RSI DEMO BUY signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
                 else:
                     quantity = self.calculate_quantity(data['last_price'])
                     signals.append({
@@ -104,7 +107,7 @@ class RSIStrategy:
                     })
                     self.position[symbol] = 'OUT'
                     self.signal_count += 1
-                    print(f"🎲 RSI DEMO SELL signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
+                    logger.debug(f"🎲 RSI DEMO SELL signal #{self.signal_count} for {symbol} at ₹{data['last_price']:.2f}")
         
         return signals
     
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from modules.journal import TradeJournal, CorruptSnapshotError
+
+
+def open_journal(tmp_path):
+    journal = TradeJournal(str(tmp_path / 'journal.jsonl'), str(tmp_path / 'snapshot.json'))
+    state, events = journal.load()
+    return journal, state, events
+
+
+def test_torn_write_then_more_trades_survive_restarts(tmp_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.append({'trade': 'A'})
+    journal.close()
+    with open(tmp_path / 'journal.jsonl', 'a') as f:
+        f.write('{"trade":"tor')  # crash mid-write
+
+    journal, _, events = open_journal(tmp_path)
+    assert [event['trade'] for event in events] == ['A']
+    journal.append({'trade': 'B'})
+    journal.append({'trade': 'C'})
+    journal.close()
+
+    journal, _, events = open_journal(tmp_path)
+    assert [event['trade'] for event in events] == ['A', 'B', 'C']
+    assert [event['seq'] for event in events] == [1, 2, 3]
+    journal.close()
+
+
+def test_complete_last_event_without_newline_is_kept(tmp_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.close()
+    with open(tmp_path / 'journal.jsonl', 'a') as f:
+        f.write(json.dumps({'trade': 'A', 'seq': 1}))
+
+    journal, _, events = open_journal(tmp_path)
+    journal.append({'trade': 'B'})
+    journal.close()
+
+    journal, _, events = open_journal(tmp_path)
+    assert [event['trade'] for event in events] == ['A', 'B']
+    journal.close()
+
+
+def test_corrupt_snapshot_raises(tmp_path):
+    journal, _, _ = open_journal(tmp_path)
+    journal.append({'trade': 'A'})
+    journal.write_snapshot({'users': {}})
+    journal.close()
+    with open(tmp_path / 'snapshot.json', 'w') as f:
+        f.write('{"users": {')
+
+    with pytest.raises(CorruptSnapshotError):
+        open_journal(tmp_path)
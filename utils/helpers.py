@@ -1,7 +1,13 @@
 from datetime import datetime, time
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import threading
+import time as time_module
 
 def is_market_open() -> bool:
     """Check if market is currently open (IST)"""
@@ -31,16 +37,151 @@ def get_working_days(start_date: datetime, end_date: datetime) -> List[datetime]
     dates = pd.date_range(start_date, end_date, freq='B')
     return [date.to_pydatetime() for date in dates]
 
-def setup_logging():
-    """Setup application logging"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('trading_bot.log'),
-            logging.StreamHandler()
-        ]
-    )
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord attributes that are not `extra=` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'suppressed'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, source, any `extra=` fields and the traceback"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RepeatFilter(logging.Filter):
+    """
+    Rate-limit identical messages: each (logger, level, message) passes
+    `burst` times per `window` seconds. The first one through after a
+    suppressed stretch carries the number dropped, as `suppressed`.
+    """
+
+    def __init__(self, window: float = 10.0, burst: int = 5, max_keys: int = 10000):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._seen: Dict[tuple, list] = {}  # key -> [window start, passed, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0:
+            return True
+        # Rendered once here; the queue handler reuses it
+        record.message = record.getMessage()
+        key = (record.name, record.levelno, record.message)
+        now = time_module.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self._seen) >= self.max_keys:
+                    # Mostly one-off messages; forgetting them only resets their windows
+                    self._seen.clear()
+                suppressed = state[2] if state else 0
+                self._seen[key] = [now, 1, 0]
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed = 0
+            else:
+                state[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+            record.message = f"{record.message} [{suppressed} repeats suppressed]"
+        return True
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that only renders the message in the caller; formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.__dict__.get('message')
+        if message is None:
+            message = record.getMessage()
+        record.msg = message
+        record.message = message
+        record.args = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parse_log_levels(spec: str) -> Dict[str, str]:
+    """'app.bot=DEBUG, werkzeug=WARNING' -> {'app.bot': 'DEBUG', 'werkzeug': 'WARNING'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: str = 'INFO', module_levels: Dict[str, str] = None, json_output: bool = False,
+                  log_file: Optional[str] = 'trading_bot.log', repeat_window: float = 10.0,
+                  repeat_burst: int = 5) -> logging.handlers.QueueListener:
+    """
+    Setup application logging.
+
+    Callers only enqueue: the root logger gets a QueueHandler, and a
+    QueueListener thread formats records (text or JSON lines) and writes
+    them to stderr and `log_file`. Identical messages are rate-limited
+    before they are queued. `module_levels` sets per-logger levels.
+    Calling it again replaces the previous setup.
+    """
+    global _listener
+    formatter = JsonFormatter() if json_output else logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    enqueue = _EnqueueHandler(log_queue)
+    enqueue.addFilter(RepeatFilter(repeat_window, repeat_burst))
+
+    root = logging.getLogger()
+    _stop_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(enqueue)
+    root.setLevel(level.upper())
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+@atexit.register
+def _stop_logging():
+    """Drain the queue and close the output handlers (at exit, or before a new setup)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
 def safe_float(value: Any, default: float = 0.0) -> float:
     """Safely convert value to float"""